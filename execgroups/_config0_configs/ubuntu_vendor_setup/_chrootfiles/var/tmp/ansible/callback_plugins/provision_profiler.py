@@ -0,0 +1,281 @@
+# ------------------------------------------------------------------------------
+# Provisioning Profiler - Ansible Callback Plugin
+# ------------------------------------------------------------------------------
+# Records the start and end of every task on every host and writes, per
+# playbook run, a JSON timeline with per task, role and host durations plus
+# a sorted report of the slowest tasks.  A one line summary is printed at
+# the end of the run so it is kept in the execution log of the phase.
+#
+# The duration, task count and role wall times of every run are added to
+# the totals of its phase (PROVISION_PROFILE_PHASE) in phases.json, and
+# the totals of every phase so far are printed after the summary.
+#
+# The task throughput (host task results per second) is reported with the
+# transport settings of the run - forks, pipelining, fact gathering and
+# cache - so runs with different transport profiles can be compared.
+# ------------------------------------------------------------------------------
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ------------------------------------------------------------------------------
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    name: provision_profiler
+    type: aggregate
+    short_description: records per task, role and host durations of a provisioning run
+    description:
+      - Writes a JSON timeline and a slowest tasks report for every playbook run.
+    options:
+      output_dir:
+        description: Directory for the reports, relative to the Ansible directory.
+        default: profile
+        env:
+          - name: PROVISION_PROFILE_DIR
+        ini:
+          - section: provision_profiler
+            key: output_dir
+      top:
+        description: Number of tasks in the slowest tasks report.
+        default: 20
+        type: int
+        env:
+          - name: PROVISION_PROFILE_TOP
+        ini:
+          - section: provision_profiler
+            key: top
+      phase:
+        description: Label of the provisioning phase the run belongs to.
+        default: ''
+        env:
+          - name: PROVISION_PROFILE_PHASE
+'''
+
+import os
+import json
+import time
+
+from ansible import constants as C
+from ansible.plugins.callback import CallbackBase
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'provision_profiler'
+    CALLBACK_NEEDS_ENABLED = False
+    CALLBACK_NEEDS_WHITELIST = False
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+
+        self._playbook = None
+        self._base_dir = os.getcwd()
+        self._started = None
+        self._play = None
+        self._running = {}
+        self._timeline = []
+
+    def set_options(self, task_keys=None, var_options=None, direct=None):
+        super(CallbackModule, self).set_options(task_keys=task_keys, var_options=var_options, direct=direct)
+
+        self._output_dir = self.get_option('output_dir')
+        self._top = int(self.get_option('top'))
+        self._phase = self.get_option('phase')
+
+    @staticmethod
+    def _role_name(task):
+        # roles are imported by relative path - ../roles/confluent.<name>
+        if task._role:
+            return os.path.basename(task._role.get_name())
+
+        return ''
+
+    @staticmethod
+    def _transport():
+        """Return the transport settings the run was made with."""
+        transport = {
+            "forks": C.DEFAULT_FORKS,
+            "gathering": C.DEFAULT_GATHERING,
+            "fact_caching": C.CACHE_PLUGIN
+        }
+
+        # ssh options are only defined once the ssh plugin has been loaded
+        for option in ("pipelining", "ssh_args"):
+            try:
+                transport[option] = C.config.get_config_value(option, plugin_type='connection', plugin_name='ssh')
+            except Exception:
+                transport[option] = None
+
+        return transport
+
+    def v2_playbook_on_start(self, playbook):
+        self._playbook = os.path.basename(playbook._file_name)
+        # playbooks live in entry_point/ under the Ansible directory
+        self._base_dir = os.path.dirname(os.path.abspath(playbook._basedir))
+        self._started = time.time()
+
+    def v2_playbook_on_play_start(self, play):
+        self._play = play.get_name()
+
+    def v2_runner_on_start(self, host, task):
+        self._running[(host.get_name(), task._uuid)] = time.time()
+
+    def _record(self, result, status):
+        host = result._host.get_name()
+        task = result._task
+        end = time.time()
+        start = self._running.pop((host, task._uuid), end)
+
+        self._timeline.append({
+            "host": host,
+            "play": self._play,
+            "role": self._role_name(task),
+            "task": task.name or task.action,
+            "action": task.action,
+            "status": status,
+            "start": round(start - self._started, 3),
+            "end": round(end - self._started, 3),
+            "duration": round(end - start, 3)
+        })
+
+    def v2_runner_on_ok(self, result):
+        self._record(result, "ok")
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._record(result, "ignored" if ignore_errors else "failed")
+
+    def v2_runner_on_skipped(self, result):
+        self._record(result, "skipped")
+
+    def v2_runner_on_unreachable(self, result):
+        self._record(result, "unreachable")
+
+    @staticmethod
+    def _summarize(entries, key):
+        """Sum busy time and wall time of the entries grouped by key."""
+        groups = {}
+
+        for entry in entries:
+            name = entry[key] or "-"
+            group = groups.setdefault(name, {"busy": 0.0, "start": entry["start"], "end": entry["end"], "tasks": 0})
+            group["busy"] += entry["duration"]
+            group["start"] = min(group["start"], entry["start"])
+            group["end"] = max(group["end"], entry["end"])
+            group["tasks"] += 1
+
+        return {name: {"busy": round(group["busy"], 3),
+                       "wall": round(group["end"] - group["start"], 3),
+                       "tasks": group["tasks"]}
+                for name, group in sorted(groups.items(), key=lambda item: -item[1]["busy"])}
+
+    def _add_phase(self, output_dir, profile):
+        """
+        Add the run to the totals of its phase in phases.json and return
+        the totals of every phase so far, in the order they first ran.
+        """
+        path = os.path.join(output_dir, "phases.json")
+        phases = {}
+
+        if os.path.exists(path):
+            with open(path) as phases_file:
+                phases = json.load(phases_file)
+
+        phase = phases.setdefault(profile["phase"] or profile["playbook"],
+                                  {"duration": 0.0, "tasks": 0, "playbooks": [], "roles": {}})
+        phase["duration"] = round(phase["duration"] + profile["duration"], 3)
+        phase["tasks"] += profile["tasks"]
+        phase["playbooks"].append(profile["playbook"])
+
+        for name, role in profile["roles"].items():
+            phase["roles"][name] = round(phase["roles"].get(name, 0.0) + role["wall"], 3)
+
+        with open(path, "w") as phases_file:
+            json.dump(phases, phases_file, indent=2)
+
+        return phases
+
+    def v2_playbook_on_stats(self, stats):
+        if self._started is None:
+            return
+
+        duration = round(time.time() - self._started, 3)
+        slowest = sorted(self._timeline, key=lambda entry: -entry["duration"])[:self._top]
+
+        # skipped results never reach the hosts
+        tasks = len([entry for entry in self._timeline if entry["status"] != "skipped"])
+        tasks_per_sec = round(tasks / duration, 3) if duration else 0.0
+
+        profile = {
+            "phase": self._phase,
+            "playbook": self._playbook,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self._started)),
+            "duration": duration,
+            "tasks": tasks,
+            "tasks_per_sec": tasks_per_sec,
+            "transport": self._transport(),
+            "hosts": self._summarize(self._timeline, "host"),
+            "roles": self._summarize(self._timeline, "role"),
+            "slowest": slowest,
+            "timeline": self._timeline
+        }
+
+        output_dir = self._output_dir
+
+        if not os.path.isabs(output_dir):
+            output_dir = os.path.join(self._base_dir, output_dir)
+
+        name = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(self._started))}-{os.path.splitext(self._playbook)[0]}"
+        phases = {}
+
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+
+            with open(os.path.join(output_dir, f"{name}.json"), "w") as profile_file:
+                json.dump(profile, profile_file, indent=2)
+
+            with open(os.path.join(output_dir, f"{name}.slowest.txt"), "w") as report_file:
+                for entry in slowest:
+                    report_file.write(f"{entry['duration']:>9.2f}s  {entry['host']:<16} "
+                                      f"{entry['role'] or '-'}: {entry['task']}\n")
+
+            phases = self._add_phase(output_dir, profile)
+        except (OSError, ValueError) as error:
+            self._display.warning(f"provision_profiler could not write reports to {output_dir}: {error}")
+
+        self._display.banner(f"SLOWEST TASKS ({self._playbook})")
+
+        for entry in slowest[:10]:
+            self._display.display(f"{entry['duration']:>9.2f}s  {entry['host']:<16} "
+                                  f"{entry['role'] or '-'}: {entry['task']}")
+
+        summary = {
+            "phase": self._phase,
+            "playbook": self._playbook,
+            "duration": duration,
+            "tasks": tasks,
+            "tasks_per_sec": tasks_per_sec,
+            "transport": profile["transport"],
+            "roles": {name: role["wall"] for name, role in profile["roles"].items()},
+            "slowest": [{"host": entry["host"], "task": entry["task"], "duration": entry["duration"]}
+                        for entry in slowest[:5]]
+        }
+
+        self._display.display(f"PROVISION_PROFILE {json.dumps(summary, sort_keys=True)}")
+
+        if phases:
+            totals = {name: phase["duration"] for name, phase in phases.items()}
+            self._display.display(f"PROVISION_PHASES {json.dumps(totals)}")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------------------------
+# Flat apt Repository Indexer
+# ------------------------------------------------------------------------------
+# Writes the Packages index of a directory of .debs, so the directory can be
+# served over http as a flat apt repository:
+#
+#   deb [trusted=yes] http://<host>:<port>/debs ./
+#
+# Each stanza is the control file of the package with its Filename, Size and
+# checksums, which apt verifies every download against.  The control file is
+# read with the standard library, or with dpkg-deb for compressions it does
+# not support (zstd).
+#
+#   deb_repo.py DIRECTORY
+# ------------------------------------------------------------------------------
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ------------------------------------------------------------------------------
+
+import io
+import os
+import sys
+import hashlib
+import tarfile
+import argparse
+import subprocess
+
+AR_MAGIC = b"!<arch>\n"
+AR_HEADER_SIZE = 60
+
+
+def _ar_members(path):
+    """Yield (name, data) of every member of an ar archive."""
+    with open(path, "rb") as deb:
+        if deb.read(len(AR_MAGIC)) != AR_MAGIC:
+            raise ValueError(f"{path} is not a deb archive")
+
+        while True:
+            header = deb.read(AR_HEADER_SIZE)
+
+            if len(header) < AR_HEADER_SIZE:
+                return
+
+            name = header[:16].decode().strip().rstrip("/")
+            size = int(header[48:58].decode().strip())
+            data = deb.read(size)
+
+            # members are aligned to two bytes
+            if size % 2:
+                deb.read(1)
+
+            yield name, data
+
+
+def read_control(path):
+    """Return the control file of a .deb as text."""
+    for name, data in _ar_members(path):
+        if not name.startswith("control.tar"):
+            continue
+
+        if name.endswith(".zst"):
+            break
+
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as control_tar:
+            for member in control_tar.getmembers():
+                if member.name in ("control", "./control"):
+                    return control_tar.extractfile(member).read().decode()
+
+        raise ValueError(f"{path} has no control file")
+
+    return subprocess.run(["dpkg-deb", "--field", path], check=True,
+                          stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+
+def get_stanza(directory, filename):
+    path = os.path.join(directory, filename)
+
+    with open(path, "rb") as deb:
+        content = deb.read()
+
+    fields = [read_control(path).strip(),
+              f"Filename: ./{filename}",
+              f"Size: {len(content)}",
+              f"MD5sum: {hashlib.md5(content).hexdigest()}",
+              f"SHA1: {hashlib.sha1(content).hexdigest()}",
+              f"SHA256: {hashlib.sha256(content).hexdigest()}"]
+
+    return "\n".join(fields) + "\n"
+
+
+def write_index(directory):
+    """Write the Packages index of the .debs in directory and return their count."""
+    debs = sorted(filename for filename in os.listdir(directory) if filename.endswith(".deb"))
+    index = "\n".join(get_stanza(directory, filename) for filename in debs)
+
+    tmp_path = os.path.join(directory, ".Packages.tmp")
+
+    with open(tmp_path, "w") as index_file:
+        index_file.write(index)
+
+    os.replace(tmp_path, os.path.join(directory, "Packages"))
+
+    return len(debs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the Packages index of a directory of debs")
+    parser.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    print(f"indexed {write_index(args.directory)} packages")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
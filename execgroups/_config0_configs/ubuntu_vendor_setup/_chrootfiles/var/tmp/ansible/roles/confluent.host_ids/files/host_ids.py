@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------------------------
+# Kafka Host Id Resolver
+# ------------------------------------------------------------------------------
+# Reconciles the ids the inventory gives ZooKeeper, broker and KRaft
+# controller hosts with the ids the hosts already run with.
+#
+# The inventory numbers hosts by their position in each group.  A host that
+# has already joined the cluster keeps the id in its ZooKeeper myid or its
+# meta.properties - a broker started with another broker.id than its log
+# dirs were formatted with fails to start.  New hosts keep their inventory
+# id unless a running host holds it, otherwise they take the lowest free id
+# in inventory order.
+#
+#   host_ids.py --inventory JSON --running JSON [--controller-port 9093]
+# ------------------------------------------------------------------------------
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ------------------------------------------------------------------------------
+
+import sys
+import json
+import argparse
+
+# host var of the id of each group, with the running id it is read from
+HOST_ID_VARS = {
+    "zookeeper": ("zookeeper_id", "myid"),
+    "kafka_broker": ("broker_id", "meta"),
+    "kafka_controller": ("kraft_node_id", "meta")
+}
+
+# KRaft node ids of dedicated controllers start above any broker id -
+# matches create_ansible_replica_hosts
+KRAFT_CONTROLLER_ID_BASE = 9000
+
+
+class HostIdConflict(Exception):
+    pass
+
+
+def _to_id(value):
+    """Return an id read from a host, or None when there is none."""
+    value = str(value if value is not None else "").strip()
+    return int(value) if value.isdigit() else None
+
+
+def keep_running_ids(inventory_ids, running_ids, base=0):
+    """
+    Return the id of every host of a group.
+
+    Hosts with a running id keep it.  New hosts keep their inventory id
+    unless a running host holds it, otherwise they take the lowest free
+    id above base, in inventory order.
+
+    Args:
+        inventory_ids (dict): host to inventory id, in inventory order
+        running_ids (dict): host to the id it runs with, if any
+        base (int): ids handed out to new hosts start above base
+
+    Returns:
+        dict: host to id, in inventory order
+    """
+    ids = {}
+
+    for host in inventory_ids:
+        running_id = _to_id(running_ids.get(host))
+
+        if running_id is None:
+            continue
+
+        holder = next((_host for _host, _id in ids.items() if _id == running_id), None)
+
+        if holder:
+            raise HostIdConflict(f"hosts {holder} and {host} both run with id {running_id}")
+
+        ids[host] = running_id
+
+    taken = set(ids.values())
+    new_hosts = [host for host in inventory_ids if host not in ids]
+
+    for host in new_hosts:
+        if inventory_ids[host] not in taken:
+            ids[host] = inventory_ids[host]
+            taken.add(ids[host])
+
+    next_id = base + 1
+
+    for host in new_hosts:
+        if host in ids:
+            continue
+
+        while next_id in taken:
+            next_id += 1
+
+        ids[host] = next_id
+        taken.add(next_id)
+
+    return {host: ids[host] for host in inventory_ids}
+
+
+def resolve_host_ids(inventory, running, controller_port=None):
+    """
+    Return the host vars of the resolved ids, keyed by host.
+
+    A controller on a broker host runs in combined mode with the
+    broker's id.  With controllers, every host also gets the KRaft
+    quorum voters of the resolved node ids.
+
+    Args:
+        inventory (dict): group to {host: inventory id}
+        running (dict): host to {"myid": ..., "meta": ...} read from it
+        controller_port (int): port of the KRaft controller listener
+    """
+    host_vars = {}
+
+    for group, (id_var, running_key) in HOST_ID_VARS.items():
+        inventory_ids = dict(inventory.get(group) or {})
+
+        if group == "kafka_controller":
+            brokers = {host: host_vars[host]["broker_id"]
+                       for host in inventory_ids if "broker_id" in host_vars.get(host, {})}
+            dedicated = {host: _id for host, _id in inventory_ids.items() if host not in brokers}
+            ids = dict(brokers, **keep_running_ids(dedicated,
+                                                   {host: (running.get(host) or {}).get(running_key)
+                                                    for host in dedicated},
+                                                   base=KRAFT_CONTROLLER_ID_BASE))
+            ids = {host: ids[host] for host in inventory_ids}
+        else:
+            ids = keep_running_ids(inventory_ids,
+                                   {host: (running.get(host) or {}).get(running_key)
+                                    for host in inventory_ids})
+
+        for host, _id in ids.items():
+            host_vars.setdefault(host, {})[id_var] = _id
+
+    controllers = list(inventory.get("kafka_controller") or {})
+
+    if controllers:
+        voters = ",".join(f"{host_vars[host]['kraft_node_id']}@{host}:{controller_port}"
+                          for host in controllers)
+
+        for hvars in host_vars.values():
+            hvars["kraft_quorum_voters"] = voters
+
+    return host_vars
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve the ids of Kafka hosts")
+    parser.add_argument("--inventory", required=True,
+                        help="JSON of group to {host: inventory id}")
+    parser.add_argument("--running", required=True,
+                        help="JSON of host to {\"myid\": ..., \"meta\": ...}")
+    parser.add_argument("--controller-port", type=int, default=9093)
+    args = parser.parse_args(argv)
+
+    try:
+        host_vars = resolve_host_ids(json.loads(args.inventory),
+                                     json.loads(args.running),
+                                     controller_port=args.controller_port)
+    except HostIdConflict as error:
+        print(str(error), file=sys.stderr)
+        return 1
+
+    print(json.dumps(host_vars, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
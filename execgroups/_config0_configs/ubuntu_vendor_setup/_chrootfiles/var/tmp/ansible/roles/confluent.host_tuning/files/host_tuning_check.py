@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------------------------
+# Kafka Host Tuning Drift Check
+# ------------------------------------------------------------------------------
+# Reads the live kernel settings of the host - sysctls, transparent huge
+# pages, CPU governor, I/O scheduler of the data devices and noatime on the
+# data mounts - and compares them with the expected profile.  Nothing is
+# changed, so the check can run at any time.
+#
+# Output is a JSON summary on stdout:
+#
+#   {"checked": 17, "drift": [{"check": ..., "expected": ..., "actual": ...}],
+#    "unsupported": [...]}
+#
+# Settings the host does not expose (e.g. cpufreq on most virtualized
+# instances) are listed as unsupported instead of drift.
+# ------------------------------------------------------------------------------
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ------------------------------------------------------------------------------
+
+import os
+import re
+import sys
+import glob
+import json
+import argparse
+
+THP_FILES = ("/sys/kernel/mm/transparent_hugepage/enabled",
+             "/sys/kernel/mm/transparent_hugepage/defrag")
+
+
+def _read(path):
+    with open(path) as read_file:
+        return read_file.read().strip()
+
+
+def _selected(value):
+    """Return the [selected] entry of a sysfs choice list."""
+    match = re.search(r"\[(\S+)\]", value)
+    return match.group(1) if match else value
+
+
+def check_sysctls(expected, root="/proc/sys"):
+    """Compare sysctls - values are compared with whitespace collapsed."""
+    drift = []
+    unsupported = []
+
+    for key, value in sorted(expected.items()):
+        path = os.path.join(root, key.replace(".", "/"))
+
+        if not os.path.exists(path):
+            unsupported.append(f"sysctl {key}")
+            continue
+
+        actual = " ".join(_read(path).split())
+
+        if actual != " ".join(str(value).split()):
+            drift.append({"check": f"sysctl {key}", "expected": str(value), "actual": actual})
+
+    return drift, unsupported
+
+
+def check_transparent_hugepage(expected):
+    drift = []
+    unsupported = []
+
+    for path in THP_FILES:
+        if not os.path.exists(path):
+            unsupported.append(path)
+            continue
+
+        actual = _selected(_read(path))
+
+        if actual != expected:
+            drift.append({"check": path, "expected": expected, "actual": actual})
+
+    return drift, unsupported
+
+
+def check_cpu_governor(expected, pattern="/sys/devices/system/cpu/cpu*/cpufreq/scaling_governor"):
+    paths = sorted(glob.glob(pattern))
+
+    if not paths:
+        return [], ["cpu governor"]
+
+    actual = sorted(set(_read(path) for path in paths))
+
+    if actual != [expected]:
+        return [{"check": "cpu governor", "expected": expected, "actual": ",".join(actual)}], []
+
+    return [], []
+
+
+def check_io_scheduler(expected, device_regex, block_dir="/sys/block"):
+    drift = []
+    unsupported = []
+
+    for device in sorted(os.listdir(block_dir)):
+        if not re.match(device_regex, device):
+            continue
+
+        path = os.path.join(block_dir, device, "queue", "scheduler")
+
+        if not os.path.exists(path):
+            continue
+
+        available = _read(path)
+
+        if expected not in available.replace("[", " ").replace("]", " ").split():
+            unsupported.append(f"{device} scheduler {expected}")
+            continue
+
+        actual = _selected(available)
+
+        if actual != expected:
+            drift.append({"check": f"{device} scheduler", "expected": expected, "actual": actual})
+
+    return drift, unsupported
+
+
+def check_noatime(paths, mounts_file="/proc/mounts"):
+    """Check every listed path that is a mount point is mounted noatime."""
+    with open(mounts_file) as mounts:
+        options = {fields[1]: fields[3].split(",")
+                   for fields in (line.split() for line in mounts)
+                   if len(fields) > 3}
+
+    drift = []
+
+    for path in paths:
+        if path not in options:
+            continue
+
+        if "noatime" not in options[path]:
+            drift.append({"check": f"{path} noatime", "expected": "noatime", "actual": ",".join(options[path])})
+
+    return drift, []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report drift of the host from its tuning profile")
+    parser.add_argument("--expected", required=True, help="JSON of the expected profile")
+    args = parser.parse_args(argv)
+
+    expected = json.loads(args.expected)
+
+    checks = [check_sysctls(expected.get("sysctl", {}))]
+
+    if expected.get("transparent_hugepage"):
+        checks.append(check_transparent_hugepage(expected["transparent_hugepage"]))
+
+    if expected.get("cpu_governor"):
+        checks.append(check_cpu_governor(expected["cpu_governor"]))
+
+    if expected.get("io_scheduler"):
+        checks.append(check_io_scheduler(expected["io_scheduler"], expected["data_device_regex"]))
+
+    if expected.get("noatime_paths"):
+        checks.append(check_noatime(expected["noatime_paths"]))
+
+    drift = [item for check_drift, _ in checks for item in check_drift]
+    unsupported = [item for _, check_unsupported in checks for item in check_unsupported]
+
+    summary = {
+        "checked": len(expected.get("sysctl", {})) + len(checks) - 1,
+        "drift": drift,
+        "unsupported": unsupported
+    }
+
+    print(json.dumps(summary, sort_keys=True))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------------------------
+# Kafka Post Install Performance Benchmark
+# ------------------------------------------------------------------------------
+# Runs a matrix of kafka-producer-perf-test and kafka-consumer-perf-test
+# cases (record size, acks, compression, partitions, client count) against
+# the cluster, parses the tool output into throughput and latency
+# percentiles, checks the results against thresholds and prints a compact
+# JSON baseline.
+#
+# The matrix runner takes the command runner as an argument, so the same
+# code runs offline against captured tool output:
+#
+#   perf_benchmark.py --bootstrap-servers HOST:9092 --matrix JSON
+#   perf_benchmark.py --captured-dir samples --matrix JSON
+#
+# Captured output is read from <case id>.producer.<client>.txt and
+# <case id>.consumer.<client>.txt in the captured directory.
+#
+# With --previous, every case is compared with the same case of an
+# earlier baseline - throughput drops and latency rises beyond
+# --regression-pct are reported as regressions:
+#
+#   perf_benchmark.py --bootstrap-servers HOST:9092 --previous baseline.json
+# ------------------------------------------------------------------------------
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ------------------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+import argparse
+import itertools
+import subprocess
+
+DEFAULT_MATRIX = {
+    "record_size": [1024],
+    "acks": ["1", "all"],
+    "compression": ["none", "lz4"],
+    "partitions": [6],
+    "clients": [1],
+    "num_records": 1000000
+}
+
+# final summary line of kafka-producer-perf-test
+PRODUCER_RE = re.compile(
+    r"(?P<records>\d+) records sent, (?P<records_sec>[\d.]+) records/sec \((?P<mb_sec>[\d.]+) MB/sec\), "
+    r"(?P<avg_ms>[\d.]+) ms avg latency, (?P<max_ms>[\d.]+) ms max latency, "
+    r"(?P<p50_ms>\d+) ms 50th, (?P<p95_ms>\d+) ms 95th, (?P<p99_ms>\d+) ms 99th, (?P<p999_ms>\d+) ms 99.9th")
+
+CONSUMER_HEADER = "start.time, end.time"
+
+# metrics compared with the previous baseline - throughput may not drop
+# and latency may not rise by more than the regression tolerance
+HIGHER_IS_BETTER = ("producer_mb_sec", "producer_records_sec", "consumer_mb_sec", "consumer_records_sec")
+LOWER_IS_BETTER = ("producer_avg_ms", "producer_p50_ms", "producer_p95_ms", "producer_p99_ms")
+
+
+def parse_producer_output(output):
+    """
+    Parse the summary line of kafka-producer-perf-test.
+
+    Returns:
+        dict: records, records_sec, mb_sec and avg/p50/p95/p99/p999/max
+            latency in ms
+    """
+    matches = list(PRODUCER_RE.finditer(output))
+
+    if not matches:
+        raise Exception("no producer summary line in kafka-producer-perf-test output")
+
+    return {key: float(value) for key, value in matches[-1].groupdict().items()}
+
+
+def parse_consumer_output(output):
+    """
+    Parse the CSV result of kafka-consumer-perf-test.
+
+    Returns:
+        dict: records, records_sec, mb and mb_sec
+    """
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+
+    for idx, line in enumerate(lines):
+        if not line.startswith(CONSUMER_HEADER) or idx + 1 >= len(lines):
+            continue
+
+        fields = dict(zip([field.strip() for field in line.split(",")],
+                          [value.strip() for value in lines[idx + 1].split(",")]))
+
+        return {
+            "records": float(fields["data.consumed.in.nMsg"]),
+            "records_sec": float(fields["nMsg.sec"]),
+            "mb": float(fields["data.consumed.in.MB"]),
+            "mb_sec": float(fields["MB.sec"])
+        }
+
+    raise Exception("no result line in kafka-consumer-perf-test output")
+
+
+def combine_producers(results):
+    """
+    Combine the results of concurrent producers - throughput is summed
+    and each latency is the worst seen by any producer.
+    """
+    combined = {
+        "records_sec": round(sum(result["records_sec"] for result in results), 2),
+        "mb_sec": round(sum(result["mb_sec"] for result in results), 2)
+    }
+
+    for key in ("avg_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"):
+        combined[key] = max(result[key] for result in results)
+
+    return combined
+
+
+def combine_consumers(results):
+    """
+    Combine the results of concurrent consumers - each reads the whole
+    topic, so the summed throughput is the fan-out read rate.
+    """
+    return {
+        "records_sec": round(sum(result["records_sec"] for result in results), 2),
+        "mb_sec": round(sum(result["mb_sec"] for result in results), 2)
+    }
+
+
+def expand_matrix(matrix):
+    """
+    Expand the matrix into the list of cases to run.  List values are
+    varied, scalar values apply to every case.
+    """
+    matrix = dict(DEFAULT_MATRIX, **matrix)
+    axes = ["record_size", "acks", "compression", "partitions", "clients"]
+    values = [matrix[axis] if isinstance(matrix[axis], list) else [matrix[axis]] for axis in axes]
+
+    cases = []
+
+    for combination in itertools.product(*values):
+        case = dict(zip(axes, combination))
+        case["num_records"] = int(matrix["num_records"])
+        case["id"] = "rs{record_size}-acks{acks}-{compression}-p{partitions}-c{clients}".format(**case)
+        cases.append(case)
+
+    return cases
+
+
+def _case_topic(case, prefix):
+    return f"{prefix}-{case['id']}".replace("_", "-")
+
+
+def get_case_commands(case, bootstrap_servers, replication_factor, client_config=None, prefix="perf"):
+    """
+    Return the commands of a case as (create topic, producers, consumers,
+    delete topic).  Producers, then consumers, run concurrently.
+    """
+    topic = _case_topic(case, prefix)
+    records_per_client = case["num_records"] // case["clients"]
+
+    topics = ["kafka-topics", "--bootstrap-server", bootstrap_servers]
+
+    if client_config:
+        topics += ["--command-config", client_config]
+
+    create = topics + ["--create", "--if-not-exists",
+                       "--topic", topic,
+                       "--partitions", str(case["partitions"]),
+                       "--replication-factor", str(replication_factor)]
+
+    delete = topics + ["--delete", "--topic", topic]
+
+    producers = []
+    consumers = []
+
+    for idx in range(case["clients"]):
+        producer = ["kafka-producer-perf-test",
+                    "--topic", topic,
+                    "--num-records", str(records_per_client),
+                    "--record-size", str(case["record_size"]),
+                    "--throughput", "-1",
+                    "--producer-props",
+                    f"bootstrap.servers={bootstrap_servers}",
+                    f"acks={case['acks']}",
+                    f"compression.type={case['compression']}"]
+
+        if client_config:
+            producer += ["--producer.config", client_config]
+
+        # every consumer reads the whole topic in a group of its own -
+        # consumers sharing a group each get an uneven partition share
+        # and wait out the timeout for records they are never assigned
+        consumer = ["kafka-consumer-perf-test",
+                    "--broker-list", bootstrap_servers,
+                    "--topic", topic,
+                    "--group", f"{topic}-group-{idx}",
+                    "--messages", str(records_per_client * case["clients"]),
+                    "--timeout", "60000"]
+
+        if client_config:
+            consumer += ["--consumer.config", client_config]
+
+        producers.append(producer)
+        consumers.append(consumer)
+
+    return create, producers, consumers, delete
+
+
+def subprocess_runner(commands):
+    """Run commands concurrently and return their outputs in order."""
+    procs = [subprocess.Popen(command,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT,
+                              universal_newlines=True)
+             for command in commands]
+
+    outputs = []
+
+    for command, proc in zip(commands, procs):
+        output, _ = proc.communicate()
+
+        if proc.returncode != 0:
+            raise Exception(f"{command[0]} failed: {output.strip()[-500:]}")
+
+        outputs.append(output)
+
+    return outputs
+
+
+def captured_runner(captured_dir):
+    """
+    Return a runner that reads captured tool output instead of running
+    the tools - topic commands are skipped.
+    """
+    def _runner(commands):
+        outputs = []
+
+        for command in commands:
+            if command[0] == "kafka-topics":
+                outputs.append("")
+                continue
+
+            kind = "producer" if command[0] == "kafka-producer-perf-test" else "consumer"
+            topic = command[command.index("--topic") + 1]
+            client = len(outputs)
+            case_id = topic.split("-", 1)[1]
+
+            with open(os.path.join(captured_dir, f"{case_id}.{kind}.{client}.txt")) as captured_file:
+                outputs.append(captured_file.read())
+
+        return outputs
+
+    return _runner
+
+
+def run_matrix(cases, runner, bootstrap_servers="", replication_factor=3, client_config=None, keep_topics=False):
+    """
+    Run every case with the runner and return the parsed results.
+
+    Args:
+        cases (list): cases from expand_matrix
+        runner (callable): runs a list of commands concurrently and
+            returns their outputs
+    """
+    results = []
+
+    for case in cases:
+        create, producers, consumers, delete = get_case_commands(case,
+                                                                 bootstrap_servers,
+                                                                 replication_factor,
+                                                                 client_config=client_config)
+
+        runner([create])
+
+        try:
+            producer = combine_producers([parse_producer_output(output) for output in runner(producers)])
+            consumer = combine_consumers([parse_consumer_output(output) for output in runner(consumers)])
+        finally:
+            if not keep_topics:
+                runner([delete])
+
+        results.append({
+            "id": case["id"],
+            "case": {key: value for key, value in case.items() if key != "id"},
+            "producer": producer,
+            "consumer": consumer
+        })
+
+    return results
+
+
+def _get_metrics(result):
+    return {f"{side}_{key}": value
+            for side in ("producer", "consumer")
+            for key, value in result[side].items()}
+
+
+def check_thresholds(results, thresholds):
+    """
+    Check every case against the thresholds.
+
+    Thresholds are keyed min_<metric> or max_<metric>, where the metric
+    is producer_<key> or consumer_<key> of a case result, e.g.
+    {"min_producer_mb_sec": 20, "max_producer_p99_ms": 250}.
+
+    Returns:
+        list: violation messages
+    """
+    violations = []
+
+    for result in results:
+        metrics = _get_metrics(result)
+
+        for name, limit in sorted(thresholds.items()):
+            bound, metric = name.split("_", 1)
+
+            if bound not in ("min", "max") or metric not in metrics:
+                raise Exception(f"unknown threshold {name}")
+
+            value = metrics[metric]
+
+            if bound == "min" and value < float(limit):
+                violations.append(f"{result['id']}: {metric} {value} below {limit}")
+
+            if bound == "max" and value > float(limit):
+                violations.append(f"{result['id']}: {metric} {value} above {limit}")
+
+    return violations
+
+
+def get_summary(results):
+    """
+    One line per case with the producer and consumer throughput and the
+    producer latency percentiles, for the run log.
+    """
+    lines = []
+
+    for result in results:
+        producer = result["producer"]
+        consumer = result["consumer"]
+        lines.append(f"{result['id']}: "
+                     f"producer {producer['mb_sec']} MB/s {producer['records_sec']} records/s "
+                     f"p50 {producer['p50_ms']} ms p99 {producer['p99_ms']} ms max {producer['max_ms']} ms, "
+                     f"consumer {consumer['mb_sec']} MB/s {consumer['records_sec']} records/s")
+
+    return lines
+
+
+def compare_baselines(previous, results, regression_pct=10):
+    """
+    Compare every case with the same case of the previous baseline.
+    Cases that are not in both are skipped.
+
+    Returns:
+        dict: the previous label, the number of cases compared and the
+            regression messages
+    """
+    previous_cases = {case["id"]: _get_metrics(case) for case in previous.get("cases", [])}
+    tolerance = float(regression_pct) / 100
+    regressions = []
+    compared = 0
+
+    for result in results:
+        if result["id"] not in previous_cases:
+            continue
+
+        compared += 1
+        before = previous_cases[result["id"]]
+        after = _get_metrics(result)
+
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            if not before.get(metric) or metric not in after:
+                continue
+
+            change = (after[metric] - before[metric]) / before[metric]
+
+            if metric in HIGHER_IS_BETTER and change < -tolerance:
+                regressions.append(f"{result['id']}: {metric} {after[metric]} is "
+                                   f"{round(-change * 100, 1)}% below {before[metric]}")
+
+            if metric in LOWER_IS_BETTER and change > tolerance:
+                regressions.append(f"{result['id']}: {metric} {after[metric]} is "
+                                   f"{round(change * 100, 1)}% above {before[metric]}")
+
+    return {"label": previous.get("label", ""), "cases": compared, "regressions": regressions}
+
+
+def _load_json_arg(value):
+    if not value:
+        return {}
+
+    if os.path.exists(value):
+        with open(value) as json_file:
+            return json.load(json_file)
+
+    return json.loads(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kafka post install performance benchmark")
+    parser.add_argument("--bootstrap-servers", default="")
+    parser.add_argument("--matrix", default="", help="JSON (or file) of matrix axes")
+    parser.add_argument("--thresholds", default="", help="JSON (or file) of min_/max_ thresholds")
+    parser.add_argument("--fail-below", action="store_true", help="exit 2 when a threshold is violated")
+    parser.add_argument("--replication-factor", type=int, default=3)
+    parser.add_argument("--client-config", default=None, help="client properties for TLS/SASL listeners")
+    parser.add_argument("--captured-dir", default=None, help="parse captured tool output instead of running")
+    parser.add_argument("--keep-topics", action="store_true")
+    parser.add_argument("--label", default="", help="cluster or instance type label for the baseline")
+    parser.add_argument("--previous", default="", help="JSON (or file) of an earlier baseline to compare with")
+    parser.add_argument("--regression-pct", type=float, default=10,
+                        help="percent a metric may be worse than the previous baseline")
+    args = parser.parse_args(argv)
+
+    if not args.captured_dir and not args.bootstrap_servers:
+        parser.error("--bootstrap-servers is required unless --captured-dir is given")
+
+    cases = expand_matrix(_load_json_arg(args.matrix))
+    runner = captured_runner(args.captured_dir) if args.captured_dir else subprocess_runner
+
+    results = run_matrix(cases,
+                         runner,
+                         bootstrap_servers=args.bootstrap_servers,
+                         replication_factor=args.replication_factor,
+                         client_config=args.client_config,
+                         keep_topics=args.keep_topics)
+
+    violations = check_thresholds(results, _load_json_arg(args.thresholds))
+    previous = _load_json_arg(args.previous)
+    comparison = compare_baselines(previous, results, args.regression_pct) if previous else None
+
+    # regressions are reported, only thresholds fail the run
+    if violations:
+        status = "fail" if args.fail_below else "warn"
+    elif comparison and comparison["regressions"]:
+        status = "warn"
+    else:
+        status = "pass"
+
+    baseline = {
+        "label": args.label,
+        "status": status,
+        "violations": violations,
+        "summary": get_summary(results),
+        "comparison": comparison,
+        "cases": [{"id": result["id"], "producer": result["producer"], "consumer": result["consumer"]}
+                  for result in results]
+    }
+
+    print(json.dumps(baseline, sort_keys=True))
+
+    return 2 if status == "fail" else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------------------------
+# Kafka Partition Reassignment Planner
+# ------------------------------------------------------------------------------
+# Computes a minimal movement partition reassignment that balances replica
+# bytes across brokers after brokers are added, without reducing the number
+# of racks any partition is spread over.
+#
+# The planner itself (plan_reassignment, batch_reassignment) is a pure
+# function of the current assignment, partition sizes and broker racks.
+# The command line parses the output of the Kafka CLI tools and writes the
+# batches as reassignment JSON files for kafka-reassign-partitions.
+#
+#   reassign_planner.py plan --topics-describe FILE --log-dirs FILE
+#                            --brokers JSON --out-dir DIR
+#   reassign_planner.py benchmark --partitions 10000
+# ------------------------------------------------------------------------------
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ------------------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from bisect import bisect_right, insort
+
+TOPIC_PARTITION_RE = re.compile(r"Topic:\s*(\S+)\s+Partition:\s*(\d+)\s+.*Replicas:\s*([\d,]+)")
+
+# partitions smaller than this are weighted as this size, so empty
+# partitions are still spread over the new brokers
+MIN_PARTITION_BYTES = 1024 * 1024
+
+
+def _can_move(replicas, src, dst, racks):
+    """
+    A replica may move from src to dst when dst does not already hold
+    the partition and the move does not reduce its rack spread.
+    """
+    if dst in replicas:
+        return False
+
+    dst_rack = racks.get(dst)
+
+    if dst_rack == racks.get(src):
+        return True
+
+    return all(racks.get(broker) != dst_rack for broker in replicas if broker != src)
+
+
+def plan_reassignment(assignment, sizes, racks, tolerance=0.05, min_partition_bytes=MIN_PARTITION_BYTES):
+    """
+    Plan replica moves that balance the weighted replica bytes per broker.
+
+    The most loaded broker repeatedly hands its largest replica that
+    fits the gap to the least loaded broker that can take it, until
+    every broker is within the tolerance of the mean or no move makes
+    the spread smaller.  Each move is lighter than the load difference
+    of its two brokers, so the imbalance strictly drops and the loop
+    ends.  Moved replicas keep their position in the replica list, so
+    leadership moves along with preferred leaders.
+
+    Args:
+        assignment (dict): (topic, partition) to list of broker ids
+        sizes (dict): (topic, partition) to size in bytes
+        racks (dict): broker id to rack - every broker in the cluster,
+            including brokers without replicas yet
+        tolerance (float): allowed deviation from the mean load
+        min_partition_bytes (int): smallest weight given to a partition
+
+    Returns:
+        dict: (topic, partition) to new replica list, for moved
+            partitions only
+    """
+    brokers = sorted(racks)
+    weights = {tp: max(sizes.get(tp, 0), min_partition_bytes) for tp in assignment}
+    replicas_by_tp = {tp: list(replicas) for tp, replicas in assignment.items()}
+
+    load = {broker: 0 for broker in brokers}
+    # per broker (weight, topic, partition) sorted - for largest fit lookups
+    held = {broker: [] for broker in brokers}
+
+    for tp, replicas in replicas_by_tp.items():
+        for broker in replicas:
+            if broker not in load:
+                raise Exception(f"partition {tp[0]}-{tp[1]} is on unknown broker {broker}")
+
+            load[broker] += weights[tp]
+            held[broker].append((weights[tp], tp[0], tp[1]))
+
+    for broker in brokers:
+        held[broker].sort()
+
+    if not brokers or not replicas_by_tp:
+        return {}
+
+    target = sum(load.values()) / len(brokers)
+    slack = max(target * tolerance, min_partition_bytes)
+    moved = set()
+    exhausted = set()
+
+    while True:
+        # brokers below the tolerance take load from any broker above the mean
+        floor = target if min(load.values()) < target - slack else target + slack
+        sources = [broker for broker in sorted(brokers, key=lambda b: -load[b])
+                   if broker not in exhausted and load[broker] > floor]
+
+        if not sources:
+            break
+
+        src = sources[0]
+        move = None
+
+        for dst in sorted(brokers, key=lambda b: load[b]):
+            spread = load[src] - load[dst]
+
+            if spread <= min_partition_bytes:
+                break
+
+            # largest replica that does not overshoot the gap first, then
+            # smaller ones - any replica lighter than the spread helps
+            gap = max(min(load[src] - target, target - load[dst]), 0)
+            candidates = held[src]
+            end = bisect_right(candidates, (gap, chr(0x10FFFF), sys.maxsize))
+
+            if end == 0:
+                end = bisect_right(candidates, (spread - 1, chr(0x10FFFF), sys.maxsize))
+
+            for idx in range(end - 1, -1, -1):
+                weight, topic, partition = candidates[idx]
+                tp = (topic, partition)
+
+                if weight >= spread:
+                    continue
+
+                if _can_move(replicas_by_tp[tp], src, dst, racks):
+                    move = (idx, dst, tp, weight)
+                    break
+
+            if move:
+                break
+
+        if not move:
+            exhausted.add(src)
+            continue
+
+        idx, dst, tp, weight = move
+        held[src].pop(idx)
+        insort(held[dst], (weight, tp[0], tp[1]))
+        load[src] -= weight
+        load[dst] += weight
+
+        replicas = replicas_by_tp[tp]
+        replicas[replicas.index(src)] = dst
+        moved.add(tp)
+        exhausted.clear()
+
+    return {tp: replicas_by_tp[tp] for tp in sorted(moved)
+            if replicas_by_tp[tp] != list(assignment[tp])}
+
+
+def batch_reassignment(plan, assignment, sizes, max_batch_bytes, max_batch_partitions=100):
+    """
+    Split a plan into batches that each copy at most max_batch_bytes of
+    replica data (a partition larger than the limit gets its own batch).
+
+    Returns:
+        list: batches in kafka-reassign-partitions JSON format
+    """
+    batches = []
+    current = []
+    current_bytes = 0
+
+    for tp, replicas in sorted(plan.items(), key=lambda item: -sizes.get(item[0], 0)):
+        new_replicas = len(set(replicas) - set(assignment[tp]))
+        copy_bytes = sizes.get(tp, 0) * new_replicas
+
+        if current and (current_bytes + copy_bytes > max_batch_bytes
+                        or len(current) >= max_batch_partitions):
+            batches.append(current)
+            current = []
+            current_bytes = 0
+
+        current.append({"topic": tp[0], "partition": tp[1], "replicas": replicas})
+        current_bytes += copy_bytes
+
+    if current:
+        batches.append(current)
+
+    return [{"version": 1, "partitions": batch} for batch in batches]
+
+
+def get_broker_loads(assignment, sizes, brokers):
+    """Return the replica bytes held by each broker."""
+    loads = {broker: 0 for broker in brokers}
+
+    for tp, replicas in assignment.items():
+        for broker in replicas:
+            loads[broker] = loads.get(broker, 0) + sizes.get(tp, 0)
+
+    return loads
+
+
+def parse_topics_describe(output):
+    """Parse `kafka-topics --describe` into (topic, partition) to replicas."""
+    assignment = {}
+
+    for line in output.splitlines():
+        match = TOPIC_PARTITION_RE.search(line)
+
+        if not match:
+            continue
+
+        topic, partition, replicas = match.groups()
+        assignment[(topic, int(partition))] = [int(broker) for broker in replicas.split(",")]
+
+    return assignment
+
+
+def parse_log_dirs(output):
+    """
+    Parse `kafka-log-dirs --describe` into (topic, partition) to size,
+    taking the largest replica of each partition.
+    """
+    sizes = {}
+
+    for line in output.splitlines():
+        if not line.startswith("{"):
+            continue
+
+        for broker in json.loads(line)["brokers"]:
+            for log_dir in broker["logDirs"]:
+                for replica in log_dir["partitions"]:
+                    if replica.get("isFuture"):
+                        continue
+
+                    topic, partition = replica["partition"].rsplit("-", 1)
+                    tp = (topic, int(partition))
+                    sizes[tp] = max(sizes.get(tp, 0), replica["size"])
+
+    return sizes
+
+
+def _to_reassignment(assignment):
+    return {
+        "version": 1,
+        "partitions": [{"topic": tp[0], "partition": tp[1], "replicas": replicas}
+                       for tp, replicas in sorted(assignment.items())]
+    }
+
+
+def _write_json(path, content):
+    with open(path, "w") as json_file:
+        json.dump(content, json_file)
+
+
+def run_plan(args):
+    with open(args.topics_describe) as describe_file:
+        assignment = parse_topics_describe(describe_file.read())
+
+    with open(args.log_dirs) as log_dirs_file:
+        sizes = parse_log_dirs(log_dirs_file.read())
+
+    racks = {int(broker): (rack or None) for broker, rack in json.loads(args.brokers).items()}
+
+    plan = plan_reassignment(assignment, sizes, racks, tolerance=args.tolerance)
+    batches = batch_reassignment(plan, assignment, sizes,
+                                 args.batch_bytes,
+                                 max_batch_partitions=args.batch_partitions)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    # the current assignment of the moved partitions, to roll back with
+    _write_json(os.path.join(args.out_dir, "rollback.json"),
+                _to_reassignment({tp: assignment[tp] for tp in plan}))
+
+    batch_files = []
+
+    for idx, batch in enumerate(batches):
+        batch_file = os.path.join(args.out_dir, f"batch-{idx:04d}.json")
+        _write_json(batch_file, batch)
+        batch_files.append(batch_file)
+
+    new_assignment = dict(assignment)
+    new_assignment.update(plan)
+
+    summary = {
+        "partitions_moved": len(plan),
+        "bytes_moved": sum(sizes.get(tp, 0) * len(set(replicas) - set(assignment[tp]))
+                           for tp, replicas in plan.items()),
+        "batches": batch_files,
+        "broker_bytes_before": get_broker_loads(assignment, sizes, racks),
+        "broker_bytes_after": get_broker_loads(new_assignment, sizes, racks)
+    }
+
+    print(json.dumps(summary))
+
+    return 0
+
+
+def run_benchmark(args):
+    """Plan a scale out of a synthetic cluster and report the timing."""
+    rng = random.Random(args.seed)
+    old_brokers = list(range(1, args.brokers + 1))
+    all_brokers = list(range(1, args.brokers + args.new_brokers + 1))
+    racks = {broker: f"rack-{broker % args.racks}" for broker in all_brokers}
+
+    assignment = {}
+    sizes = {}
+
+    for idx in range(args.partitions):
+        tp = (f"topic-{idx // 50}", idx % 50)
+        assignment[tp] = rng.sample(old_brokers, args.replication_factor)
+        sizes[tp] = int(rng.lognormvariate(20, 1.5))
+
+    start = time.time()
+    plan = plan_reassignment(assignment, sizes, racks)
+    plan_secs = time.time() - start
+
+    batches = batch_reassignment(plan, assignment, sizes, 10 * 1024 ** 3)
+
+    new_assignment = dict(assignment)
+    new_assignment.update(plan)
+    loads = get_broker_loads(new_assignment, sizes, all_brokers)
+
+    print(json.dumps({
+        "partitions": args.partitions,
+        "brokers": f"{args.brokers} -> {len(all_brokers)}",
+        "plan_secs": round(plan_secs, 3),
+        "partitions_moved": len(plan),
+        "batches": len(batches),
+        "max_over_mean": round(max(loads.values()) / (sum(loads.values()) / len(loads)), 3)
+    }))
+
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kafka partition reassignment planner")
+    subparsers = parser.add_subparsers(dest="command")
+
+    plan_parser = subparsers.add_parser("plan", help="plan a reassignment from the Kafka CLI output")
+    plan_parser.add_argument("--topics-describe", required=True, help="output of kafka-topics --describe")
+    plan_parser.add_argument("--log-dirs", required=True, help="output of kafka-log-dirs --describe")
+    plan_parser.add_argument("--brokers", required=True, help="JSON map of broker id to rack")
+    plan_parser.add_argument("--out-dir", required=True)
+    plan_parser.add_argument("--tolerance", type=float, default=0.05)
+    plan_parser.add_argument("--batch-bytes", type=int, default=10 * 1024 ** 3)
+    plan_parser.add_argument("--batch-partitions", type=int, default=100)
+
+    bench_parser = subparsers.add_parser("benchmark", help="time the planner on a synthetic cluster")
+    bench_parser.add_argument("--partitions", type=int, default=10000)
+    bench_parser.add_argument("--brokers", type=int, default=6)
+    bench_parser.add_argument("--new-brokers", type=int, default=3)
+    bench_parser.add_argument("--racks", type=int, default=3)
+    bench_parser.add_argument("--replication-factor", type=int, default=3)
+    bench_parser.add_argument("--seed", type=int, default=1)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "plan":
+        return run_plan(args)
+
+    if args.command == "benchmark":
+        return run_benchmark(args)
+
+    parser.print_help()
+    return 4
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------------------------
+# Kafka Declarative Topic Planner
+# ------------------------------------------------------------------------------
+# Diffs a declarative topic spec against the topics of the cluster and
+# applies only what is missing or changed - topics are created, partitions
+# added and config overrides altered.  Partition counts not given in the
+# spec are suggested from the target throughput and the broker count.
+#
+# The planner itself (expand_spec, plan_topics) is a pure function of the
+# spec and the parsed `kafka-topics --describe` output, so a plan can be
+# made offline from captured output:
+#
+#   topic_planner.py plan --spec FILE --describe FILE --brokers N
+#   topic_planner.py apply --spec FILE --brokers N --bootstrap-server HOST:9092
+#
+# The Kafka CLI takes one topic per call and every call starts a JVM, so
+# apply runs the calls of each stage concurrently in bounded batches.
+# ------------------------------------------------------------------------------
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ------------------------------------------------------------------------------
+
+import re
+import sys
+import json
+import math
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+TOPIC_HEADER_RE = re.compile(r"^Topic:\s*(\S+)\s+(?:TopicId:\s*\S+\s+)?PartitionCount:\s*(\d+)\s+"
+                             r"ReplicationFactor:\s*(\d+)\s+Configs:\s*(.*)$")
+
+BRACE_RE = re.compile(r"\{([^{}]*)\}")
+
+# spec keys that map to topic configs - the rest of a topic's configs
+# go in "configs" verbatim
+CONFIG_KEYS = {
+    "min_insync_replicas": "min.insync.replicas",
+    "compression": "compression.type",
+    "segment_bytes": "segment.bytes",
+    "segment_ms": "segment.ms",
+    "retention_ms": "retention.ms",
+    "retention_bytes": "retention.bytes",
+    "cleanup_policy": "cleanup.policy",
+    "max_message_bytes": "max.message.bytes"
+}
+
+# compression stays with the producer unless the spec says otherwise -
+# a topic codec that differs from the producer's makes the broker
+# decompress and recompress every batch
+DEFAULTS = {
+    "compression": "producer",
+    "partition_mb_sec": 10,
+    "consumers": 1
+}
+
+
+def expand_name(name):
+    """
+    Expand brace patterns in a topic name - {0..9} and {00..19} are
+    ranges (zero padded to the width of the bounds), {a,b} are lists.
+    """
+    match = BRACE_RE.search(name)
+
+    if not match:
+        return [name]
+
+    body = match.group(1)
+    range_match = re.fullmatch(r"(\d+)\.\.(\d+)", body)
+
+    if range_match:
+        start, end = range_match.groups()
+        width = len(start) if start.startswith("0") and len(start) > 1 else 0
+        values = [str(value).zfill(width) for value in range(int(start), int(end) + 1)]
+    else:
+        values = body.split(",")
+
+    names = []
+
+    for value in values:
+        names.extend(expand_name(name[:match.start()] + value + name[match.end():]))
+
+    return names
+
+
+def suggest_partitions(brokers, throughput_mb_sec=None, partition_mb_sec=10, consumers=1):
+    """
+    Suggest a partition count - enough partitions for the target
+    throughput at partition_mb_sec each and one per consumer, rounded
+    up to a multiple of the broker count so leaders spread evenly.
+    """
+    needed = max(int(consumers or 1), 1)
+
+    if throughput_mb_sec:
+        needed = max(needed, math.ceil(float(throughput_mb_sec) / float(partition_mb_sec)))
+
+    return max(brokers, math.ceil(needed / brokers) * brokers)
+
+
+def _config_value(value):
+    if isinstance(value, bool):
+        return str(value).lower()
+
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(item) for item in value)
+
+    return str(value)
+
+
+def expand_spec(spec, brokers):
+    """
+    Resolve the spec into the desired state of every topic.
+
+    The spec is a list of topic entries, or {"defaults": {...},
+    "topics": [...]} with defaults applied to every entry.
+
+    Returns:
+        dict: topic to {"partitions", "replication_factor", "configs"}
+    """
+    if isinstance(spec, list):
+        spec = {"topics": spec}
+
+    if int(brokers) < 1:
+        raise Exception(f"brokers must be at least 1, not {brokers}")
+
+    defaults = dict(DEFAULTS, **spec.get("defaults", {}))
+    desired = {}
+
+    for entry in spec.get("topics", []):
+        entry = dict(defaults, **entry)
+
+        if not entry.get("name"):
+            raise Exception(f"topic entry without a name: {entry}")
+
+        # three replicas, or one per broker on smaller clusters
+        replication_factor = int(entry.get("replication_factor") or min(3, brokers))
+
+        if not 1 <= replication_factor <= brokers:
+            raise Exception(f"{entry['name']}: replication_factor {replication_factor} "
+                            f"must be between 1 and the {brokers} brokers")
+
+        partitions = int(entry.get("partitions") or suggest_partitions(brokers,
+                                                                      throughput_mb_sec=entry.get("throughput_mb_sec"),
+                                                                      partition_mb_sec=entry["partition_mb_sec"],
+                                                                      consumers=entry["consumers"]))
+
+        if partitions < 1:
+            raise Exception(f"{entry['name']}: partitions must be at least 1, not {partitions}")
+
+        configs = {config: _config_value(entry[key])
+                   for key, config in CONFIG_KEYS.items()
+                   if entry.get(key) is not None}
+
+        # one replica may be down without producers with acks=all failing
+        configs.setdefault("min.insync.replicas", str(max(replication_factor - 1, 1)))
+        configs.update({key: _config_value(value) for key, value in entry.get("configs", {}).items()})
+
+        for name in expand_name(entry["name"]):
+            if name in desired:
+                raise Exception(f"topic {name} is in the spec more than once")
+
+            desired[name] = {
+                "partitions": partitions,
+                "replication_factor": replication_factor,
+                "configs": configs
+            }
+
+    return desired
+
+
+def _parse_configs(value):
+    """
+    Parse the Configs field of a topic - values may hold commas, so a
+    piece without = belongs to the previous value.
+    """
+    configs = {}
+    key = None
+
+    for piece in value.split(","):
+        piece = piece.strip()
+
+        if "=" in piece:
+            key, _value = piece.split("=", 1)
+            configs[key] = _value
+        elif key and piece:
+            configs[key] += f",{piece}"
+
+    return configs
+
+
+def parse_topics_describe(output):
+    """
+    Parse the topic lines of `kafka-topics --describe` into topic to
+    {"partitions", "replication_factor", "configs"}.
+    """
+    topics = {}
+
+    for line in output.splitlines():
+        match = TOPIC_HEADER_RE.match(line.strip())
+
+        if not match:
+            continue
+
+        topic, partitions, replication_factor, configs = match.groups()
+        topics[topic] = {
+            "partitions": int(partitions),
+            "replication_factor": int(replication_factor),
+            "configs": _parse_configs(configs)
+        }
+
+    return topics
+
+
+def plan_topics(desired, current):
+    """
+    Diff the desired topics against the current ones.
+
+    Only missing topics, topics with fewer partitions than wanted and
+    configs that differ are planned.  Partitions are never removed and
+    the replication factor is never changed (that is a reassignment) -
+    those topics are reported as conflicts.  Config overrides not in
+    the spec are left in place.
+
+    Returns:
+        dict: create, add_partitions, alter_configs, conflicts and the
+            number of unchanged topics
+    """
+    plan = {"create": [], "add_partitions": [], "alter_configs": [], "conflicts": [], "unchanged": 0}
+
+    for topic, want in sorted(desired.items()):
+        have = current.get(topic)
+
+        if have is None:
+            plan["create"].append(dict(want, topic=topic))
+            continue
+
+        changed = False
+
+        if want["partitions"] > have["partitions"]:
+            plan["add_partitions"].append({"topic": topic,
+                                           "partitions": want["partitions"],
+                                           "current": have["partitions"]})
+            changed = True
+        elif want["partitions"] < have["partitions"]:
+            plan["conflicts"].append(f"{topic}: has {have['partitions']} partitions, "
+                                     f"spec asks for {want['partitions']} - partitions are never removed")
+
+        if want["replication_factor"] != have["replication_factor"]:
+            plan["conflicts"].append(f"{topic}: replication factor is {have['replication_factor']}, "
+                                     f"spec asks for {want['replication_factor']} - needs a reassignment")
+
+        configs = {key: value for key, value in want["configs"].items()
+                   if have["configs"].get(key) != value}
+
+        if configs:
+            plan["alter_configs"].append({"topic": topic, "configs": configs})
+            changed = True
+
+        if not changed:
+            plan["unchanged"] += 1
+
+    return plan
+
+
+def _config_arg(key, value):
+    # list values are bracketed for kafka-configs
+    return f"{key}=[{value}]" if "," in value else f"{key}={value}"
+
+
+def get_plan_commands(plan, connect_args):
+    """
+    Return the commands of the plan as stages - creates, partition
+    additions and config changes.  The commands of a stage do not
+    depend on each other.
+    """
+    topics = ["kafka-topics"] + connect_args
+    configs = ["kafka-configs"] + connect_args
+
+    create = []
+
+    for topic in plan["create"]:
+        command = topics + ["--create", "--if-not-exists",
+                            "--topic", topic["topic"],
+                            "--partitions", str(topic["partitions"]),
+                            "--replication-factor", str(topic["replication_factor"])]
+
+        for key, value in sorted(topic["configs"].items()):
+            command += ["--config", f"{key}={value}"]
+
+        create.append(command)
+
+    add_partitions = [topics + ["--alter", "--topic", topic["topic"], "--partitions", str(topic["partitions"])]
+                      for topic in plan["add_partitions"]]
+
+    alter_configs = [configs + ["--alter", "--entity-type", "topics", "--entity-name", topic["topic"],
+                                "--add-config", ",".join(_config_arg(key, value)
+                                                         for key, value in sorted(topic["configs"].items()))]
+                     for topic in plan["alter_configs"]]
+
+    return [stage for stage in (create, add_partitions, alter_configs) if stage]
+
+
+def _run(command):
+    result = subprocess.run(command,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT,
+                            universal_newlines=True)
+
+    if result.returncode != 0:
+        return f"{' '.join(command[:1] + command[-4:])}: {result.stdout.strip()[-300:]}"
+
+    return None
+
+
+def apply_stages(stages, workers=8, batch_size=50):
+    """
+    Run the stages in order, the commands of each stage concurrently in
+    batches.  Returns the error messages of failed commands.
+    """
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for stage in stages:
+            for idx in range(0, len(stage), batch_size):
+                errors.extend(error for error in executor.map(_run, stage[idx:idx + batch_size]) if error)
+
+            # later stages assume the earlier ones took effect
+            if errors:
+                break
+
+    return errors
+
+
+def _connect_args(args):
+    if args.bootstrap_server:
+        connect_args = ["--bootstrap-server", args.bootstrap_server]
+
+        if args.command_config:
+            connect_args += ["--command-config", args.command_config]
+
+        return connect_args
+
+    if args.zookeeper:
+        return ["--zookeeper", args.zookeeper]
+
+    return []
+
+
+def _load_spec(value):
+    if value.lstrip().startswith(("{", "[")):
+        return json.loads(value)
+
+    with open(value) as spec_file:
+        return json.load(spec_file)
+
+
+def _summary(plan, **extra):
+    summary = {
+        "create": [topic["topic"] for topic in plan["create"]],
+        "add_partitions": plan["add_partitions"],
+        "alter_configs": plan["alter_configs"],
+        "conflicts": plan["conflicts"],
+        "unchanged": plan["unchanged"],
+        "changes": len(plan["create"]) + len(plan["add_partitions"]) + len(plan["alter_configs"])
+    }
+
+    summary.update(extra)
+
+    return summary
+
+
+def run_plan(args):
+    with open(args.describe) as describe_file:
+        current = parse_topics_describe(describe_file.read())
+
+    plan = plan_topics(expand_spec(_load_spec(args.spec), args.brokers), current)
+    stages = get_plan_commands(plan, _connect_args(args))
+
+    print(json.dumps(_summary(plan, applied=False, commands=[" ".join(command)
+                                                             for stage in stages
+                                                             for command in stage])))
+
+    return 0
+
+
+def run_apply(args):
+    connect_args = _connect_args(args)
+
+    if not connect_args:
+        raise Exception("--bootstrap-server or --zookeeper is required")
+
+    # the spec is checked before the cluster is queried
+    desired = expand_spec(_load_spec(args.spec), args.brokers)
+
+    describe = subprocess.run(["kafka-topics"] + connect_args + ["--describe"],
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE,
+                              universal_newlines=True)
+
+    if describe.returncode != 0:
+        raise Exception(f"kafka-topics --describe failed: {describe.stderr.strip()[-500:]}")
+
+    plan = plan_topics(desired, parse_topics_describe(describe.stdout))
+    stages = get_plan_commands(plan, connect_args)
+
+    errors = [] if args.dry_run else apply_stages(stages, workers=args.workers, batch_size=args.batch_size)
+
+    print(json.dumps(_summary(plan, applied=not args.dry_run, errors=errors)))
+
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kafka declarative topic planner")
+    subparsers = parser.add_subparsers(dest="command")
+
+    plan_parser = subparsers.add_parser("plan", help="plan from captured kafka-topics --describe output")
+    plan_parser.add_argument("--describe", required=True, help="output of kafka-topics --describe")
+
+    apply_parser = subparsers.add_parser("apply", help="describe the cluster and apply the plan")
+    apply_parser.add_argument("--dry-run", action="store_true", help="print the plan without applying it")
+    apply_parser.add_argument("--workers", type=int, default=8, help="admin commands run at the same time")
+    apply_parser.add_argument("--batch-size", type=int, default=50)
+
+    for _parser in (plan_parser, apply_parser):
+        _parser.add_argument("--spec", required=True, help="JSON (or file) of the topic spec")
+        _parser.add_argument("--brokers", type=int, required=True, help="number of brokers")
+        _parser.add_argument("--bootstrap-server", default=None)
+        _parser.add_argument("--zookeeper", default=None)
+        _parser.add_argument("--command-config", default=None, help="client properties for TLS/SASL listeners")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "plan":
+        return run_plan(args)
+
+    if args.command == "apply":
+        return run_apply(args)
+
+    parser.print_help()
+    return 4
+
+
+if __name__ == '__main__':
+    sys.exit(main())
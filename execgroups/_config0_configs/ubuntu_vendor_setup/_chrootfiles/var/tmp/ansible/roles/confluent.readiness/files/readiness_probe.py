@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------------------------
+# Service Readiness Prober
+# ------------------------------------------------------------------------------
+# Polls every check of every target at the same time from the Ansible host
+# and returns as soon as all of them pass.  A check is retried with a capped,
+# jittered exponential backoff until it passes, the deadline runs out, or
+# the service accepted connections but did not serve within the serve
+# grace, so a host that comes up but never serves fails early.
+#
+# Checks:
+#   ssh             the ssh banner is sent
+#   tcp             the port accepts connections (and completes TLS)
+#   ruok            ZooKeeper answers ruok with imok and srvr with its mode
+#   kafka_metadata  the broker returns cluster metadata with a controller
+#                   and at least min_brokers registered brokers
+#   http            GET path answers 200
+#
+#   readiness_probe.py --targets JSON [--timeout 600] [--serve-grace 180]
+#                      [--ca-file FILE --cert-file FILE --key-file FILE]
+# ------------------------------------------------------------------------------
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ------------------------------------------------------------------------------
+
+import ssl
+import sys
+import json
+import random
+import struct
+import asyncio
+import argparse
+
+# Kafka Metadata v4 - the oldest version still served by Kafka 4
+KAFKA_METADATA_API_KEY = 3
+KAFKA_METADATA_API_VERSION = 4
+KAFKA_CLIENT_ID = b"readiness-probe"
+
+
+class NotServing(Exception):
+    """The service accepted the connection but did not serve."""
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1")
+
+    return bool(value)
+
+
+async def _open(target, connect_timeout, ssl_context):
+    """
+    Connect to the target, with TLS when the target asks for it.
+
+    A failed TLS handshake means the port is up but the listener does
+    not serve this client, so it is reported as NotServing.
+    """
+    use_ssl = _to_bool(target.get("ssl"))
+
+    try:
+        return await asyncio.wait_for(
+            asyncio.open_connection(target["host"], int(target["port"]),
+                                    ssl=ssl_context if use_ssl else None),
+            connect_timeout)
+    except ssl.SSLError as error:
+        raise NotServing(f"TLS handshake failed: {error}")
+
+
+async def _close(writer):
+    writer.close()
+
+    try:
+        await writer.wait_closed()
+    except (OSError, ssl.SSLError):
+        pass
+
+
+async def _read(coro, connect_timeout, what):
+    """Await a read, turning a silent or dropped connection into NotServing."""
+    try:
+        return await asyncio.wait_for(coro, connect_timeout)
+    except asyncio.TimeoutError:
+        raise NotServing(f"no {what} within {connect_timeout}s")
+    except (asyncio.IncompleteReadError, ConnectionError) as error:
+        raise NotServing(f"connection dropped before the {what}: {error}")
+
+
+async def check_tcp(target, connect_timeout, ssl_context):
+    _, writer = await _open(target, connect_timeout, ssl_context)
+    await _close(writer)
+
+    return "accepting connections"
+
+
+async def check_ssh(target, connect_timeout, ssl_context):
+    reader, writer = await _open(target, connect_timeout, ssl_context)
+
+    try:
+        banner = await _read(reader.readline(), connect_timeout, "ssh banner")
+    finally:
+        await _close(writer)
+
+    banner = banner.decode(errors="replace").strip()
+
+    if not banner.startswith("SSH-"):
+        raise NotServing(f"unexpected ssh banner {banner!r}")
+
+    return banner
+
+
+async def _four_letter_word(target, word, connect_timeout, ssl_context):
+    reader, writer = await _open(target, connect_timeout, ssl_context)
+
+    try:
+        writer.write(word.encode())
+        await writer.drain()
+
+        return (await _read(reader.read(), connect_timeout, f"{word} answer")).decode(errors="replace")
+    finally:
+        await _close(writer)
+
+
+async def check_ruok(target, connect_timeout, ssl_context):
+    """
+    ruok only says the process runs - srvr is asked as well, as it only
+    reports a mode once the server is part of a quorum.
+    """
+    answer = await _four_letter_word(target, "ruok", connect_timeout, ssl_context)
+
+    if answer.strip() != "imok":
+        raise NotServing(f"ruok answered {answer.strip()!r} - is ruok in 4lw.commands.whitelist?")
+
+    answer = await _four_letter_word(target, "srvr", connect_timeout, ssl_context)
+
+    for line in answer.splitlines():
+        if line.startswith("Mode:"):
+            return f"imok, {line.strip()}"
+
+    raise NotServing(f"srvr answered {answer.strip()!r}")
+
+
+def _kafka_metadata_request(correlation_id):
+    """Metadata v4 request for no topics, with a v1 request header."""
+    body = struct.pack(">hhih", KAFKA_METADATA_API_KEY, KAFKA_METADATA_API_VERSION,
+                       correlation_id, len(KAFKA_CLIENT_ID))
+    body += KAFKA_CLIENT_ID
+    # empty topic array, allow_auto_topic_creation false
+    body += struct.pack(">ib", 0, 0)
+
+    return struct.pack(">i", len(body)) + body
+
+
+def parse_kafka_metadata(payload, correlation_id):
+    """
+    Return (broker ids, controller id) from a Metadata v4 response
+    without its size prefix.
+    """
+    offset = 0
+
+    def _unpack(fmt):
+        nonlocal offset
+        values = struct.unpack_from(fmt, payload, offset)
+        offset += struct.calcsize(fmt)
+        return values
+
+    def _string():
+        nonlocal offset
+        (length,) = _unpack(">h")
+
+        if length < 0:
+            return None
+
+        offset += length
+        return payload[offset - length:offset].decode(errors="replace")
+
+    (response_id, _throttle_time_ms, broker_count) = _unpack(">iii")
+
+    if response_id != correlation_id:
+        raise NotServing(f"metadata response for correlation id {response_id}, expected {correlation_id}")
+
+    brokers = []
+
+    for _ in range(broker_count):
+        (node_id,) = _unpack(">i")
+        _string()
+        _unpack(">i")
+        _string()
+        brokers.append(node_id)
+
+    # cluster id
+    _string()
+    (controller_id,) = _unpack(">i")
+
+    return brokers, controller_id
+
+
+async def check_kafka_metadata(target, connect_timeout, ssl_context):
+    correlation_id = random.randint(1, 2 ** 31 - 1)
+    min_brokers = int(target.get("min_brokers") or 1)
+
+    reader, writer = await _open(target, connect_timeout, ssl_context)
+
+    try:
+        writer.write(_kafka_metadata_request(correlation_id))
+        await writer.drain()
+
+        (size,) = struct.unpack(">i", await _read(reader.readexactly(4), connect_timeout, "metadata response"))
+        payload = await _read(reader.readexactly(size), connect_timeout, "metadata response")
+    finally:
+        await _close(writer)
+
+    try:
+        brokers, controller_id = parse_kafka_metadata(payload, correlation_id)
+    except struct.error as error:
+        raise NotServing(f"malformed metadata response: {error}")
+
+    if controller_id < 0:
+        raise NotServing(f"no active controller, {len(brokers)} brokers registered")
+
+    if len(brokers) < min_brokers:
+        raise NotServing(f"{len(brokers)} of {min_brokers} brokers registered")
+
+    return f"controller {controller_id}, {len(brokers)} brokers registered"
+
+
+async def check_http(target, connect_timeout, ssl_context):
+    path = target.get("path") or "/"
+    reader, writer = await _open(target, connect_timeout, ssl_context)
+
+    try:
+        writer.write((f"GET {path} HTTP/1.1\r\n"
+                      f"Host: {target['host']}:{target['port']}\r\n"
+                      "Accept: */*\r\n"
+                      "Connection: close\r\n\r\n").encode())
+        await writer.drain()
+
+        status_line = await _read(reader.readline(), connect_timeout, "HTTP status")
+    finally:
+        await _close(writer)
+
+    status_line = status_line.decode(errors="replace").strip()
+
+    # also how a TLS listener turns away a client certificate it does not trust
+    if not status_line:
+        raise NotServing(f"GET {path} closed without an answer")
+
+    parts = status_line.split(" ", 2)
+
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise NotServing(f"GET {path} answered {status_line!r}")
+
+    if parts[1] != "200":
+        raise NotServing(f"GET {path} answered {status_line}")
+
+    return status_line
+
+
+CHECKS = {
+    "tcp": check_tcp,
+    "ssh": check_ssh,
+    "ruok": check_ruok,
+    "kafka_metadata": check_kafka_metadata,
+    "http": check_http
+}
+
+
+async def probe(target, timeout=600, serve_grace=180, initial_delay=0.5, max_delay=10,
+                connect_timeout=5, ssl_context=None):
+    """
+    Poll one check of a target until it passes or gives up.
+
+    Refused and timed out connections mean the service is not up yet
+    and are retried until the timeout.  Once the service has accepted
+    a connection, failures count against the serve grace instead, so
+    a service that is up but not serving gives up early.
+
+    Returns the target with ready, elapsed, attempts and the detail of
+    the passing check or the last error.
+    """
+    check = CHECKS[target["check"]]
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + timeout
+    first_served = None
+    delay = initial_delay
+    attempts = 0
+
+    while True:
+        attempts += 1
+
+        try:
+            detail = await check(target, connect_timeout, ssl_context)
+            ready = True
+        except NotServing as error:
+            ready = False
+            detail = str(error)
+
+            if first_served is None:
+                first_served = loop.time()
+        except (OSError, asyncio.TimeoutError) as error:
+            ready = False
+            detail = f"not accepting connections: {str(error) or type(error).__name__}"
+
+        now = loop.time()
+
+        if ready:
+            break
+
+        if first_served is not None and now - first_served >= serve_grace:
+            detail = f"up but not serving for {round(now - first_served)}s: {detail}"
+            break
+
+        if now >= deadline:
+            detail = f"not ready after {timeout}s: {detail}"
+            break
+
+        give_up = deadline if first_served is None else min(deadline, first_served + serve_grace)
+
+        await asyncio.sleep(min(random.uniform(delay / 2, delay), max(give_up - now, 0)))
+        delay = min(delay * 2, max_delay)
+
+    return dict(target,
+                ready=ready,
+                elapsed=round(loop.time() - started, 3),
+                attempts=attempts,
+                detail=detail)
+
+
+async def probe_targets(targets, **kwargs):
+    """Probe all targets at the same time."""
+    return await asyncio.gather(*(probe(target, **kwargs) for target in targets))
+
+
+def get_service_status(results):
+    """
+    Pass/fail and seconds to ready per service and host - a service with
+    several checks is ready when all of them are, after the slowest one.
+
+    Returns:
+        dict: {service: {host: {"ready": bool, "seconds": float}}}
+    """
+    services = {}
+
+    for result in results:
+        service = result.get("service", result["check"])
+        status = services.setdefault(service, {}).setdefault(result["host"], {"ready": True, "seconds": 0})
+        status["ready"] = status["ready"] and result["ready"]
+        status["seconds"] = max(status["seconds"], result["elapsed"])
+
+    return services
+
+
+def get_ssl_context(ca_file=None, cert_file=None, key_file=None):
+    """
+    TLS context trusting the cluster CA, presenting a client certificate
+    for listeners with mutual auth.  Host names are not verified - the
+    probe only asks whether the service serves.
+    """
+    context = ssl.create_default_context(cafile=ca_file or None)
+    context.check_hostname = False
+
+    if not ca_file:
+        context.verify_mode = ssl.CERT_NONE
+
+    if cert_file:
+        context.load_cert_chain(cert_file, key_file or None)
+
+    return context
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wait until services are ready to serve")
+    parser.add_argument("--targets", required=True,
+                        help="JSON list of {host, service, check, port, ...}")
+    parser.add_argument("--timeout", type=float, default=600,
+                        help="seconds to wait for a service to come up")
+    parser.add_argument("--serve-grace", type=float, default=180,
+                        help="seconds a service may accept connections without serving")
+    parser.add_argument("--initial-delay", type=float, default=0.5)
+    parser.add_argument("--max-delay", type=float, default=10)
+    parser.add_argument("--connect-timeout", type=float, default=5)
+    parser.add_argument("--ca-file")
+    parser.add_argument("--cert-file")
+    parser.add_argument("--key-file")
+    args = parser.parse_args(argv)
+
+    targets = json.loads(args.targets)
+
+    unknown = sorted({target.get("check") for target in targets} - set(CHECKS))
+
+    if unknown:
+        parser.error(f"unknown checks {unknown}, expected one of {sorted(CHECKS)}")
+
+    results = asyncio.run(probe_targets(targets,
+                                        timeout=args.timeout,
+                                        serve_grace=args.serve_grace,
+                                        initial_delay=args.initial_delay,
+                                        max_delay=args.max_delay,
+                                        connect_timeout=args.connect_timeout,
+                                        ssl_context=get_ssl_context(args.ca_file, args.cert_file, args.key_file)))
+
+    ready = all(result["ready"] for result in results)
+
+    json.dump({"ready": ready,
+               "elapsed": max([result["elapsed"] for result in results] or [0]),
+               "services": get_service_status(results),
+               "checks": results}, sys.stdout, indent=2)
+
+    return 0 if ready else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------------------------
+# Self Signed Certificate Generator
+# ------------------------------------------------------------------------------
+# Runs on the Ansible control node. Creates (or reuses) the self signed CA
+# and signs a key and certificate for every host in parallel, so the RSA key
+# generation does not run serially on each host.
+#
+# Generated material is cached per host. A host is only re-keyed when its
+# certificate is missing, no longer matches its SAN, was not issued by the
+# current CA, or is close to expiry - unchanged hosts are skipped so re-runs
+# do not trigger broker restarts.
+#
+# Output is a JSON summary of the generated and reused hosts on stdout.
+# ------------------------------------------------------------------------------
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import secrets
+import argparse
+import ipaddress
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+CA_SUBJECT = "/CN=ca1.test.confluent.io/OU=TEST/O=CONFLUENT/L=PaloAlto/ST=Ca/C=US"
+HOST_SUBJECT = "/CN={host}/OU=TEST/O=CONFLUENT/L=PaloAlto/ST=Ca/C=US"
+
+
+def _openssl(*args):
+    """Run openssl and return its stdout, raising on failure."""
+    result = subprocess.run(["openssl"] + list(args),
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE,
+                            universal_newlines=True)
+
+    if result.returncode != 0:
+        raise Exception(f"openssl {args[0]} failed: {result.stderr.strip()}")
+
+    return result.stdout
+
+
+def _expires_within(cert_path, seconds):
+    """Return True if the certificate expires within the given seconds."""
+    result = subprocess.run(["openssl", "x509", "-noout", "-checkend", str(seconds), "-in", cert_path],
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+    return result.returncode != 0
+
+
+def _get_san(host):
+    """Return the subjectAltName entry for a host name or IP."""
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return f"DNS:{host}"
+
+    return f"IP:{host},DNS:{host}"
+
+
+def ensure_ca(ca_dir, key_file, cert_file, password, days, renew_secs, regenerate=False):
+    """
+    Create the CA unless a cached one exists that is not close to expiry.
+
+    Returns True if a new CA was created.
+    """
+    key_path = os.path.join(ca_dir, key_file)
+    cert_path = os.path.join(ca_dir, cert_file)
+
+    if (not regenerate
+            and os.path.exists(key_path)
+            and os.path.exists(cert_path)
+            and not _expires_within(cert_path, renew_secs)):
+        return False
+
+    os.makedirs(ca_dir, exist_ok=True)
+
+    _openssl("req", "-new", "-x509",
+             "-keyout", key_path,
+             "-out", cert_path,
+             "-days", str(days),
+             "-subj", CA_SUBJECT,
+             "-passin", f"pass:{password}",
+             "-passout", f"pass:{password}")
+
+    return True
+
+
+def _host_is_current(host_dir, host, ca_cert_path, renew_secs):
+    """Check the cached host certificate is still usable as is."""
+    key_path = os.path.join(host_dir, "key.pem")
+    cert_path = os.path.join(host_dir, "cert.pem")
+    san_path = os.path.join(host_dir, "san")
+
+    if not all(os.path.exists(path) for path in (key_path, cert_path, san_path)):
+        return False
+
+    with open(san_path) as san_file:
+        if san_file.read().strip() != _get_san(host):
+            return False
+
+    if _expires_within(cert_path, renew_secs):
+        return False
+
+    result = subprocess.run(["openssl", "verify", "-CAfile", ca_cert_path, cert_path],
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+
+    return result.returncode == 0
+
+
+def generate_host(host, hosts_dir, ca_key_path, ca_cert_path, ca_password, days, renew_secs):
+    """
+    Generate a key and CA signed certificate for a host unless the
+    cached one is still current.
+
+    Returns (host, generated).
+    """
+    host_dir = os.path.join(hosts_dir, host)
+
+    if _host_is_current(host_dir, host, ca_cert_path, renew_secs):
+        return host, False
+
+    os.makedirs(host_dir, exist_ok=True)
+
+    # cleared first so partial material is never taken as current
+    if os.path.exists(os.path.join(host_dir, "san")):
+        os.remove(os.path.join(host_dir, "san"))
+
+    key_path = os.path.join(host_dir, "key.pem")
+    csr_path = os.path.join(host_dir, "host.csr")
+    cert_path = os.path.join(host_dir, "cert.pem")
+    ext_path = os.path.join(host_dir, "san.ext")
+    san = _get_san(host)
+
+    with open(ext_path, "w") as ext_file:
+        ext_file.write(f"subjectAltName={san}\n")
+
+    _openssl("req", "-new", "-nodes",
+             "-newkey", "rsa:2048",
+             "-keyout", key_path,
+             "-out", csr_path,
+             "-subj", HOST_SUBJECT.format(host=host))
+
+    _openssl("x509", "-req",
+             "-CA", ca_cert_path,
+             "-CAkey", ca_key_path,
+             "-set_serial", f"0x{secrets.token_hex(16)}",
+             "-in", csr_path,
+             "-out", cert_path,
+             "-days", str(days),
+             "-extfile", ext_path,
+             "-passin", f"pass:{ca_password}")
+
+    os.chmod(key_path, 0o600)
+
+    # written last - marks the host material as complete
+    with open(os.path.join(host_dir, "san"), "w") as san_file:
+        san_file.write(san)
+
+    os.remove(csr_path)
+    os.remove(ext_path)
+
+    return host, True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate self signed CA and host certificates")
+    parser.add_argument("--ssl-dir", required=True, help="cache directory for the CA and host material")
+    parser.add_argument("--hosts", required=True, help="comma separated inventory hostnames")
+    parser.add_argument("--ca-key-file", default="snakeoil-ca-1.key")
+    parser.add_argument("--ca-cert-file", default="snakeoil-ca-1.crt")
+    parser.add_argument("--ca-password", required=True)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--renew-days", type=int, default=30,
+                        help="re-issue certificates expiring within this many days")
+    parser.add_argument("--regenerate-ca", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args(argv)
+
+    hosts = sorted(set(host.strip() for host in args.hosts.split(",") if host.strip()))
+    renew_secs = args.renew_days * 86400
+
+    ca_created = ensure_ca(args.ssl_dir,
+                           args.ca_key_file,
+                           args.ca_cert_file,
+                           args.ca_password,
+                           args.days,
+                           renew_secs,
+                           regenerate=args.regenerate_ca)
+
+    ca_key_path = os.path.join(args.ssl_dir, args.ca_key_file)
+    ca_cert_path = os.path.join(args.ssl_dir, args.ca_cert_file)
+    hosts_dir = os.path.join(args.ssl_dir, "hosts")
+
+    # the key generation runs in openssl child processes, so threads
+    # are enough to keep every worker busy
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+        results = list(executor.map(lambda host: generate_host(host,
+                                                               hosts_dir,
+                                                               ca_key_path,
+                                                               ca_cert_path,
+                                                               args.ca_password,
+                                                               args.days,
+                                                               renew_secs),
+                                    hosts))
+
+    summary = {
+        "ca_created": ca_created,
+        "generated": [host for host, generated in results if generated],
+        "reused": [host for host, generated in results if not generated]
+    }
+
+    print(json.dumps(summary))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,6 +15,253 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+# instance type -> (vcpus, memory in MiB, network bandwidth in Gbps) -
+# the authoritative table: _INSTANCE_CAPACITY of kafka_on_ec2 copies the
+# vcpus and memory of the types it can pack shared hosts on
+_INSTANCE_TYPES = {
+    "t3.micro": (2, 1024, 5),
+    "t3.small": (2, 2048, 5),
+    "t3.medium": (2, 4096, 5),
+    "t3.large": (2, 8192, 5),
+    "t3.xlarge": (4, 16384, 5),
+    "t3.2xlarge": (8, 32768, 5),
+    "m5.large": (2, 8192, 10),
+    "m5.xlarge": (4, 16384, 10),
+    "m5.2xlarge": (8, 32768, 10),
+    "m5.4xlarge": (16, 65536, 10),
+    "m5.8xlarge": (32, 131072, 10),
+    "m5.12xlarge": (48, 196608, 12),
+    "m5.16xlarge": (64, 262144, 20),
+    "m6i.large": (2, 8192, 12),
+    "m6i.xlarge": (4, 16384, 12),
+    "m6i.2xlarge": (8, 32768, 15),
+    "m6i.4xlarge": (16, 65536, 12),
+    "m6i.8xlarge": (32, 131072, 12),
+    "m6i.12xlarge": (48, 196608, 18),
+    "m6i.16xlarge": (64, 262144, 25),
+    "r5.large": (2, 16384, 10),
+    "r5.xlarge": (4, 32768, 10),
+    "r5.2xlarge": (8, 65536, 10),
+    "r5.4xlarge": (16, 131072, 10),
+    "r5.8xlarge": (32, 262144, 10),
+    "r5.16xlarge": (64, 524288, 20),
+    "r6i.large": (2, 16384, 12),
+    "r6i.xlarge": (4, 32768, 12),
+    "r6i.2xlarge": (8, 65536, 15),
+    "r6i.4xlarge": (16, 131072, 12),
+    "r6i.8xlarge": (32, 262144, 12),
+    "r6i.16xlarge": (64, 524288, 25),
+    "c5.large": (2, 4096, 10),
+    "c5.xlarge": (4, 8192, 10),
+    "c5.2xlarge": (8, 16384, 10),
+    "c5.4xlarge": (16, 32768, 10),
+    "c5.9xlarge": (36, 73728, 12),
+    "i3en.large": (2, 16384, 25),
+    "i3en.xlarge": (4, 32768, 25),
+    "i3en.2xlarge": (8, 65536, 25),
+    "i3en.3xlarge": (12, 98304, 25),
+    "i3en.6xlarge": (24, 196608, 25)
+}
+
+# memory kept back for the OS and agents on every host
+_OS_RESERVED_MB = 512
+
+# round trip time used for the socket buffer bandwidth-delay product
+_REPLICATION_RTT_SECS = 0.002
+
+# host groups that take sizing variables
+_SIZING_GROUPS = ("kafka_broker", "zookeeper", "kafka_connect",
+                  "schema_registry", "kafka_rest", "ksql", "control_center")
+
+# host group sized from the instance type of each server type
+_SIZED_SERVER_TYPES = {
+    "kafka_broker": "broker",
+    "zookeeper": "zookeeper",
+    "kafka_connect": "connect"
+}
+
+# Ansible forks on the bastion - one per host within these bounds
+_MIN_FORKS = 5
+_MAX_FORKS = 50
+
+def _clamp(value, minimum, maximum):
+    return max(minimum, min(maximum, value))
+
+def _get_role_sizing(instance_type, data_dirs=1):
+    """
+    Derive JVM heap, thread pool and socket buffer settings for each
+    Ansible host group from the instance type's vCPUs, memory and
+    network bandwidth.
+
+    Log recovery threads are spread over the broker data dirs so that
+    every volume recovers in parallel after an unclean shutdown.
+
+    Returns None if the instance type is not in the bundled table.
+    """
+    try:
+        vcpus, memory_mb, bandwidth_gbps = _INSTANCE_TYPES[instance_type]
+    except KeyError:
+        return None
+
+    usable_mb = max(memory_mb - _OS_RESERVED_MB, 256)
+
+    # brokers rely on the page cache, so the heap stays small and
+    # never goes beyond 6g - the remainder is left to the page cache
+    broker_heap_mb = _clamp(usable_mb // 4, 256, 6144)
+    socket_buffer_bytes = _clamp(int(bandwidth_gbps * 1e9 / 8 * _REPLICATION_RTT_SECS),
+                                 102400,
+                                 8388608)
+
+    zookeeper_heap_mb = _clamp(usable_mb // 2, 256, 4096)
+    connect_heap_mb = _clamp(usable_mb // 2, 256, 8192)
+
+    return {
+        "kafka_broker": {
+            "kafka_broker_heap_opts": f"-Xms{broker_heap_mb}m -Xmx{broker_heap_mb}m",
+            "kafka_broker_page_cache_mb": usable_mb - broker_heap_mb,
+            "kafka_broker_num_network_threads": max(3, vcpus // 2),
+            "kafka_broker_num_io_threads": _clamp(vcpus * 2, 8, 64),
+            "kafka_broker_num_recovery_threads_per_data_dir": _clamp(vcpus // data_dirs, 1, 16),
+            "kafka_broker_num_replica_fetchers": _clamp(vcpus // 8, 1, 8),
+            "kafka_broker_socket_send_buffer_bytes": socket_buffer_bytes,
+            "kafka_broker_socket_receive_buffer_bytes": socket_buffer_bytes
+        },
+        "zookeeper": {
+            "zookeeper_heap_opts": f"-Xms{zookeeper_heap_mb}m -Xmx{zookeeper_heap_mb}m"
+        },
+        "kafka_connect": {
+            "kafka_connect_heap_opts": f"-Xms256m -Xmx{connect_heap_mb}m"
+        }
+    }
+
+def _get_sizing(stack):
+    """
+    Return the per host group sizing variables for the instance type
+    of each server type (instance_types, else instance_type), with any
+    user provided overrides applied on top.
+
+    Overrides are keyed by Ansible variable name, e.g.
+    {"kafka_broker_num_io_threads": 32}.
+    """
+    import json
+
+    sizing = {}
+    instance_types = _load_json_var(stack.instance_types)
+
+    for group, server_type in _SIZED_SERVER_TYPES.items():
+        instance_type = instance_types.get(server_type) or stack.instance_type
+
+        if not instance_type:
+            continue
+
+        role_sizing = _get_role_sizing(instance_type,
+                                       data_dirs=max(int(stack.broker_data_volumes or 0), 1))
+
+        if role_sizing is None:
+            stack.logger.debug(f"instance_type {instance_type} not in sizing table - using {group} defaults")
+            continue
+
+        sizing[group] = role_sizing[group]
+
+    if not stack.sizing_overrides:
+        return sizing
+
+    overrides = stack.sizing_overrides
+
+    if isinstance(overrides, str):
+        overrides = json.loads(overrides)
+
+    for key, value in overrides.items():
+        group = next((_group for _group in _SIZING_GROUPS if key.startswith(f"{_group}_")), None)
+
+        if not group:
+            raise Exception(f"sizing override {key} must be prefixed with one of: {', '.join(_SIZING_GROUPS)}")
+
+        sizing.setdefault(group, {})[key] = value
+
+    return sizing
+
+# install phase playbook -> playbooks it depends on
+_INSTALL_PHASES = {
+    "entry_point/20-prereq.yml": [],
+    "entry_point/30-zookeeper.yml": ["entry_point/20-prereq.yml"],
+    "entry_point/40-broker.yml": ["entry_point/30-zookeeper.yml"],
+    "entry_point/50-schema.yml": ["entry_point/40-broker.yml"],
+    "entry_point/60-connect.yml": ["entry_point/40-broker.yml"],
+    "entry_point/70-ksql.yml": ["entry_point/40-broker.yml"],
+    "entry_point/80-rest.yml": ["entry_point/40-broker.yml"],
+    "entry_point/90-control.yml": ["entry_point/50-schema.yml",
+                                   "entry_point/60-connect.yml",
+                                   "entry_point/70-ksql.yml",
+                                   "entry_point/80-rest.yml"]
+}
+
+# phases that run once the cluster is up, in this order - the metrics
+# targets are written last, after the reassignment and benchmark
+_FINAL_PHASES = ("entry_point/95-reassign.yml",
+                 "entry_point/96-benchmark.yml",
+                 "entry_point/97-metrics.yml")
+
+def _add_final_phases(install_phases, final_phases):
+    """
+    Add the enabled final phases to the install phases, each one
+    depending on every phase before it.
+    """
+    for phase in _FINAL_PHASES:
+        if phase in final_phases:
+            install_phases[phase] = list(install_phases)
+
+    return install_phases
+
+def _get_install_waves(phases, parallel=True):
+    """
+    Order the install phases into waves from their dependencies.
+
+    Every phase in a wave only depends on phases in earlier waves, so
+    the phases of a wave can run at the same time against their own
+    host groups.  A wave with more than one phase is run through a
+    generated playbook, entry_point/wave-<n>.yml, which the Ansible
+    setup step builds from the phase playbooks.
+
+    With parallel disabled, every phase is its own wave.
+
+    Returns a list of {"playbook": ..., "phases": [...]}.
+    """
+    remaining = {phase: set(deps) for phase, deps in phases.items()}
+    done = set()
+    waves = []
+
+    while remaining:
+        ready = sorted(phase for phase, deps in remaining.items() if deps <= done)
+
+        if not ready:
+            raise Exception(f"install phases have a dependency cycle: {', '.join(sorted(remaining))}")
+
+        if not parallel:
+            ready = ready[:1]
+
+        if len(ready) == 1:
+            playbook = ready[0]
+        else:
+            playbook = f"entry_point/wave-{len(waves)}.yml"
+
+        waves.append({"playbook": playbook, "phases": ready})
+
+        for phase in ready:
+            del remaining[phase]
+            done.add(phase)
+
+    return waves
+
+def _label_phase(env_vars, human_description):
+    """
+    Label the provision_profiler timings of a bastion phase with its
+    description - the profiler totals its playbook runs per phase.
+    """
+    env_vars["PROVISION_PROFILE_PHASE"] = human_description
+
+    return env_vars
+
 def _get_ssh_key(stack):
     _lookup = {
         "must_exists": True,
@@ -25,22 +272,338 @@ def _get_ssh_key(stack):
     }
     return stack.get_resource(decrypt=True, **_lookup)["private_key"]
 
-def _get_private_ips_frm_hosts(hosts, stack):
-    _lookup = {
-        "must_exists": True,
-        "must_be_one": True,
-        "resource_type": "server"
+def _get_servers_frm_hosts(hostnames, stack):
+    """
+    Resolve every hostname to its server resource with one lookup per
+    distinct hostname.
+
+    Results are checked by hostname, and any hosts that are missing or
+    ambiguous are reported together instead of failing on the first.
+    """
+    hostnames = list(dict.fromkeys(hostnames))
+    servers = {}
+    missing = []
+    duplicates = []
+
+    for hostname in hostnames:
+        matches = [_host_info for _host_info in stack.get_resource(resource_type="server",
+                                                                   hostname=hostname) or []
+                   if _host_info.get("hostname") == hostname]
+
+        if not matches:
+            missing.append(hostname)
+        elif len(matches) > 1:
+            duplicates.append(hostname)
+        else:
+            servers[hostname] = matches[0]
+
+    errors = []
+
+    if missing:
+        errors.append(f"server resources not found for hosts: {', '.join(missing)}")
+
+    if duplicates:
+        errors.append(f"multiple server resources found for hosts: {', '.join(duplicates)}")
+
+    if errors:
+        raise Exception("; ".join(errors))
+
+    return servers
+
+def _get_private_ips_by_role(hosts_by_role, stack):
+    """
+    Map each role to the de-duplicated, order-preserving list of
+    private IPs of its hosts.  The private IP of each hostname is
+    returned as well.
+
+    The hostnames of all roles are resolved together, so a host shared
+    by several roles is only looked up once.
+    """
+    role_hostnames = {role: stack.to_list(hosts) for role, hosts in hosts_by_role.items()}
+
+    all_hostnames = list(dict.fromkeys(host
+                                       for hostnames in role_hostnames.values()
+                                       for host in hostnames))
+
+    servers = _get_servers_frm_hosts(all_hostnames, stack)
+
+    private_ips = {}
+
+    for role, hostnames in role_hostnames.items():
+        private_ips[role] = list(dict.fromkeys(servers[host]["private_ip"]
+                                               for host in hostnames))
+
+    host_ips = {host: servers[host]["private_ip"] for host in all_hostnames}
+
+    return private_ips, host_ips
+
+_RACK_AWARE_REPLICA_SELECTOR = "org.apache.kafka.common.replica.RackAwareReplicaSelector"
+
+def _load_json_var(value):
+    """Return a dict given either a dict or its JSON string."""
+    import json
+
+    if not value:
+        return {}
+
+    if isinstance(value, str):
+        return json.loads(value)
+
+    return value
+
+# exporter port of each role - matches <role>_jmxexporter_port in the
+# confluent.variables role (checked by tests/test_shared_constants.py)
+_JMXEXPORTER_PORTS = {
+    "zookeeper": 8079,
+    "controller": 8074,
+    "broker": 8080,
+    "schema_registry": 8078,
+    "connect": 8077,
+    "ksql": 8076,
+    "rest": 8075
+}
+
+def _get_metrics_endpoints(private_ips):
+    """
+    Return the Prometheus exporter endpoint of every host, keyed by role.
+    """
+    # combined KRaft controllers are served by the broker's exporter
+    private_ips = dict(private_ips,
+                       controller=[_ip for _ip in private_ips.get("controller", [])
+                                   if _ip not in private_ips.get("broker", [])])
+
+    return {role: [f"http://{_ip}:{port}/metrics" for _ip in private_ips[role]]
+            for role, port in _JMXEXPORTER_PORTS.items()
+            if private_ips.get(role)}
+
+# Confluent Platform release used for KRaft clusters unless one is given
+# - also in kafka_on_ec2, which names the baked image after it
+_KRAFT_CONFLUENT_VERSION = "7.6.1"
+
+def _get_confluent_vars(version):
+    """
+    Return the confluent variable of the Ansible roles for a Confluent
+    Platform release, e.g. "7.6.1".
+
+    Stacks are published on their own, so kafka_image_bake_on_ubuntu
+    has a copy - the image is only used when both give the same
+    package_version (tests/test_shared_constants.py).
+    """
+    major, minor = str(version).split(".")[:2]
+
+    return {
+        "package_version": f"{version}-1",
+        "repo_version": f"{major}.{minor}",
+        "support": {
+            "customer_id": "anonymous",
+            "metrics_enabled": True
+        }
     }
-    private_ips = []
 
-    for host in stack.to_list(hosts):
-        _lookup["hostname"] = host
-        _host_info = list(stack.get_resource(**_lookup))[0]
+def _get_kraft_cluster_id(kafka_cluster):
+    """
+    Return the KRaft cluster id of the cluster - a base64 encoded uuid
+    derived from the cluster name, so re-runs format storage with the
+    same id.
+    """
+    import uuid
+    import base64
+
+    _uuid = uuid.uuid5(uuid.NAMESPACE_DNS, f"kafka.{kafka_cluster}")
+
+    return base64.urlsafe_b64encode(_uuid.bytes).decode().rstrip("=")
+
+# broker listener port - kafka_port of confluent.variables
+_KAFKA_PORT = 9092
+
+# sasl_protocol values the stack can deploy - kerberos also needs
+# keytabs and principals on every host
+_SASL_PROTOCOLS = ("none", "plain")
+
+# producer buffer a throughput preset sizes its batches to
+_PRODUCER_BUFFER_BYTES = 67108864
+
+def _get_security_protocol(ssl_enabled, sasl_protocol="none"):
+    """
+    Return the broker listener protocol - matches
+    kafka_broker_security_protocol of confluent.variables.
+    """
+    if sasl_protocol in ("kerberos", "plain"):
+        return "SASL_SSL" if ssl_enabled else "SASL_PLAINTEXT"
+
+    return "SSL" if ssl_enabled else "PLAINTEXT"
+
+def _get_client_security(security_protocol, mutual_auth=False, sasl_protocol="none"):
+    """
+    Return the security properties a client needs for the broker
+    listener.  Values the cluster cannot know or must not publish
+    (client keystore, SASL username and password) are left as
+    <placeholders>.
+    """
+    if security_protocol not in ("PLAINTEXT", "SSL", "SASL_PLAINTEXT", "SASL_SSL"):
+        raise Exception(f"unknown security protocol {security_protocol}")
+
+    props = {"security.protocol": security_protocol}
+
+    if security_protocol.endswith("SSL"):
+        props["ssl.truststore.location"] = "<client truststore with the cluster CA>"
+        props["ssl.truststore.password"] = "<client truststore password>"
+
+        if mutual_auth:
+            props["ssl.keystore.location"] = "<client keystore signed by the cluster CA>"
+            props["ssl.keystore.password"] = "<client keystore password>"
+            props["ssl.key.password"] = "<client key password>"
+
+    if not security_protocol.startswith("SASL_"):
+        return props
+
+    # only plain is deployed by the stack - see _SASL_PROTOCOLS
+    if sasl_protocol != "plain":
+        raise Exception(f"security protocol {security_protocol} needs sasl_protocol plain")
+
+    props["sasl.mechanism"] = "PLAIN"
+    props["sasl.jaas.config"] = ('org.apache.kafka.common.security.plain.PlainLoginModule required '
+                                 'username="<client username>" password="<client password>";')
+
+    return props
+
+def _get_client_presets(broker_count, partitions):
+    """
+    Return the producer and consumer settings of the throughput, low
+    latency and exactly once presets.
+
+    A producer keeps a batch open per partition it writes to, so the
+    throughput batch size is what fits two batches of every partition
+    of a topic (partitions) in the producer buffer.  Consumers fetch
+    the partitions led by a broker in one request, so fetch.max.bytes
+    covers a full fetch of each of them.
+
+    Returns a tuple of the presets and any warnings.
+    """
+    broker_count = max(int(broker_count), 1)
+    partitions = max(int(partitions), 1)
+
+    batch_size = _clamp(_PRODUCER_BUFFER_BYTES // (2 * partitions) // 16384 * 16384, 16384, 262144)
+    buffer_memory = _clamp(2 * partitions * batch_size, 33554432, 268435456)
+    partitions_per_broker = -(-partitions // broker_count)
+    fetch_max_bytes = _clamp(partitions_per_broker * 1048576, 1048576, 52428800)
+
+    # acks=all only waits for the in-sync replicas - RF 3 needs 3 brokers
+    replicated = broker_count >= 3
+
+    presets = {
+        "throughput": {
+            "producer": {
+                "acks": "all",
+                "enable.idempotence": "true",
+                "compression.type": "lz4",
+                "linger.ms": 20,
+                "batch.size": batch_size,
+                "buffer.memory": buffer_memory,
+                "max.in.flight.requests.per.connection": 5,
+                "send.buffer.bytes": -1
+            },
+            "consumer": {
+                "fetch.min.bytes": 65536,
+                "fetch.max.wait.ms": 500,
+                "max.partition.fetch.bytes": 1048576,
+                "fetch.max.bytes": fetch_max_bytes,
+                "max.poll.records": 1000,
+                "receive.buffer.bytes": -1
+            }
+        },
+        "low_latency": {
+            "producer": {
+                "acks": "1",
+                "enable.idempotence": "false",
+                "compression.type": "none",
+                "linger.ms": 0,
+                "batch.size": 16384,
+                "max.in.flight.requests.per.connection": 5
+            },
+            "consumer": {
+                "fetch.min.bytes": 1,
+                "fetch.max.wait.ms": 10,
+                "max.poll.records": 100
+            }
+        },
+        "exactly_once": {
+            "producer": {
+                "acks": "all",
+                "enable.idempotence": "true",
+                "transactional.id": "<unique id per producer instance>",
+                "transaction.timeout.ms": 60000,
+                "compression.type": "lz4",
+                "linger.ms": 5,
+                "batch.size": batch_size,
+                "max.in.flight.requests.per.connection": 5,
+                "delivery.timeout.ms": 120000
+            },
+            "consumer": {
+                "isolation.level": "read_committed",
+                "enable.auto.commit": "false",
+                "fetch.min.bytes": 1,
+                "max.partition.fetch.bytes": 1048576,
+                "fetch.max.bytes": fetch_max_bytes
+            }
+        }
+    }
 
-        if _host_info["private_ip"] not in private_ips:
-            private_ips.append(_host_info["private_ip"])
+    warnings = []
+
+    if not replicated:
+        warnings.append(f"{broker_count} broker(s) - acks=all and transactions need 3 brokers "
+                        f"for the replication factor of 3 the brokers default to")
+
+    return presets, warnings
+
+def _to_properties(props):
+    return "".join(f"{key}={value}\n" for key, value in sorted(props.items()))
+
+def _get_default_partitions(topics_spec, broker_count):
+    """
+    Return the partition count the client presets are sized for - the
+    default of the topic spec, else one partition per broker.
+    """
+    if isinstance(topics_spec, dict) and topics_spec.get("defaults", {}).get("partitions"):
+        return int(topics_spec["defaults"]["partitions"])
+
+    return max(int(broker_count), 1)
+
+def _get_client_profiles(broker_ips, security_protocol, partitions=None,
+                         mutual_auth=False, sasl_protocol="none", port=_KAFKA_PORT):
+    """
+    Return the client connection profiles of the cluster - the bootstrap
+    list and security properties every client needs, plus a producer and
+    a consumer config per preset, as a dict and as properties files.
+    """
+    bootstrap_servers = ",".join(f"{_ip}:{port}" for _ip in broker_ips)
+    partitions = partitions or max(len(broker_ips), 1)
+
+    common = {"bootstrap.servers": bootstrap_servers}
+    common.update(_get_client_security(security_protocol,
+                                       mutual_auth=mutual_auth,
+                                       sasl_protocol=sasl_protocol))
+
+    presets, warnings = _get_client_presets(len(broker_ips), partitions)
+
+    return {
+        "bootstrap_servers": bootstrap_servers,
+        "security_protocol": security_protocol,
+        "sized_for": {"brokers": len(broker_ips), "partitions": partitions},
+        "common": common,
+        "presets": presets,
+        "properties": {f"{name}.{client}": _to_properties(dict(common, **settings))
+                       for name, preset in presets.items()
+                       for client, settings in preset.items()},
+        "warnings": warnings
+    }
 
-    return private_ips
+def _get_host_racks(stack):
+    """
+    Return the rack (availability zone) of each host, keyed by hostname.
+    """
+    return _load_json_var(stack.host_racks)
 
 def run(stackargs):
     import json
@@ -54,7 +617,6 @@ def run(stackargs):
     stack.parse.add_required(key="ssh_key_name")
     stack.parse.add_required(key="aws_default_region")
 
-    stack.parse.add_required(key="zookeeper_hosts")
     stack.parse.add_required(key="broker_hosts")
     stack.parse.add_required(key="schema_registry_hosts")
     stack.parse.add_required(key="connect_hosts")
@@ -62,10 +624,46 @@ def run(stackargs):
     stack.parse.add_required(key="ksql_hosts")
     stack.parse.add_required(key="control_center_hosts")
 
+    # zookeeper (zookeeper_hosts) or kraft (controller_hosts - brokers
+    # listed here as well run as combined broker and controller)
+    stack.parse.add_optional(key="metadata_mode", default="zookeeper")
+    stack.parse.add_optional(key="zookeeper_hosts", default="null")
+    stack.parse.add_optional(key="controller_hosts", default="null")
+    stack.parse.add_optional(key="kraft_cluster_id", default="null")
+    stack.parse.add_optional(key="confluent_version", default="null")
+
     stack.parse.add_optional(key="vm_username", default="ubuntu")
     stack.parse.add_optional(key="publish_to_saas", default="null")
     stack.parse.add_optional(key="tf_runtime", default="tofu:1.9.1")
     stack.parse.add_optional(key="ansible_docker_image", default="config0/ansible-run-env")
+    stack.parse.add_optional(key="instance_type", default="null")
+    stack.parse.add_optional(key="instance_types", default="null")
+    stack.parse.add_optional(key="sizing_overrides", default="null")
+    stack.parse.add_optional(key="broker_data_volumes", types="int", default=0)
+    stack.parse.add_optional(key="parallel_install", default=True)
+    stack.parse.add_optional(key="artifact_cache", default="null")
+    stack.parse.add_optional(key="host_tuning", default=True)
+    stack.parse.add_optional(key="host_tuning_fail_on_drift", default="null")
+    stack.parse.add_optional(key="rolling_restart", default=True)
+    stack.parse.add_optional(key="restart_gate", default="null")
+    stack.parse.add_optional(key="reassign_partitions", default="null")
+    stack.parse.add_optional(key="reassign_throttle_bytes", default="null")
+    stack.parse.add_optional(key="host_racks", default="null")
+    stack.parse.add_optional(key="replica_selector", default="null")
+    stack.parse.add_optional(key="benchmark", default="null")
+    stack.parse.add_optional(key="benchmark_matrix", default="null")
+    stack.parse.add_optional(key="benchmark_thresholds", default="null")
+    stack.parse.add_optional(key="benchmark_fail_below", default="null")
+    stack.parse.add_optional(key="metrics", default="null")
+    stack.parse.add_optional(key="topics", default="null")
+    stack.parse.add_optional(key="topics_dry_run", default="null")
+    stack.parse.add_optional(key="metrics_jolokia", default="null")
+    stack.parse.add_optional(key="readiness", default=True)
+    stack.parse.add_optional(key="readiness_timeout", types="int", default="null")
+    stack.parse.add_optional(key="readiness_serve_grace", types="int", default="null")
+    stack.parse.add_optional(key="ssl_enabled", default=True)
+    stack.parse.add_optional(key="ssl_mutual_auth_enabled", default=True)
+    stack.parse.add_optional(key="sasl_protocol", default="none")
 
     # add host group
     stack.add_hostgroups("config0-hub:::ubuntu::docker", "install_docker")
@@ -79,9 +677,12 @@ def run(stackargs):
 
     # install docker on bastion hosts
     human_description = f"Install Docker on bastion {stack.bastion_hostname}"
+    env_vars = _label_phase({}, human_description)
+
     inputargs = {
         "display": True,
         "human_description": human_description,
+        "env_vars": json.dumps(env_vars),
         "automation_phase": "infrastructure",
         "hostname": stack.bastion_hostname,
         "groups": stack.install_docker
@@ -91,29 +692,39 @@ def run(stackargs):
     # get ssh_key
     private_key = _get_ssh_key(stack)
 
-    # get ips
-    host_ips = []
+    kraft = stack.metadata_mode == "kraft"
 
-    kafka_zookeeper_ips = _get_private_ips_frm_hosts(stack.zookeeper_hosts, stack)
-    host_ips.extend(kafka_zookeeper_ips)
+    if stack.metadata_mode not in ("zookeeper", "kraft"):
+        raise Exception(f"metadata_mode must be zookeeper or kraft, not {stack.metadata_mode}")
 
-    kafka_broker_ips = _get_private_ips_frm_hosts(stack.broker_hosts, stack)
-    host_ips.extend(kafka_broker_ips)
+    quorum_hosts = stack.controller_hosts if kraft else stack.zookeeper_hosts
 
-    kafka_schema_registry_ips = _get_private_ips_frm_hosts(stack.schema_registry_hosts, stack)
-    host_ips.extend(kafka_schema_registry_ips)
+    if not quorum_hosts:
+        raise Exception(f"{'controller_hosts' if kraft else 'zookeeper_hosts'} is required for metadata_mode {stack.metadata_mode}")
 
-    kafka_connect_ips = _get_private_ips_frm_hosts(stack.connect_hosts, stack)
-    host_ips.extend(kafka_connect_ips)
+    # get ips - resolved in bulk for all roles
+    private_ips, ips_by_host = _get_private_ips_by_role({
+        "controller" if kraft else "zookeeper": quorum_hosts,
+        "broker": stack.broker_hosts,
+        "schema_registry": stack.schema_registry_hosts,
+        "connect": stack.connect_hosts,
+        "rest": stack.rest_hosts,
+        "ksql": stack.ksql_hosts,
+        "control_center": stack.control_center_hosts
+    }, stack)
 
-    kafka_rest_ips = _get_private_ips_frm_hosts(stack.rest_hosts, stack)
-    host_ips.extend(kafka_rest_ips)
+    kafka_zookeeper_ips = private_ips.get("zookeeper", [])
+    kafka_controller_ips = private_ips.get("controller", [])
+    kafka_broker_ips = private_ips["broker"]
+    kafka_schema_registry_ips = private_ips["schema_registry"]
+    kafka_connect_ips = private_ips["connect"]
+    kafka_rest_ips = private_ips["rest"]
+    kafka_ksql_ips = private_ips["ksql"]
+    kafka_control_center_ips = private_ips["control_center"]
 
-    kafka_ksql_ips = _get_private_ips_frm_hosts(stack.ksql_hosts, stack)
-    host_ips.extend(kafka_ksql_ips)
-
-    kafka_control_center_ips = _get_private_ips_frm_hosts(stack.control_center_hosts, stack)
-    host_ips.extend(kafka_control_center_ips)
+    host_ips = list(dict.fromkeys(_ip
+                                  for ips in private_ips.values()
+                                  for _ip in ips))
 
     # install python on hosts for ansible
     human_description = "Install Python for Ansible"
@@ -125,6 +736,8 @@ def run(stackargs):
         "ANS_VAR_host_ips": ",".join(host_ips)
     }
 
+    _label_phase(env_vars, human_description)
+
     inputargs = {
         "display": True,
         "human_description": human_description,
@@ -150,6 +763,7 @@ def run(stackargs):
         "STATEFUL_ID": stateful_id,
         "ANS_VAR_private_key": private_key,
         "ANS_VAR_kafka_zookeeper": ",".join(kafka_zookeeper_ips),
+        "ANS_VAR_kafka_controller": ",".join(kafka_controller_ips),
         "ANS_VAR_kafka_broker": ",".join(kafka_broker_ips),
         "ANS_VAR_kafka_schema_registry": ",".join(kafka_schema_registry_ips),
         "ANS_VAR_kafka_connect": ",".join(kafka_connect_ips),
@@ -158,11 +772,160 @@ def run(stackargs):
         "ANS_VAR_kafka_control_center": ",".join(kafka_control_center_ips)
     }
 
+    group_vars = _get_sizing(stack)
+
+    if stack.broker_data_volumes:
+        group_vars.setdefault("kafka_broker", {})["kafka_broker_data_volumes"] = int(stack.broker_data_volumes)
+
+    # broker.rack from the placement of each host
+    host_racks = _get_host_racks(stack)
+
+    if host_racks:
+        base_env_vars["ANS_VAR_kafka_host_racks"] = json.dumps({ips_by_host[host]: rack
+                                                                for host, rack in host_racks.items()
+                                                                if host in ips_by_host})
+
+    # let consumers fetch from the closest replica (client.rack)
+    if stack.replica_selector:
+        group_vars.setdefault("kafka_broker", {})["kafka_broker_replica_selector_class"] = \
+            _RACK_AWARE_REPLICA_SELECTOR if stack.replica_selector == "rack" else stack.replica_selector
+
+    # restart brokers one at a time on config changes
+    group_vars.setdefault("kafka_broker", {})["kafka_broker_rolling_restart"] = bool(stack.rolling_restart)
+
+    if stack.restart_gate:
+        group_vars["kafka_broker"]["kafka_broker_restart_gate"] = stack.restart_gate
+
+    # kernel profile (sysctls, THP, governor, I/O scheduler) applied in prereq
+    group_vars.setdefault("all", {})["host_tuning_enabled"] = bool(stack.host_tuning)
+
+    if stack.host_tuning_fail_on_drift:
+        group_vars["all"]["host_tuning_fail_on_drift"] = True
+
+    # every phase ends once its services answer their health checks
+    group_vars["all"]["readiness_enabled"] = bool(stack.readiness)
+
+    if stack.readiness_timeout:
+        group_vars["all"]["readiness_timeout"] = int(stack.readiness_timeout)
+
+    if stack.readiness_serve_grace:
+        group_vars["all"]["readiness_serve_grace"] = int(stack.readiness_serve_grace)
+
+    # listener security of the brokers - group_vars/all of the tree
+    # takes ssl_enabled/ssl_mutual_auth_enabled from the kafka_ vars
+    if stack.sasl_protocol not in _SASL_PROTOCOLS:
+        raise Exception(f"sasl_protocol must be one of: {', '.join(_SASL_PROTOCOLS)}")
+
+    group_vars["all"].update({
+        "kafka_ssl_enabled": bool(stack.ssl_enabled),
+        "kafka_ssl_mutual_auth_enabled": bool(stack.ssl_mutual_auth_enabled),
+        "sasl_protocol": stack.sasl_protocol
+    })
+
+    install_phases = dict(_INSTALL_PHASES)
+
+    if stack.confluent_version or kraft:
+        group_vars.setdefault("all", {})["confluent"] = \
+            _get_confluent_vars(stack.confluent_version or _KRAFT_CONFLUENT_VERSION)
+
+    # KRaft - controllers replace the zookeeper phase and the quorum
+    # voters are derived from the inventory
+    kraft_cluster_id = None
+
+    if kraft:
+        kraft_cluster_id = stack.kraft_cluster_id or _get_kraft_cluster_id(stack.kafka_cluster)
+
+        group_vars.setdefault("all", {}).update({
+            "metadata_mode": "kraft",
+            "kraft_cluster_id": kraft_cluster_id
+        })
+
+        del install_phases["entry_point/30-zookeeper.yml"]
+        install_phases["entry_point/35-controller.yml"] = ["entry_point/20-prereq.yml"]
+        install_phases["entry_point/40-broker.yml"] = ["entry_point/35-controller.yml"]
+
+    # declarative topics - only missing or changed topics are touched
+    topics = None
+
+    if stack.topics:
+        topics = {
+            "spec": _load_json_var(stack.topics),
+            "dry_run": bool(stack.topics_dry_run),
+            "plan": "topics/plan.json"
+        }
+
+        install_phases["entry_point/45-topics.yml"] = ["entry_point/40-broker.yml"]
+        group_vars.setdefault("kafka_broker", {}).update({
+            "kafka_topics_spec": topics["spec"],
+            "kafka_topics_dry_run": topics["dry_run"]
+        })
+
+    # download artifacts once on the bastion and push them to the hosts
+    if stack.artifact_cache:
+        group_vars.setdefault("all", {})["artifact_cache_enabled"] = True
+        install_phases["entry_point/15-artifact-cache.yml"] = []
+        install_phases["entry_point/20-prereq.yml"] = ["entry_point/15-artifact-cache.yml"]
+
+    # phases run one after the other once the cluster is up
+    final_phases = []
+
+    # prometheus exporter on every role - the scrape targets are written
+    # on the bastion once the services are up
+    metrics = None
+
+    if stack.metrics:
+        metrics = {
+            "endpoints": _get_metrics_endpoints(private_ips),
+            "targets": "prometheus/targets.json"
+        }
+
+        group_vars.setdefault("all", {}).update({
+            "jmxexporter_enabled": True,
+            "jolokia_enabled": bool(stack.metrics_jolokia)
+        })
+
+        final_phases.append("entry_point/97-metrics.yml")
+
+    # spread existing partitions over added brokers once the cluster is up
+    if stack.reassign_partitions:
+        final_phases.append("entry_point/95-reassign.yml")
+
+        if stack.reassign_throttle_bytes:
+            group_vars["kafka_broker"]["kafka_reassign_throttle_bytes"] = int(stack.reassign_throttle_bytes)
+
+    # perf test matrix from a client host once everything else is done
+    benchmark = None
+
+    if stack.benchmark:
+        benchmark = {
+            "matrix": _load_json_var(stack.benchmark_matrix),
+            "thresholds": _load_json_var(stack.benchmark_thresholds),
+            "fail_below": bool(stack.benchmark_fail_below)
+        }
+
+        final_phases.append("entry_point/96-benchmark.yml")
+        group_vars.setdefault("kafka_connect", {}).update({
+            "kafka_benchmark_matrix": benchmark["matrix"],
+            "kafka_benchmark_thresholds": benchmark["thresholds"],
+            "kafka_benchmark_fail_below": benchmark["fail_below"],
+            "kafka_benchmark_label": stack.instance_type or stack.kafka_cluster
+        })
+
+    _add_final_phases(install_phases, final_phases)
+
+    if group_vars:
+        base_env_vars["ANS_VAR_kafka_group_vars"] = json.dumps(group_vars)
+
+    install_waves = _get_install_waves(install_phases, parallel=bool(stack.parallel_install))
+    base_env_vars["ANS_VAR_kafka_install_waves"] = json.dumps(install_waves)
+
     # deploy Ansible files
+    env_vars = _label_phase(base_env_vars.copy(), human_description)
+
     inputargs = {
         "display": True,
         "human_description": human_description,
-        "env_vars": json.dumps(base_env_vars.copy()),
+        "env_vars": json.dumps(env_vars),
         "stateful_id": stateful_id,
         "automation_phase": "infrastructure",
         "hostname": stack.bastion_hostname,
@@ -176,16 +939,12 @@ def run(stackargs):
     human_description = "Install Kafka"
 
     env_vars = base_env_vars.copy()
-    env_vars["ANS_VAR_exec_ymls"] = ",".join([
-        "entry_point/20-prereq.yml",
-        "entry_point/30-zookeeper.yml",
-        "entry_point/40-broker.yml",
-        "entry_point/50-schema.yml",
-        "entry_point/60-connect.yml",
-        "entry_point/70-ksql.yml",
-        "entry_point/80-rest.yml",
-        "entry_point/90-control.yml"
-    ])
+    env_vars["ANS_VAR_exec_ymls"] = ",".join(wave["playbook"] for wave in install_waves)
+
+    _label_phase(env_vars, human_description)
+
+    # every host of a play is worked on at once
+    env_vars["ANSIBLE_FORKS"] = str(_clamp(len(host_ips), _MIN_FORKS, _MAX_FORKS))
 
     docker_env_fields_keys = env_vars.keys()
     env_vars["DOCKER_ENV_FIELDS"] = ",".join(docker_env_fields_keys)
@@ -207,6 +966,7 @@ def run(stackargs):
     if stack.publish_to_saas:
         _publish_vars = {
             "kafka_cluster": stack.kafka_cluster,
+            "kafka_metadata_mode": stack.metadata_mode,
             "kafka_zookeeper": kafka_zookeeper_ips,
             "kafka_broker": kafka_broker_ips,
             "kafka_schema_registry": kafka_schema_registry_ips,
@@ -215,6 +975,32 @@ def run(stackargs):
             "kafka_ksql": kafka_ksql_ips,
             "kafka_control_center": kafka_control_center_ips
         }
+
+        if kraft:
+            _publish_vars["kafka_controller"] = kafka_controller_ips
+            _publish_vars["kafka_kraft_cluster_id"] = kraft_cluster_id
+
+        if host_racks:
+            _publish_vars["kafka_host_racks"] = host_racks
+
+        if benchmark:
+            _publish_vars["kafka_benchmark"] = benchmark
+
+        if topics:
+            _publish_vars["kafka_topics"] = {"dry_run": topics["dry_run"],
+                                             "plan": topics["plan"]}
+
+        if metrics:
+            _publish_vars["kafka_metrics"] = metrics
+
+        # bootstrap, security and tuned producer/consumer configs
+        _publish_vars["kafka_client_profiles"] = _get_client_profiles(
+            kafka_broker_ips,
+            _get_security_protocol(bool(stack.ssl_enabled), sasl_protocol=stack.sasl_protocol),
+            partitions=_get_default_partitions(topics["spec"] if topics else None, len(kafka_broker_ips)),
+            mutual_auth=bool(stack.ssl_mutual_auth_enabled),
+            sasl_protocol=stack.sasl_protocol)
+
         stack.output_to_ui(_publish_vars)
 
     return stack.get_results()
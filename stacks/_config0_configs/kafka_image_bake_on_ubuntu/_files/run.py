@@ -0,0 +1,221 @@
+"""
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Ansible roles whose packages can be baked into the image
+_BAKE_ROLES = ("zookeeper",
+               "kafka_controller",
+               "kafka_broker",
+               "schema_registry",
+               "kafka_connect",
+               "ksql",
+               "kafka_rest",
+               "control_center")
+
+def _get_ssh_key(stack):
+    _lookup = {
+        "must_exists": True,
+        "resource_type": "ssh_key_pair",
+        "name": stack.ssh_key_name,
+        "serialize": True,
+        "serialize_fields": ["private_key"]
+    }
+    return stack.get_resource(decrypt=True, **_lookup)["private_key"]
+
+def _get_private_ip(hostname, stack):
+    """Return the private IP of the server resource of a hostname."""
+    servers = [_host_info for _host_info in stack.get_resource(resource_type="server",
+                                                               hostname=hostname) or []
+               if _host_info.get("hostname") == hostname]
+
+    if len(servers) != 1:
+        raise Exception(f"expected one server resource for host {hostname}, found {len(servers)}")
+
+    return servers[0]["private_ip"]
+
+def _get_confluent_vars(version):
+    """
+    Return the confluent variable of the Ansible roles for a Confluent
+    Platform release, e.g. "7.6.1".
+
+    A copy of _get_confluent_vars of kafka_cluster_on_ubuntu - a baked
+    image is only used by clusters with the same package_version, so the
+    two are changed together (tests/test_shared_constants.py).
+    """
+    major, minor = str(version).split(".")[:2]
+
+    return {
+        "package_version": f"{version}-1",
+        "repo_version": f"{major}.{minor}",
+        "support": {
+            "customer_id": "anonymous",
+            "metrics_enabled": True
+        }
+    }
+
+def run(stackargs):
+    import json
+
+    # instantiate authoring stack
+    stack = newStack(stackargs)
+
+    # add default variables
+    stack.parse.add_required(key="bastion_hostname")
+    stack.parse.add_required(key="ssh_key_name")
+    stack.parse.add_required(key="aws_default_region")
+
+    # builder host - a VM from the stock image, destroyed after the bake
+    stack.parse.add_required(key="bake_hostname")
+    stack.parse.add_required(key="image_name")
+    stack.parse.add_required(key="confluent_version")
+
+    stack.parse.add_optional(key="bake_roles", default="null")
+    stack.parse.add_optional(key="publish_to_saas", default="null")
+    stack.parse.add_optional(key="ansible_docker_image", default="config0/ansible-run-env")
+
+    # add host group
+    stack.add_hostgroups("config0-hub:::ubuntu::docker", "install_docker")
+    stack.add_hostgroups("config0-hub:::ansible::ubuntu", "install_python")
+    stack.add_hostgroups("config0-hub:::kafka::ubuntu_vendor_setup", "ubuntu_vendor_setup")
+    stack.add_hostgroups("config0-hub:::kafka::ubuntu_vendor_init_cluster", "ubuntu_vendor_init_cluster")
+
+    # Initialize 
+    stack.init_variables()
+    stack.init_hostgroups()
+
+    bake_roles = stack.to_list(stack.bake_roles) if stack.bake_roles else list(_BAKE_ROLES)
+    unknown = [role for role in bake_roles if role not in _BAKE_ROLES]
+
+    if unknown:
+        raise Exception(f"bake_roles must be from {', '.join(_BAKE_ROLES)}, not {', '.join(unknown)}")
+
+    # install docker on bastion hosts
+    human_description = f"Install Docker on bastion {stack.bastion_hostname}"
+    inputargs = {
+        "display": True,
+        "human_description": human_description,
+        "automation_phase": "infrastructure",
+        "hostname": stack.bastion_hostname,
+        "groups": stack.install_docker
+    }
+    stack.add_groups_to_host(**inputargs)
+
+    # get ssh_key
+    private_key = _get_ssh_key(stack)
+
+    bake_ip = _get_private_ip(stack.bake_hostname, stack)
+
+    # install python on the builder for ansible
+    human_description = "Install Python for Ansible"
+    env_vars = {
+        "METHOD": "create",
+        "STATEFUL_ID": stack.random_id(size=10),
+        "ANS_VAR_private_key": private_key,
+        "ANS_VAR_exec_ymls": "entry_point/10-install-python.yml",
+        "ANS_VAR_host_ips": bake_ip
+    }
+
+    inputargs = {
+        "display": True,
+        "human_description": human_description,
+        "env_vars": json.dumps(env_vars),
+        "stateful_id": env_vars["STATEFUL_ID"],
+        "automation_phase": "infrastructure",
+        "hostname": stack.bastion_hostname,
+        "groups": stack.install_python
+    }
+    stack.add_groups_to_host(**inputargs)
+
+    ###############################################################
+    # Ansible configs - only the image_bake group is in the inventory
+    ###############################################################
+    stateful_id = stack.random_id(size=10)
+
+    human_description = "Setting up Ansible"
+
+    group_vars = {
+        "all": {
+            "confluent": _get_confluent_vars(stack.confluent_version),
+            "image_bake_name": stack.image_name,
+            "image_bake_roles": bake_roles,
+            "image_bake_region": stack.aws_default_region
+        }
+    }
+
+    base_env_vars = {
+        "METHOD": "create",
+        "DOCKER_IMAGE": stack.ansible_docker_image,
+        "STATEFUL_ID": stateful_id,
+        "ANS_VAR_private_key": private_key,
+        "ANS_VAR_kafka_image_bake": bake_ip,
+        "ANS_VAR_kafka_group_vars": json.dumps(group_vars),
+        "ANS_VAR_kafka_install_waves": json.dumps([{"playbook": "entry_point/05-bake.yml",
+                                                    "phases": ["entry_point/05-bake.yml"]}])
+    }
+
+    inputargs = {
+        "display": True,
+        "human_description": human_description,
+        "env_vars": json.dumps(base_env_vars.copy()),
+        "stateful_id": stateful_id,
+        "automation_phase": "infrastructure",
+        "hostname": stack.bastion_hostname,
+        "groups": stack.ubuntu_vendor_setup
+    }
+    stack.add_groups_to_host(**inputargs)
+
+    ##############################################################
+    # bake the image - looked up first and only built when missing
+    ##############################################################
+    human_description = f"Bake Image {stack.image_name}"
+
+    env_vars = base_env_vars.copy()
+    env_vars["ANS_VAR_exec_ymls"] = "entry_point/05-bake.yml"
+
+    # the AMI calls are made from the bastion with its credentials
+    env_vars["AWS_DEFAULT_REGION"] = stack.aws_default_region
+
+    # labels the per playbook timings of the provision_profiler callback
+    env_vars["PROVISION_PROFILE_PHASE"] = human_description
+
+    docker_env_fields_keys = env_vars.keys()
+    env_vars["DOCKER_ENV_FIELDS"] = ",".join(docker_env_fields_keys)
+
+    inputargs = {
+        "display": True,
+        "human_description": human_description,
+        "env_vars": json.dumps(env_vars),
+        "stateful_id": stateful_id,
+        "automation_phase": "infrastructure",
+        "hostname": stack.bastion_hostname,
+        "groups": stack.ubuntu_vendor_init_cluster
+    }
+    stack.add_groups_to_host(**inputargs)
+
+    ###############################################################
+    # publish variables
+    ###############################################################
+    if stack.publish_to_saas:
+        stack.output_to_ui({
+            "kafka_image": {
+                "name": stack.image_name,
+                "confluent_version": stack.confluent_version,
+                "roles": sorted(bake_roles),
+                "results": "image/image.json"
+            }
+        })
+
+    return stack.get_results()
@@ -16,26 +16,266 @@
 """
 
 
-def _vm_create(server_type, num, stack):
-    """Create VMs for a specific server type in the Kafka cluster."""
+def _get_hostnames(server_type, num, stack):
+    """Return the hostnames of a server type in the Kafka cluster."""
+    return [f"{stack.hostname_base}-{server_type}-num-{idx}".replace("_", "-")
+            for idx in range(int(num))]
+
+
+def _to_list(value):
+    """Return a list from a list, JSON list or comma-separated string."""
+    import json
+
+    if not value:
+        return []
+
+    if isinstance(value, list):
+        return value
+
+    value = value.strip()
+
+    if value.startswith("["):
+        return json.loads(value)
+
+    return [_item.strip() for _item in value.split(",") if _item.strip()]
+
+
+def _to_dict(value):
+    """Return a dict from a dict or JSON object string."""
+    import json
+
+    if not value:
+        return {}
+
+    if isinstance(value, str):
+        return json.loads(value)
+
+    return value
+
+
+def _get_placements(num, stack):
+    """
+    Spread the hosts of a server type round-robin across the subnets.
+
+    Returns a (subnet_id, rack) per host.  The rack is the availability
+    zone of the subnet when availability_zones is given (in the same
+    order as subnet_ids), otherwise the subnet id itself.
+    """
+    subnet_ids = _to_list(stack.subnet_ids)
+    zones = _to_list(stack.availability_zones)
+
+    if not subnet_ids:
+        raise Exception(f"subnet_ids is required to place {int(num)} hosts")
+
+    if zones and len(zones) != len(subnet_ids):
+        raise Exception(f"availability_zones ({len(zones)}) must match subnet_ids ({len(subnet_ids)}) one to one")
+
+    racks = zones or subnet_ids
+
+    return [(subnet_ids[idx % len(subnet_ids)], racks[idx % len(racks)])
+            for idx in range(int(num))]
+
+
+def _get_host_racks(hosts_by_type, stack):
+    """Return the rack of every host, keyed by hostname."""
+    host_racks = {}
+
+    for server_type, num in hosts_by_type.items():
+        for hostname, (_, rack) in zip(_get_hostnames(server_type, num, stack),
+                                      _get_placements(num, stack)):
+            host_racks[hostname] = rack
+
+    return host_racks
+
+
+# Confluent Platform release installed when confluent_version is not
+# given - the default of the confluent.variables role and the KRaft
+# release of kafka_cluster_on_ubuntu (tests/test_shared_constants.py)
+_DEFAULT_CONFLUENT_VERSION = "5.3.1"
+_KRAFT_CONFLUENT_VERSION = "7.6.1"
+
+# seconds the scheduler waits between jobs - the install phases probe
+# the hosts and services themselves, so nothing is left to settle
+_SCHED_TIMEWAIT = 15
+
+# the bastion is new on every run and nothing probes its ssh before the
+# first job that runs Ansible through it, so that edge waits longer
+_BASTION_TIMEWAIT = 120
+
+# vCPUs and memory in MiB of the instance types the packing planner
+# can size shared hosts from.  _INSTANCE_TYPES of kafka_cluster_on_ubuntu
+# is the authoritative table - stacks are published on their own, so
+# these entries are copied from it (tests/test_shared_constants.py)
+_INSTANCE_CAPACITY = {
+    "t3.medium": (2, 4096),
+    "t3.large": (2, 8192),
+    "t3.xlarge": (4, 16384),
+    "t3.2xlarge": (8, 32768),
+    "m5.large": (2, 8192),
+    "m5.xlarge": (4, 16384),
+    "m5.2xlarge": (8, 32768),
+    "m5.4xlarge": (16, 65536),
+    "m6i.large": (2, 8192),
+    "m6i.xlarge": (4, 16384),
+    "m6i.2xlarge": (8, 32768),
+    "m6i.4xlarge": (16, 65536),
+    "r5.large": (2, 16384),
+    "r5.xlarge": (4, 32768),
+    "r5.2xlarge": (8, 65536),
+    "r6i.large": (2, 16384),
+    "r6i.xlarge": (4, 32768),
+    "r6i.2xlarge": (8, 65536),
+    "c5.large": (2, 4096),
+    "c5.xlarge": (4, 8192),
+    "c5.2xlarge": (8, 16384),
+    "c5.4xlarge": (16, 32768)
+}
+
+# memory kept back for the OS and agents on a shared host - the same
+# as _OS_RESERVED_MB of kafka_cluster_on_ubuntu
+_OS_RESERVED_MB = 512
+
+# roles that can share hosts, with the vCPUs and memory in MiB budgeted
+# to each instance - brokers, the metadata quorum and Connect always
+# get their own hosts
+_PACKING_BUDGETS = {
+    "control_center": {"cpu": 2, "memory_mb": 8192},
+    "ksql": {"cpu": 2, "memory_mb": 4096},
+    "schema_registry": {"cpu": 0.5, "memory_mb": 1536},
+    "rest": {"cpu": 0.5, "memory_mb": 1024}
+}
+
+# heap variable of each packable role - set to three quarters of the
+# memory budget on shared hosts
+_PACKING_HEAP_VARS = {
+    "control_center": "control_center_heap_opts",
+    "ksql": "ksql_heap_opts",
+    "schema_registry": "schema_registry_heap_opts",
+    "rest": "kafka_rest_heap_opts"
+}
+
+# Ansible role of each server type
+_SERVER_ROLES = {
+    "zookeeper": "zookeeper",
+    "controller": "kafka_controller",
+    "broker": "kafka_broker",
+    "schema_registry": "schema_registry",
+    "connect": "kafka_connect",
+    "ksql": "ksql",
+    "rest": "kafka_rest",
+    "control_center": "control_center"
+}
+
+
+def _get_image_name(prefix, version, roles):
+    """
+    Return the name of the baked image of a Confluent release and role
+    set - matches image_bake_name of the confluent.image_bake role.
+    """
+    import hashlib
+
+    digest = hashlib.sha1(",".join(sorted(roles)).encode()).hexdigest()[:8]
+
+    return f"{prefix}-{version}-1-{digest}"
+
+
+def _get_baked_image(stack):
+    """Return the image resource named image_name, or None when it is not baked yet."""
+    images = [image for image in stack.get_resource(resource_type="ami",
+                                                    name=stack.image_name) or []
+              if image.get("name") == stack.image_name]
+
+    return images[0] if images else None
+
+
+def _get_instance_type(server_type, stack):
+    """Return the instance type of a server type - instance_types, else instance_type."""
+    return _to_dict(stack.instance_types).get(server_type) or stack.instance_type
+
+
+def _pack_roles(counts, budgets, capacity):
+    """
+    Bin-pack role instances onto shared hosts, first fit decreasing by
+    memory and then vCPUs.  Instances of the same role always land on
+    different hosts.
+
+    Args:
+        counts (dict): number of instances of each role
+        budgets (dict): {"cpu": ..., "memory_mb": ...} of each role
+        capacity (tuple): (vcpus, memory in MiB) of a shared host
+
+    Returns:
+        list: the roles on each shared host
+    """
+    vcpus, memory_mb = capacity
+    memory_mb -= _OS_RESERVED_MB
+
+    instances = sorted(((role, idx) for role, num in counts.items() for idx in range(int(num))),
+                       key=lambda instance: (-budgets[instance[0]]["memory_mb"],
+                                             -budgets[instance[0]]["cpu"],
+                                             instance))
+
+    hosts = []
+
+    for role, _ in instances:
+        budget = budgets[role]
+
+        if budget["cpu"] > vcpus or budget["memory_mb"] > memory_mb:
+            raise Exception(f"{role} budget of {budget['cpu']} vCPU and {budget['memory_mb']} MiB does not fit "
+                            f"a shared host with {vcpus} vCPU and {memory_mb} MiB usable")
+
+        host = next((host for host in hosts
+                     if role not in host["roles"]
+                     and host["cpu"] + budget["cpu"] <= vcpus
+                     and host["memory_mb"] + budget["memory_mb"] <= memory_mb), None)
+
+        if host is None:
+            host = {"roles": [], "cpu": 0, "memory_mb": 0}
+            hosts.append(host)
+
+        host["roles"].append(role)
+        host["cpu"] += budget["cpu"]
+        host["memory_mb"] += budget["memory_mb"]
+
+    return [host["roles"] for host in hosts]
+
+
+def _vm_create(server_type, num, stack, start=0, stock_image=False):
+    """
+    Create VMs for a specific server type in the Kafka cluster, spread
+    round-robin across the subnets.
+
+    Only hosts from index start on are created - the hostnames of all
+    hosts are returned.  With bake_image, the hosts boot from the baked
+    image of the account unless stock_image is set.
+    """
     arguments = stack.get_tagged_vars(tag="create", output="dict")
     arguments["ip_key"] = "private_ip"
 
-    if stack.ami:
+    if stack.bake_image and not stock_image:
+        arguments["ami_filter"] = stack.image_name
+        arguments["ami_owner"] = "self"
+    elif stack.ami:
         arguments["ami"] = stack.ami
     elif stack.ami_filter and stack.ami_owner:
         arguments["ami_filter"] = stack.ami_filter
         arguments["ami_owner"] = stack.ami_owner
 
-    arguments["size"] = stack.instance_type
-    hosts = []
+    arguments["size"] = _get_instance_type(server_type, stack)
 
-    # Create ec2 instances
-    for num in range(int(num)):
-        hostname = f"{stack.hostname_base}-{server_type}-num-{num}".replace("_", "-")
-        hosts.append(hostname)
+    disksizes = _to_dict(stack.disksizes)
 
+    if disksizes.get(server_type):
+        arguments["disksize"] = disksizes[server_type]
+
+    hosts = _get_hostnames(server_type, num, stack)
+
+    placements = _get_placements(num, stack)
+
+    # Create ec2 instances
+    for hostname, (subnet_id, _) in list(zip(hosts, placements))[int(start):]:
         arguments["hostname"] = hostname
+        arguments["subnet_ids"] = [subnet_id] if isinstance(stack.subnet_ids, list) else subnet_id
         arguments["bootstrap_for_exec"] = None
 
         human_description = f"Creating hostname {hostname} on ec2"
@@ -50,6 +290,37 @@ def _vm_create(server_type, num, stack):
     return hosts
 
 
+def _data_volumes_create(hosts, stack):
+    """Create and attach dedicated gp3 data volumes to each broker host."""
+    if not stack.broker_data_volumes:
+        return
+
+    for hostname in hosts:
+        for idx in range(int(stack.broker_data_volumes)):
+            arguments = {
+                "hostname": hostname,
+                "volume_name": f"{hostname}-data-{idx}",
+                "volume_size": stack.broker_data_volume_size,
+                "volume_type": "gp3",
+                "iops": stack.broker_data_volume_iops,
+                "throughput": stack.broker_data_volume_throughput,
+                "device_name": f"/dev/sd{chr(ord('f') + idx)}",
+                "aws_default_region": stack.aws_default_region
+            }
+
+            if stack.cloud_tags_hash:
+                arguments["cloud_tags_hash"] = stack.cloud_tags_hash
+
+            human_description = f"Creating data volume {idx} for hostname {hostname}"
+            inputargs = {
+                "arguments": arguments,
+                "automation_phase": "infrastructure",
+                "human_description": human_description
+            }
+
+            stack.ebs_volume.insert(display=True, **inputargs)
+
+
 class Main(newSchedStack):
 
     def __init__(self, stackargs):
@@ -65,6 +336,13 @@ class Main(newSchedStack):
         self.parse.add_required(key="num_of_ksql", types="int", default=1)
         self.parse.add_required(key="num_of_control_center", types="int", default=1)
         
+        # zookeeper or kraft - KRaft controllers are dedicated hosts or
+        # run combined on the first num_of_controller brokers
+        self.parse.add_optional(key="metadata_mode", types="str", tags="kafka", default="zookeeper")
+        self.parse.add_optional(key="num_of_controller", types="int", default=3)
+        self.parse.add_optional(key="kraft_controllers", types="str", default="dedicated")
+        self.parse.add_optional(key="confluent_version", types="str", tags="kafka", default="null")
+
         self.parse.add_optional(key="ami", default="null")
         self.parse.add_optional(key="ami_filter",
                                 types="str",
@@ -74,6 +352,11 @@ class Main(newSchedStack):
 
         self.parse.add_optional(key="bastion_destroy", default="null")
 
+        # golden image - baked once per Confluent version and role set
+        # and reused, so cluster hosts boot with the packages installed
+        self.parse.add_optional(key="bake_image", default="null")
+        self.parse.add_optional(key="image_name_prefix", types="str", default="kafka-cp")
+
         # bastion configs
         self.parse.add_required(key="bastion_sg_id", default="null")
         self.parse.add_required(key="bastion_subnet_ids", default="null")
@@ -94,8 +377,56 @@ class Main(newSchedStack):
         self.parse.add_required(key="sg_id", tags="create", default="null")
         self.parse.add_required(key="vpc_id", types="str", tags="create,bastion", default="null")
         self.parse.add_required(key="subnet_ids", tags="create", default="null")
-        self.parse.add_optional(key="instance_type", types="str", tags="create", default="t3.micro")
+        self.parse.add_optional(key="availability_zones", default="null")
+        self.parse.add_optional(key="replica_selector", tags="kafka", default="null")
+        self.parse.add_optional(key="instance_type", types="str", tags="create,kafka", default="t3.micro")
+
+        # per server type instance type and disk size in GB, e.g.
+        # {"broker": "r6i.2xlarge", "shared": "m6i.2xlarge"}
+        self.parse.add_optional(key="instance_types", tags="kafka", default="null")
+        self.parse.add_optional(key="disksizes", default="null")
+
+        # pack Schema Registry, REST, KSQL and Control Center onto shared
+        # hosts by their vCPU and memory budgets
+        self.parse.add_optional(key="pack_roles", default="null")
+        self.parse.add_optional(key="packing_budgets", default="null")
+        self.parse.add_optional(key="sizing_overrides", tags="kafka", default="null")
+        self.parse.add_optional(key="artifact_cache", tags="kafka", default="null")
+        self.parse.add_optional(key="host_tuning", tags="kafka", default=True)
+        self.parse.add_optional(key="host_tuning_fail_on_drift", tags="kafka", default="null")
+        self.parse.add_optional(key="rolling_restart", tags="kafka", default=True)
+        self.parse.add_optional(key="restart_gate", tags="kafka", default="null")
+
+        # broker scale out - the number of brokers before num_of_broker was raised
+        self.parse.add_optional(key="scale_out_from_broker", types="int", default="null")
+        self.parse.add_optional(key="reassign_throttle_bytes", types="int", tags="kafka", default="null")
+
+        # post install perf test matrix
+        self.parse.add_optional(key="benchmark", tags="kafka", default="null")
+        self.parse.add_optional(key="benchmark_matrix", tags="kafka", default="null")
+        self.parse.add_optional(key="benchmark_thresholds", tags="kafka", default="null")
+        self.parse.add_optional(key="benchmark_fail_below", tags="kafka", default="null")
+
+        # declarative topic spec applied once the brokers are up
+        self.parse.add_optional(key="topics", tags="kafka", default="null")
+        self.parse.add_optional(key="topics_dry_run", tags="kafka", default="null")
+
+        # prometheus exporter on every role
+        self.parse.add_optional(key="metrics", tags="kafka", default="null")
+        self.parse.add_optional(key="metrics_jolokia", tags="kafka", default="null")
+
+        # health checks that end each install phase
+        self.parse.add_optional(key="readiness", tags="kafka", default=True)
+        self.parse.add_optional(key="readiness_timeout", types="int", tags="kafka", default="null")
+        self.parse.add_optional(key="readiness_serve_grace", types="int", tags="kafka", default="null")
+
         self.parse.add_optional(key="disksize", types="int", tags="create,bastion", default="20")
+
+        # broker data volumes (JBOD) - 0 keeps data on the root disk
+        self.parse.add_optional(key="broker_data_volumes", types="int", tags="kafka", default=0)
+        self.parse.add_optional(key="broker_data_volume_size", types="int", default=100)
+        self.parse.add_optional(key="broker_data_volume_iops", types="int", default=3000)
+        self.parse.add_optional(key="broker_data_volume_throughput", types="int", default=125)
         self.parse.add_optional(key="publish_to_saas", default="null")
         self.parse.add_optional(key="labels", default="null")
         self.parse.add_optional(key="cloud_tags_hash", 
@@ -106,7 +437,9 @@ class Main(newSchedStack):
         # Add substack
         self.stack.add_substack("config0-hub:::aws::new_ec2_ssh_key")
         self.stack.add_substack("config0-hub:::ubuntu::ec2_ubuntu")
+        self.stack.add_substack("config0-hub:::aws::ebs_volume")
         self.stack.add_substack("config0-hub:::kafka::kafka_cluster_on_ubuntu")
+        self.stack.add_substack("config0-hub:::kafka::kafka_image_bake_on_ubuntu")
         self.stack.add_substack("config0-hub:::config0_core::delete_resource")
 
         self.stack.init_substacks()
@@ -180,6 +513,161 @@ class Main(newSchedStack):
 
         return self.stack.ec2_ubuntu.insert(display=True, **inputargs)
 
+    def _get_quorum_type(self):
+        """
+        Return the server type and count of the hosts that run the
+        metadata quorum, or None when the controllers are combined
+        with the brokers.
+        """
+        if self.stack.metadata_mode != "kraft":
+            return "zookeeper", self.stack.num_of_zookeeper
+
+        if self.stack.kraft_controllers == "combined":
+            return None
+
+        if self.stack.kraft_controllers != "dedicated":
+            raise Exception(f"kraft_controllers must be dedicated or combined, not {self.stack.kraft_controllers}")
+
+        return "controller", self.stack.num_of_controller
+
+    def _get_quorum_hosts(self, broker_hosts, create=False):
+        """
+        Return the zookeeper_hosts or controller_hosts argument of the
+        cluster, creating the dedicated quorum VMs when create is set.
+        """
+        quorum = self._get_quorum_type()
+
+        if quorum is None:
+            if int(self.stack.num_of_controller) > len(broker_hosts):
+                raise Exception(f"num_of_controller {self.stack.num_of_controller} is more than "
+                                f"num_of_broker {len(broker_hosts)} for combined controllers")
+
+            return {"controller_hosts": broker_hosts[:int(self.stack.num_of_controller)]}
+
+        server_type, num = quorum
+
+        if create:
+            hosts = _vm_create(server_type, num, self.stack)
+        else:
+            hosts = _get_hostnames(server_type, num, self.stack)
+
+        return {f"{server_type}_hosts": hosts}
+
+    def _get_packing(self):
+        """
+        Return the packing plan - the roles on each shared host and the
+        budgets used - or None when every role gets its own hosts.
+        """
+        if not self.stack.pack_roles:
+            return None
+
+        budgets = {role: dict(budget) for role, budget in _PACKING_BUDGETS.items()}
+
+        for role, budget in _to_dict(self.stack.packing_budgets).items():
+            if role not in budgets:
+                raise Exception(f"packing_budgets role {role} must be one of: {', '.join(budgets)}")
+
+            budgets[role].update(budget)
+
+        instance_type = _get_instance_type("shared", self.stack)
+
+        if instance_type not in _INSTANCE_CAPACITY:
+            raise Exception(f"shared host instance type {instance_type} is not in the packing table: "
+                            f"{', '.join(_INSTANCE_CAPACITY)}")
+
+        counts = {role: getattr(self.stack, f"num_of_{role}") for role in budgets}
+
+        return {
+            "hosts": _pack_roles(counts, budgets, _INSTANCE_CAPACITY[instance_type]),
+            "budgets": budgets
+        }
+
+    def _get_packable_hosts(self, create=False):
+        """
+        Return the <role>_hosts arguments of the packable roles, creating
+        the VMs when create is set.  With pack_roles, the roles are
+        placed on the shared hosts of the packing plan.
+        """
+        get_hosts = _vm_create if create else _get_hostnames
+        packing = self._get_packing()
+
+        if not packing:
+            return {f"{role}_hosts": get_hosts(role, getattr(self.stack, f"num_of_{role}"), self.stack)
+                    for role in _PACKING_BUDGETS}
+
+        shared_hosts = get_hosts("shared", len(packing["hosts"]), self.stack)
+
+        return {f"{role}_hosts": [hostname for hostname, roles in zip(shared_hosts, packing["hosts"])
+                                  if role in roles]
+                for role in _PACKING_BUDGETS}
+
+    def _get_bake_roles(self):
+        """Return the Ansible roles of the cluster's server types."""
+        server_types = ["broker", "schema_registry", "connect", "rest", "ksql", "control_center"]
+        quorum = self._get_quorum_type()
+
+        if quorum:
+            server_types.append(quorum[0])
+
+        return sorted(_SERVER_ROLES[server_type] for server_type in server_types)
+
+    def _get_confluent_version(self):
+        if self.stack.confluent_version:
+            return self.stack.confluent_version
+
+        if self.stack.metadata_mode == "kraft":
+            return _KRAFT_CONFLUENT_VERSION
+
+        return _DEFAULT_CONFLUENT_VERSION
+
+    def _set_image_name(self):
+        self.stack.set_variable("image_name",
+                              _get_image_name(self.stack.image_name_prefix,
+                                              self._get_confluent_version(),
+                                              self._get_bake_roles()),
+                              types="str")
+
+    def run_bake(self):
+        """
+        Bake the golden image from a builder host on the stock image.
+        An image of the same Confluent version and role set is reused
+        without creating the builder.
+        """
+        self.stack.init_variables()
+
+        self._set_hostname_base()
+        self._set_bastion_hostname()
+        self._set_ssh_key_name()
+        self._set_image_name()
+
+        if _get_baked_image(self.stack):
+            self.stack.logger.debug(f"image {self.stack.image_name} is already baked")
+            return
+
+        bake_hostname = _vm_create("bake", 1, self.stack, stock_image=True)[0]
+
+        arguments = {
+            "bastion_hostname": self.stack.bastion_hostname,
+            "ssh_key_name": self.stack.ssh_key_name,
+            "aws_default_region": self.stack.aws_default_region,
+            "bake_hostname": bake_hostname,
+            "image_name": self.stack.image_name,
+            "confluent_version": self._get_confluent_version(),
+            "bake_roles": ",".join(self._get_bake_roles())
+        }
+
+        if self.stack.publish_to_saas:
+            arguments["publish_to_saas"] = True
+
+        human_description = f"Bake Kafka Image {self.stack.image_name}"
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": human_description
+        }
+
+        return self.stack.kafka_image_bake_on_ubuntu.insert(display=True, **inputargs)
+
     def run_create(self):
         self.stack.init_variables()
 
@@ -187,9 +675,12 @@ class Main(newSchedStack):
         self._set_bastion_hostname()
         self._set_ssh_key_name()
 
+        if self.stack.bake_image:
+            self._set_image_name()
+
         self.stack.set_parallel()
 
-        # zookeeper_hosts
+        # zookeeper_hosts or controller_hosts
         # broker_hosts
         # schema_registry_hosts
         # connect_hosts
@@ -197,48 +688,68 @@ class Main(newSchedStack):
         # ksql_hosts
         # control_center_hosts
 
-        zookeeper_hosts = _vm_create("zookeeper",
-                                     self.stack.num_of_zookeeper,
-                                     self.stack)
-
         broker_hosts = _vm_create("broker",
                                   self.stack.num_of_broker,
                                   self.stack)
 
-        schema_registry_hosts = _vm_create("schema_registry",
-                                           self.stack.num_of_schema_registry,
-                                           self.stack)
+        quorum_hosts = self._get_quorum_hosts(broker_hosts, create=True)
 
         connect_hosts = _vm_create("connect",
                                    self.stack.num_of_connect,
                                    self.stack)
 
-        rest_hosts = _vm_create("rest",
-                                self.stack.num_of_rest,
-                                self.stack)
-
-        ksql_hosts = _vm_create("ksql",
-                                self.stack.num_of_ksql,
-                                self.stack)
+        # schema_registry, rest, ksql and control_center - own or shared hosts
+        packable_hosts = self._get_packable_hosts(create=True)
 
-        control_center_hosts = _vm_create("control_center",
-                                          self.stack.num_of_control_center,
-                                          self.stack)
+        self.stack.unset_parallel()
 
+        self.stack.set_parallel()
+        _data_volumes_create(broker_hosts, self.stack)
         self.stack.unset_parallel()
 
+        return self._cluster_insert(broker_hosts=broker_hosts,
+                                    connect_hosts=connect_hosts,
+                                    **packable_hosts,
+                                    **quorum_hosts)
+
+    def _cluster_insert(self, reassign_partitions=None, **hosts):
+        import json
+
         arguments = self.stack.get_tagged_vars(tag="kafka", output="dict")
-        arguments["zookeeper_hosts"] = zookeeper_hosts
-        arguments["broker_hosts"] = broker_hosts
-        arguments["schema_registry_hosts"] = schema_registry_hosts
-        arguments["connect_hosts"] = connect_hosts
-        arguments["rest_hosts"] = rest_hosts
-        arguments["ksql_hosts"] = ksql_hosts
-        arguments["control_center_hosts"] = control_center_hosts
+        arguments.update(hosts)
+
+        hosts_by_type = {
+            "broker": self.stack.num_of_broker,
+            "connect": self.stack.num_of_connect
+        }
+
+        packing = self._get_packing()
+
+        if packing:
+            hosts_by_type["shared"] = len(packing["hosts"])
+
+            # heaps sized to the memory budgets - explicit overrides win
+            sizing_overrides = {_PACKING_HEAP_VARS[role]: f"-Xmx{int(budget['memory_mb']) * 3 // 4}m"
+                                for role, budget in packing["budgets"].items()}
+            sizing_overrides.update(_to_dict(self.stack.sizing_overrides))
+            arguments["sizing_overrides"] = json.dumps(sizing_overrides)
+        else:
+            hosts_by_type.update({role: getattr(self.stack, f"num_of_{role}") for role in _PACKING_BUDGETS})
+
+        quorum = self._get_quorum_type()
+
+        if quorum:
+            hosts_by_type[quorum[0]] = quorum[1]
+
+        # rack per host from the subnet placement - becomes broker.rack
+        arguments["host_racks"] = json.dumps(_get_host_racks(hosts_by_type, self.stack))
 
         if self.stack.publish_to_saas:
             arguments["publish_to_saas"] = True
 
+        if reassign_partitions:
+            arguments["reassign_partitions"] = True
+
         human_description = f"Create Kafka Cluster {self.stack.kafka_cluster}"
         inputargs = {
             "arguments": arguments,
@@ -248,12 +759,69 @@ class Main(newSchedStack):
 
         return self.stack.kafka_cluster_on_ubuntu.insert(display=True, **inputargs)
 
+    def run_scale_out(self):
+        """
+        Create only the brokers added since scale_out_from_broker, then
+        re-apply the cluster and spread the existing partitions over
+        the new brokers.
+        """
+        self.stack.init_variables()
+
+        self._set_hostname_base()
+        self._set_bastion_hostname()
+        self._set_ssh_key_name()
+
+        if self.stack.bake_image:
+            self._set_image_name()
+
+        start = int(self.stack.scale_out_from_broker)
+
+        if start >= int(self.stack.num_of_broker):
+            raise Exception(f"num_of_broker {self.stack.num_of_broker} must be greater than "
+                            f"scale_out_from_broker {start} to scale out")
+
+        self.stack.set_parallel()
+        broker_hosts = _vm_create("broker",
+                                  self.stack.num_of_broker,
+                                  self.stack,
+                                  start=start)
+        self.stack.unset_parallel()
+
+        self.stack.set_parallel()
+        _data_volumes_create(broker_hosts[start:], self.stack)
+        self.stack.unset_parallel()
+
+        return self._cluster_insert(
+            reassign_partitions=True,
+            broker_hosts=broker_hosts,
+            connect_hosts=_get_hostnames("connect", self.stack.num_of_connect, self.stack),
+            **self._get_packable_hosts(),
+            **self._get_quorum_hosts(broker_hosts))
+
     def run_cleanup(self):
         self.stack.init_variables()
 
         self._set_hostname_base()
         self._set_bastion_hostname()
 
+        # the builder is only needed while the image is created, and is
+        # not created at all when the image was already baked
+        bake_hostname = _get_hostnames("bake", 1, self.stack)[0]
+
+        if self.stack.bake_image and self.stack.get_resource(resource_type="server", hostname=bake_hostname):
+            human_description = f"Destroying image builder hostname {bake_hostname} on ec2"
+            inputargs = {
+                "arguments": {
+                    "must_exists": True,
+                    "hostname": bake_hostname,
+                    "resource_type": "server"
+                },
+                "automation_phase": "infrastructure",
+                "human_description": human_description
+            }
+
+            self.stack.delete_resource.insert(display=True, **inputargs)
+
         arguments = {
             "must_exists": True,
             "hostname": self.stack.bastion_hostname,
@@ -270,10 +838,47 @@ class Main(newSchedStack):
 
             return self.stack.delete_resource.insert(display=True, **inputargs)
 
+    def _is_scale_out(self):
+        self.stack.init_variables()
+        return bool(self.stack.scale_out_from_broker)
+
+    def _is_bake_image(self):
+        self.stack.init_variables()
+        return bool(self.stack.bake_image)
+
+    def _get_bastion_successor(self):
+        """Return the job that runs right after the bastion is created."""
+        if self._is_bake_image():
+            return "bake"
+
+        return "scale_out" if self._is_scale_out() else "create"
+
+    def _get_timewait(self, job):
+        if job in ("bastion", self._get_bastion_successor()):
+            return _BASTION_TIMEWAIT
+
+        return _SCHED_TIMEWAIT
+
     def run(self):
         self.stack.unset_parallel(sched_init=True)
+
+        # scale out keeps the existing ssh key and hosts
+        if self._is_scale_out():
+            self.add_job("bastion")
+
+            if self._is_bake_image():
+                self.add_job("bake")
+
+            self.add_job("scale_out")
+            self.add_job("cleanup")
+            return self.finalize_jobs()
+
         self.add_job("sshkey")
         self.add_job("bastion")
+
+        if self._is_bake_image():
+            self.add_job("bake")
+
         self.add_job("create")
         self.add_job("cleanup")
 
@@ -283,7 +888,7 @@ class Main(newSchedStack):
         sched = self.new_schedule()
         sched.job = "sshkey"
         sched.archive.timeout = 1800
-        sched.archive.timewait = 120
+        sched.archive.timewait = self._get_timewait("sshkey")
         sched.archive.cleanup.instance = "clear"
         sched.failure.keep_resources = True
         sched.conditions.retries = 1
@@ -295,18 +900,31 @@ class Main(newSchedStack):
         sched = self.new_schedule()
         sched.job = "bastion"
         sched.archive.timeout = 1800
-        sched.archive.timewait = 120
+        sched.archive.timewait = self._get_timewait("bastion")
         sched.archive.cleanup.instance = "clear"
         sched.failure.keep_resources = True
         sched.automation_phase = "infrastructure"
         sched.human_description = "Create Bastion Config"
-        sched.on_success = ["create"]
+
+        sched.on_success = [self._get_bastion_successor()]
+
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "bake"
+        sched.archive.timeout = 3600
+        sched.archive.timewait = self._get_timewait("bake")
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Bake Kafka Image"
+        sched.on_success = ["scale_out"] if self._is_scale_out() else ["create"]
         self.add_schedule()
 
         sched = self.new_schedule()
         sched.job = "create"
         sched.archive.timeout = 7200
-        sched.archive.timewait = 120
+        sched.archive.timewait = self._get_timewait("create")
         sched.archive.cleanup.instance = "clear"
         sched.failure.keep_resources = True
         sched.automation_phase = "infrastructure"
@@ -315,10 +933,21 @@ class Main(newSchedStack):
         sched.on_success = ["cleanup"]
         self.add_schedule()
 
+        sched = self.new_schedule()
+        sched.job = "scale_out"
+        sched.archive.timeout = 7200
+        sched.archive.timewait = self._get_timewait("scale_out")
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Scale Out Kafka Brokers"
+        sched.on_success = ["cleanup"]
+        self.add_schedule()
+
         sched = self.new_schedule()
         sched.job = "cleanup"
         sched.archive.timeout = 1800
-        sched.archive.timewait = 120
+        sched.archive.timewait = self._get_timewait("cleanup")
         sched.archive.cleanup.instance = "clear"
         sched.failure.keep_resources = True
         sched.automation_phase = "infrastructure"
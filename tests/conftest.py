@@ -0,0 +1,84 @@
+"""
+Loaders for the config0 stack modules and helper scripts under test.
+
+The stack run.py files are executed by config0, which provides the
+stack base classes as builtins, so they are loaded from their path with
+stand-ins for those names.
+"""
+
+import builtins
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STACKS_DIR = os.path.join(REPO_DIR, "stacks", "_config0_configs")
+SCRIPTS_DIR = os.path.join(REPO_DIR, "scripts", "_config0_configs", "_bin")
+ANSIBLE_DIR = os.path.join(REPO_DIR, "execgroups", "_config0_configs", "ubuntu_vendor_setup",
+                           "_chrootfiles", "var", "tmp", "ansible")
+
+
+class _SchedStack:
+
+    def __init__(self, stackargs):
+        self.stackargs = stackargs
+
+
+def load_module(name, path):
+    """Load a python file (with or without a .py suffix) as a module."""
+    for builtin_name, stand_in in (("newSchedStack", _SchedStack),):
+        if not hasattr(builtins, builtin_name):
+            setattr(builtins, builtin_name, stand_in)
+
+    loader = importlib.machinery.SourceFileLoader(name, path)
+    spec = importlib.util.spec_from_loader(name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def _stub_config0_publisher():
+    """Stand in for the config0_publisher modules the helper scripts import."""
+    modules = {
+        "config0_publisher": {},
+        "config0_publisher.loggerly": {"Config0Logger": object},
+        "config0_publisher.resource": {},
+        "config0_publisher.resource.manage": {"ResourceCmdHelper": object}
+    }
+
+    for name, attrs in modules.items():
+        if name not in sys.modules:
+            sys.modules[name] = types.ModuleType(name)
+            vars(sys.modules[name]).update(attrs)
+
+
+def load_stack(stack_name):
+    return load_module(f"{stack_name}_run",
+                       os.path.join(STACKS_DIR, stack_name, "_files", "run.py"))
+
+
+@pytest.fixture(scope="session")
+def cluster_stack():
+    return load_stack("kafka_cluster_on_ubuntu")
+
+
+@pytest.fixture(scope="session")
+def ec2_stack():
+    return load_stack("kafka_on_ec2")
+
+
+@pytest.fixture(scope="session")
+def replica_hosts():
+    _stub_config0_publisher()
+    return load_module("create_ansible_replica_hosts",
+                       os.path.join(SCRIPTS_DIR, "create_ansible_replica_hosts"))
+
+
+def load_role_file(role, filename):
+    return load_module(os.path.splitext(filename)[0],
+                       os.path.join(ANSIBLE_DIR, "roles", role, "files", filename))
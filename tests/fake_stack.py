@@ -0,0 +1,53 @@
+"""In-memory stand-in for the config0 stack object used by the run.py modules."""
+
+import json
+import time
+
+
+class FakeStack:
+    """
+    Serves server resources from a list, matching the query fields the
+    way the resource store does, and counts the lookups made.  An
+    optional latency is added to every lookup as the round trip cost.
+    """
+
+    def __init__(self, servers=(), latency=0):
+        self.servers = list(servers)
+        self.latency = latency
+        self.queries = []
+
+    def get_resource(self, resource_type=None, must_exists=False, must_be_one=False, **query):
+        self.queries.append(dict(query, resource_type=resource_type))
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        results = [server for server in self.servers
+                   if server.get("resource_type", "server") == resource_type
+                   and all(server.get(key) == value for key, value in query.items())]
+
+        if must_exists and not results:
+            raise Exception(f"resource not found: {query}")
+
+        if must_be_one:
+            if len(results) != 1:
+                raise Exception(f"expected one resource for {query}, found {len(results)}")
+            return results[0]
+
+        return results
+
+    @staticmethod
+    def to_list(value):
+        if isinstance(value, list):
+            return value
+        if str(value).startswith("["):
+            return json.loads(value)
+        return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def get_servers(hostnames, subnet="10.0"):
+    """Server resources for hostnames with one private IP each."""
+    return [{"resource_type": "server",
+             "hostname": hostname,
+             "private_ip": f"{subnet}.{idx // 250}.{idx % 250 + 4}"}
+            for idx, hostname in enumerate(hostnames)]
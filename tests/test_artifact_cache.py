@@ -0,0 +1,132 @@
+"""
+The artifact cache apt repository: deb_repo.py indexes the cached debs
+and apt installs from the index served over http, as the cluster hosts
+do through their forwarded artifact_cache_port.
+"""
+
+import functools
+import hashlib
+import http.server
+import os
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from conftest import load_role_file
+
+needs_dpkg = pytest.mark.skipif(not shutil.which("dpkg-deb"), reason="dpkg-deb is not installed")
+
+
+@pytest.fixture(scope="module")
+def deb_repo():
+    return load_role_file("confluent.artifact_cache", "deb_repo.py")
+
+
+def _build_deb(tmp_path, repo_dir, package, version, compression="xz"):
+    pkg_dir = tmp_path / f"{package}-build"
+    (pkg_dir / "DEBIAN").mkdir(parents=True)
+    (pkg_dir / "opt" / package).mkdir(parents=True)
+    (pkg_dir / "opt" / package / "VERSION").write_text(version)
+    (pkg_dir / "DEBIAN" / "control").write_text(f"Package: {package}\n"
+                                                f"Version: {version}\n"
+                                                "Architecture: all\n"
+                                                "Maintainer: Config0 <support@config0.com>\n"
+                                                "Description: artifact cache test package\n")
+    deb_path = repo_dir / f"{package}_{version}_all.deb"
+    subprocess.run(["dpkg-deb", f"-Z{compression}", "--build", str(pkg_dir), str(deb_path)],
+                   check=True, stdout=subprocess.DEVNULL)
+
+    return deb_path
+
+
+def _parse_index(path):
+    return [dict(line.split(": ", 1) for line in stanza.splitlines())
+            for stanza in path.read_text().strip().split("\n\n")]
+
+
+@needs_dpkg
+def test_index(deb_repo, tmp_path):
+    repo_dir = tmp_path / "debs"
+    repo_dir.mkdir()
+    debs = [_build_deb(tmp_path, repo_dir, "confluent-test-xz", "7.6.1-1"),
+            _build_deb(tmp_path, repo_dir, "confluent-test-gzip", "7.6.1-1", compression="gzip")]
+
+    assert deb_repo.write_index(str(repo_dir)) == 2
+
+    stanzas = {stanza["Package"]: stanza for stanza in _parse_index(repo_dir / "Packages")}
+
+    for deb in debs:
+        stanza = stanzas[deb.name.split("_")[0]]
+        content = deb.read_bytes()
+
+        assert stanza["Version"] == "7.6.1-1"
+        assert stanza["Filename"] == f"./{deb.name}"
+        assert stanza["Size"] == str(len(content))
+        assert stanza["SHA256"] == hashlib.sha256(content).hexdigest()
+
+
+def test_not_a_deb(deb_repo, tmp_path):
+    (tmp_path / "broken.deb").write_bytes(b"not an archive")
+
+    with pytest.raises(ValueError, match="not a deb archive"):
+        deb_repo.write_index(str(tmp_path))
+
+
+@pytest.fixture
+def served_cache(tmp_path):
+    """The artifact cache directory served over http on a local port."""
+    cache_dir = tmp_path / "artifact_cache"
+    (cache_dir / "debs").mkdir(parents=True)
+
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(cache_dir))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield cache_dir, f"http://127.0.0.1:{server.server_address[1]}"
+
+    server.shutdown()
+    server.server_close()
+
+
+@needs_dpkg
+@pytest.mark.skipif(not shutil.which("apt-get") or os.geteuid() != 0, reason="needs apt-get as root")
+def test_apt_installs_from_served_index(deb_repo, tmp_path, served_cache):
+    cache_dir, url = served_cache
+    _build_deb(tmp_path, cache_dir / "debs", "confluent-test", "7.6.1-1")
+    deb_repo.write_index(str(cache_dir / "debs"))
+
+    # apt state and the install root are kept under tmp_path
+    root = tmp_path / "root"
+    (root / "var" / "lib" / "dpkg" / "updates").mkdir(parents=True)
+    (root / "var" / "lib" / "dpkg" / "info").mkdir()
+    (root / "var" / "lib" / "dpkg" / "status").touch()
+    (tmp_path / "lists" / "partial").mkdir(parents=True)
+    (tmp_path / "cache" / "archives" / "partial").mkdir(parents=True)
+
+    # the source confluent.common adds on the hosts
+    sources = tmp_path / "sources.list"
+    sources.write_text(f"deb [trusted=yes] {url}/debs ./\n")
+
+    options = []
+
+    for option in (f"Dir::Etc::sourcelist={sources}",
+                   "Dir::Etc::sourceparts=-",
+                   f"Dir::State::Lists={tmp_path / 'lists'}",
+                   f"Dir::Cache={tmp_path / 'cache'}",
+                   f"Dir::State::status={root / 'var' / 'lib' / 'dpkg' / 'status'}",
+                   f"DPkg::Options::=--root={root}",
+                   f"DPkg::Options::=--admindir={root / 'var' / 'lib' / 'dpkg'}",
+                   "DPkg::Options::=--force-script-chrootless",
+                   "Debug::NoLocking=1",
+                   "APT::Sandbox::User=root"):
+        options += ["-o", option]
+
+    for command in (["update"], ["install", "-y", "confluent-test"]):
+        result = subprocess.run(["apt-get"] + options + command,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        assert result.returncode == 0, result.stdout[-3000:]
+
+    assert (root / "opt" / "confluent-test" / "VERSION").read_text() == "7.6.1-1"
@@ -0,0 +1,48 @@
+import pytest
+
+BROKER_IPS = ["10.0.1.1", "10.0.1.2", "10.0.1.3"]
+
+
+@pytest.mark.parametrize("ssl_enabled,mutual_auth,sasl_protocol,expected", [
+    (False, False, "none", "PLAINTEXT"),
+    (True, False, "none", "SSL"),
+    (True, True, "none", "SSL"),
+    (True, False, "plain", "SASL_SSL"),
+    (False, False, "plain", "SASL_PLAINTEXT"),
+])
+def test_client_security_per_protocol(cluster_stack, ssl_enabled, mutual_auth, sasl_protocol, expected):
+    security_protocol = cluster_stack._get_security_protocol(ssl_enabled, sasl_protocol=sasl_protocol)
+    profiles = cluster_stack._get_client_profiles(BROKER_IPS, security_protocol,
+                                                  mutual_auth=mutual_auth, sasl_protocol=sasl_protocol)
+    common = profiles["common"]
+
+    assert security_protocol == expected
+    assert profiles["security_protocol"] == expected
+    assert common["security.protocol"] == expected
+    assert common["bootstrap.servers"] == "10.0.1.1:9092,10.0.1.2:9092,10.0.1.3:9092"
+
+    # the truststore is the client's own, never a path on a broker
+    assert ("ssl.truststore.location" in common) == ssl_enabled
+    assert not common.get("ssl.truststore.location", "<").startswith("/")
+
+    assert ("ssl.keystore.location" in common) == (ssl_enabled and mutual_auth)
+    assert ("sasl.mechanism" in common) == (sasl_protocol != "none")
+
+    if sasl_protocol == "plain":
+        assert common["sasl.mechanism"] == "PLAIN"
+        # credentials are never published
+        assert 'username="<client username>" password="<client password>"' in common["sasl.jaas.config"]
+
+    for properties in profiles["properties"].values():
+        assert f"security.protocol={expected}" in properties.splitlines()
+
+
+@pytest.mark.parametrize("sasl_protocol", ["none", "kerberos"])
+def test_client_security_sasl_without_plain(cluster_stack, sasl_protocol):
+    with pytest.raises(Exception, match="needs sasl_protocol plain"):
+        cluster_stack._get_client_security("SASL_PLAINTEXT", sasl_protocol=sasl_protocol)
+
+
+def test_client_security_unknown_protocol(cluster_stack):
+    with pytest.raises(Exception, match="unknown security protocol"):
+        cluster_stack._get_client_security("SSL_PLAINTEXT")
@@ -0,0 +1,141 @@
+from types import SimpleNamespace
+
+import pytest
+
+from fake_stack import FakeStack
+
+
+def _get_schedules(ec2_stack, bake_image=None, scale_out_from_broker=None):
+    """Run Main.schedule with a stand-in for the scheduler and stack."""
+    main = ec2_stack.Main.__new__(ec2_stack.Main)
+    main.stack = SimpleNamespace(init_variables=lambda: None,
+                                 bake_image=bake_image,
+                                 scale_out_from_broker=scale_out_from_broker)
+
+    schedules = []
+
+    def _new_schedule():
+        main._sched = SimpleNamespace(archive=SimpleNamespace(cleanup=SimpleNamespace()),
+                                      failure=SimpleNamespace(),
+                                      conditions=SimpleNamespace())
+        return main._sched
+
+    main.new_schedule = _new_schedule
+    main.add_schedule = lambda: schedules.append(main._sched)
+    main.get_schedules = lambda: {sched.job: sched for sched in schedules}
+
+    return main.schedule()
+
+
+@pytest.mark.parametrize("bake_image,scale_out_from_broker,successor", [
+    (None, None, "create"),
+    (None, "broker-1", "scale_out"),
+    (True, None, "bake"),
+    (True, "broker-1", "bake"),
+])
+def test_bastion_edge_waits_longer(ec2_stack, bake_image, scale_out_from_broker, successor):
+    schedules = _get_schedules(ec2_stack, bake_image, scale_out_from_broker)
+
+    assert schedules["bastion"].on_success == [successor]
+
+    for job, sched in schedules.items():
+        expected = ec2_stack._BASTION_TIMEWAIT if job in ("bastion", successor) else ec2_stack._SCHED_TIMEWAIT
+        assert sched.archive.timewait == expected, job
+
+
+def _placement_stack(subnet_ids, availability_zones=None):
+    return SimpleNamespace(subnet_ids=subnet_ids, availability_zones=availability_zones)
+
+
+@pytest.mark.parametrize("subnet_ids,zones,expected", [
+    ("subnet-a,subnet-b", None,
+     [("subnet-a", "subnet-a"), ("subnet-b", "subnet-b"), ("subnet-a", "subnet-a")]),
+    (["subnet-a", "subnet-b"], '["us-east-1a", "us-east-1b"]',
+     [("subnet-a", "us-east-1a"), ("subnet-b", "us-east-1b"), ("subnet-a", "us-east-1a")]),
+    ('["subnet-a"]', "us-east-1a",
+     [("subnet-a", "us-east-1a")] * 3),
+])
+def test_placements_round_robin(ec2_stack, subnet_ids, zones, expected):
+    assert ec2_stack._get_placements(3, _placement_stack(subnet_ids, zones)) == expected
+
+
+@pytest.mark.parametrize("subnet_ids,zones,error", [
+    ("subnet-a,subnet-b", "us-east-1a", r"availability_zones \(1\) must match subnet_ids \(2\)"),
+    ("subnet-a", "us-east-1a,us-east-1b", r"availability_zones \(2\) must match subnet_ids \(1\)"),
+    (None, None, "subnet_ids is required"),
+    ("", "us-east-1a", "subnet_ids is required"),
+    ("[]", None, "subnet_ids is required"),
+])
+def test_placements_invalid(ec2_stack, subnet_ids, zones, error):
+    with pytest.raises(Exception, match=error):
+        ec2_stack._get_placements(3, _placement_stack(subnet_ids, zones))
+
+
+class _Inserts:
+
+    def __init__(self):
+        self.calls = []
+
+    def insert(self, display=False, **inputargs):
+        self.calls.append(inputargs)
+
+
+class _BakeStack(FakeStack):
+
+    def __init__(self, servers=()):
+        super().__init__(servers)
+        self.kafka_cluster = "kc"
+        self.bake_image = True
+        self.image_name_prefix = "kafka-cp"
+        self.confluent_version = "7.6.1"
+        self.metadata_mode = "zookeeper"
+        self.num_of_zookeeper = 3
+        self.instance_type = "m5.large"
+        self.instance_types = self.disksizes = self.ami = self.ami_filter = None
+        self.subnet_ids = "subnet-a"
+        self.availability_zones = None
+        self.aws_default_region = "us-east-1"
+        self.publish_to_saas = None
+        self.bastion_destroy = None
+        self.logger = SimpleNamespace(debug=lambda message: None)
+        self.ec2_ubuntu = _Inserts()
+        self.kafka_image_bake_on_ubuntu = _Inserts()
+        self.delete_resource = _Inserts()
+
+    def init_variables(self):
+        pass
+
+    def set_variable(self, key, value, **kwargs):
+        setattr(self, key, value)
+
+    def get_tagged_vars(self, tag=None, output=None):
+        return {}
+
+
+def _get_main(ec2_stack, stack):
+    main = ec2_stack.Main.__new__(ec2_stack.Main)
+    main.stack = stack
+    return main
+
+
+@pytest.mark.parametrize("baked,builders", [(False, ["kc-config-bake-num-0"]), (True, [])])
+def test_bake_skips_the_builder_of_a_baked_image(ec2_stack, baked, builders):
+    image_name = ec2_stack._get_image_name(
+        "kafka-cp", "7.6.1", ["control_center", "kafka_broker", "kafka_connect",
+                              "kafka_rest", "ksql", "schema_registry", "zookeeper"])
+    stack = _BakeStack([{"resource_type": "ami", "name": image_name}] if baked else [])
+
+    _get_main(ec2_stack, stack).run_bake()
+
+    assert stack.image_name == image_name
+    assert [call["arguments"]["hostname"] for call in stack.ec2_ubuntu.calls] == builders
+    assert [call["arguments"]["bake_hostname"] for call in stack.kafka_image_bake_on_ubuntu.calls] == builders
+
+
+@pytest.mark.parametrize("builder,deleted", [(False, []), (True, ["kc-config-bake-num-0"])])
+def test_cleanup_only_deletes_a_created_builder(ec2_stack, builder, deleted):
+    stack = _BakeStack([{"resource_type": "server", "hostname": "kc-config-bake-num-0"}] if builder else [])
+
+    _get_main(ec2_stack, stack).run_cleanup()
+
+    assert [call["arguments"]["hostname"] for call in stack.delete_resource.calls] == deleted
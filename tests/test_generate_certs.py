@@ -0,0 +1,103 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import load_role_file
+
+pytestmark = pytest.mark.skipif(not shutil.which("openssl"), reason="openssl is not installed")
+
+CA_KEY = "snakeoil-ca-1.key"
+CA_CERT = "snakeoil-ca-1.crt"
+
+
+@pytest.fixture(scope="module")
+def generate_certs():
+    return load_role_file("confluent.ssl", "generate_certs.py")
+
+
+def _generate(generate_certs, capsys, ssl_dir, hosts, *args):
+    assert generate_certs.main(["--ssl-dir", str(ssl_dir), "--hosts", ",".join(hosts),
+                                "--ca-password", "capassword", "--days", "30", "--renew-days", "1",
+                                "--workers", "2"] + list(args)) in (None, 0)
+
+    return json.loads(capsys.readouterr().out)
+
+
+def _openssl(*args):
+    return subprocess.run(["openssl"] + list(args), check=True,
+                          stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+
+def _verifies(ssl_dir, host):
+    result = subprocess.run(["openssl", "verify", "-CAfile", str(ssl_dir / CA_CERT),
+                             str(ssl_dir / "hosts" / host / "cert.pem")],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def test_ca_created_only_when_absent(generate_certs, capsys, tmp_path):
+    hosts = ["10.0.1.1", "10.0.1.2"]
+
+    first = _generate(generate_certs, capsys, tmp_path, hosts)
+    ca_cert = (tmp_path / CA_CERT).read_bytes()
+    second = _generate(generate_certs, capsys, tmp_path, hosts)
+
+    assert first == {"ca_created": True, "generated": hosts, "reused": []}
+    assert second == {"ca_created": False, "generated": [], "reused": hosts}
+    assert (tmp_path / CA_CERT).read_bytes() == ca_cert
+
+
+def test_existing_ca_is_reused(generate_certs, capsys, tmp_path):
+    """A CA restored from the cluster signs the certificates of new hosts."""
+    _generate(generate_certs, capsys, tmp_path / "cluster", ["10.0.1.1"])
+
+    ssl_dir = tmp_path / "bastion"
+    ssl_dir.mkdir()
+
+    for filename in (CA_KEY, CA_CERT):
+        shutil.copy(tmp_path / "cluster" / filename, ssl_dir / filename)
+
+    summary = _generate(generate_certs, capsys, ssl_dir, ["10.0.1.1", "10.0.1.2"])
+
+    assert not summary["ca_created"]
+    assert (ssl_dir / CA_CERT).read_bytes() == (tmp_path / "cluster" / CA_CERT).read_bytes()
+    assert all(_verifies(ssl_dir, host) for host in ("10.0.1.1", "10.0.1.2"))
+
+
+def test_regenerate_ca_reissues_hosts(generate_certs, capsys, tmp_path):
+    hosts = ["10.0.1.1"]
+    _generate(generate_certs, capsys, tmp_path, hosts)
+    ca_cert = (tmp_path / CA_CERT).read_bytes()
+
+    summary = _generate(generate_certs, capsys, tmp_path, hosts, "--regenerate-ca")
+
+    assert summary == {"ca_created": True, "generated": hosts, "reused": []}
+    assert (tmp_path / CA_CERT).read_bytes() != ca_cert
+    assert _verifies(tmp_path, "10.0.1.1")
+
+
+@pytest.mark.parametrize("host,san", [
+    ("10.0.1.1", ["IP Address:10.0.1.1", "DNS:10.0.1.1"]),
+    ("kafka-broker-num-0", ["DNS:kafka-broker-num-0"]),
+])
+def test_san_names_the_host(generate_certs, capsys, tmp_path, host, san):
+    _generate(generate_certs, capsys, tmp_path, [host])
+
+    text = _openssl("x509", "-noout", "-text", "-in", str(tmp_path / "hosts" / host / "cert.pem"))
+    names = text.split("X509v3 Subject Alternative Name:")[1].strip().splitlines()[0]
+
+    assert sorted(name.strip() for name in names.split(",")) == sorted(san)
+
+
+def test_incomplete_host_material_is_regenerated(generate_certs, capsys, tmp_path):
+    hosts = ["10.0.1.1", "10.0.1.2"]
+    _generate(generate_certs, capsys, tmp_path, hosts)
+
+    # the san file is written last - without it the material is partial
+    (tmp_path / "hosts" / "10.0.1.2" / "san").unlink()
+
+    summary = _generate(generate_certs, capsys, tmp_path, hosts)
+
+    assert summary == {"ca_created": False, "generated": ["10.0.1.2"], "reused": ["10.0.1.1"]}
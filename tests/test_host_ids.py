@@ -0,0 +1,85 @@
+import pytest
+
+from conftest import load_role_file
+
+host_ids = load_role_file("confluent.host_ids", "host_ids.py")
+
+
+def test_inventory_ids_follow_input_order(replica_hosts):
+    ips = ["10.0.3.120", "10.0.2.9", "10.0.10.1"]
+
+    assert replica_hosts.Main._assign_host_ids(ips) == {"10.0.3.120": 1, "10.0.2.9": 2, "10.0.10.1": 3}
+
+
+@pytest.mark.parametrize("inventory_ids,running_ids,expected", [
+    # first install - inventory ids
+    ({"a": 1, "b": 2, "c": 3}, {}, {"a": 1, "b": 2, "c": 3}),
+    # scale out - running hosts keep their ids, new hosts take the rest
+    ({"a": 1, "b": 2, "c": 3, "d": 4, "e": 5},
+     {"a": "1", "b": "2", "c": "3"},
+     {"a": 1, "b": 2, "c": 3, "d": 4, "e": 5}),
+    # hosts whose inventory position moved keep the id they run with
+    ({"10.0.1.5": 1, "10.0.10.7": 2, "10.0.2.9": 3, "10.0.3.120": 4},
+     {"10.0.1.5": "1", "10.0.2.9": "2", "10.0.3.120": "3"},
+     {"10.0.1.5": 1, "10.0.10.7": 4, "10.0.2.9": 2, "10.0.3.120": 3}),
+    # new hosts keep a free inventory id, else take the lowest free one
+    ({"a": 1, "x": 2, "c": 3}, {"a": "1", "c": "3"}, {"a": 1, "x": 2, "c": 3}),
+    ({"x": 1, "y": 2, "c": 3}, {"c": "1"}, {"x": 3, "y": 2, "c": 1}),
+    # unreadable ids count as new hosts
+    ({"a": 1, "b": 2}, {"a": "", "b": "not-an-id"}, {"a": 1, "b": 2}),
+])
+def test_keep_running_ids(inventory_ids, running_ids, expected):
+    ids = host_ids.keep_running_ids(inventory_ids, running_ids)
+
+    assert ids == expected
+    assert list(ids) == list(inventory_ids)
+
+
+def test_new_hosts_start_above_base():
+    ids = host_ids.keep_running_ids({"a": 9001, "b": 9002}, {"b": "9001"}, base=9000)
+
+    assert ids == {"a": 9002, "b": 9001}
+
+
+def test_conflicting_running_ids():
+    with pytest.raises(host_ids.HostIdConflict, match="hosts a and b both run with id 2"):
+        host_ids.keep_running_ids({"a": 1, "b": 2}, {"a": "2", "b": "2"})
+
+
+def test_resolve_zookeeper_mode():
+    inventory = {"zookeeper": {"z1": 1, "z2": 2, "z3": 3},
+                 "kafka_broker": {"b1": 1, "b2": 2},
+                 "kafka_controller": {}}
+    running = {"z1": {"myid": "3"}, "z3": {"myid": "1"}, "b2": {"meta": "1"}}
+
+    host_vars = host_ids.resolve_host_ids(inventory, running)
+
+    assert host_vars == {"z1": {"zookeeper_id": 3},
+                         "z2": {"zookeeper_id": 2},
+                         "z3": {"zookeeper_id": 1},
+                         "b1": {"broker_id": 2},
+                         "b2": {"broker_id": 1}}
+
+
+def test_resolve_kraft_mode():
+    # combined controller on b1, dedicated controllers c1 and c2
+    inventory = {"kafka_broker": {"b1": 1, "b2": 2, "b3": 3},
+                 "kafka_controller": {"c1": 9001, "b1": 1, "c2": 9002}}
+    running = {"b1": {"meta": "2"}, "b2": {"meta": "1"}, "c2": {"meta": "9001"}}
+
+    host_vars = host_ids.resolve_host_ids(inventory, running, controller_port=9093)
+
+    assert {host: hvars.get("broker_id") for host, hvars in host_vars.items()} == \
+        {"b1": 2, "b2": 1, "b3": 3, "c1": None, "c2": None}
+    assert {host: hvars.get("kraft_node_id") for host, hvars in host_vars.items()} == \
+        {"b1": 2, "b2": None, "b3": None, "c1": 9002, "c2": 9001}
+    assert {hvars["kraft_quorum_voters"] for hvars in host_vars.values()} == \
+        {"9002@c1:9093,2@b1:9093,9001@c2:9093"}
+
+
+def test_main_reports_conflicts(capsys):
+    code = host_ids.main(["--inventory", '{"kafka_broker": {"a": 1, "b": 2}}',
+                          "--running", '{"a": {"meta": "1"}, "b": {"meta": "1"}}'])
+
+    assert code == 1
+    assert "both run with id 1" in capsys.readouterr().err
@@ -0,0 +1,44 @@
+import pytest
+
+from fake_stack import FakeStack, get_servers
+
+
+def _get_hostnames(role, num):
+    return [f"kafka-{role}-num-{idx}" for idx in range(num)]
+
+
+def test_lookup_per_host(cluster_stack):
+    brokers = _get_hostnames("broker", 3)
+    other = _get_hostnames("other", 50)
+    stack = FakeStack(get_servers(brokers + other))
+
+    servers = cluster_stack._get_servers_frm_hosts(brokers + brokers[:1], stack)
+
+    assert list(servers) == brokers
+    assert [query["hostname"] for query in stack.queries] == brokers
+
+
+def test_missing_and_duplicate_hosts_reported_together(cluster_stack):
+    hostnames = _get_hostnames("broker", 3)
+    servers = get_servers(hostnames[:2])
+    stack = FakeStack(servers + [dict(servers[0], private_ip="10.9.9.9")])
+
+    with pytest.raises(Exception) as error:
+        cluster_stack._get_servers_frm_hosts(hostnames, stack)
+
+    assert "not found for hosts: kafka-broker-num-2" in str(error.value)
+    assert "multiple server resources found for hosts: kafka-broker-num-0" in str(error.value)
+
+
+def test_shared_hosts_resolved_once(cluster_stack):
+    brokers = _get_hostnames("broker", 3)
+    stack = FakeStack(get_servers(brokers))
+    hosts_by_role = {"kafka_broker": ",".join(brokers),
+                     "zookeeper": ",".join(brokers),
+                     "kafka_controller": brokers[:1]}
+
+    private_ips, host_ips = cluster_stack._get_private_ips_by_role(hosts_by_role, stack)
+
+    assert len(stack.queries) == len(brokers)
+    assert private_ips["kafka_broker"] == private_ips["zookeeper"] == [host_ips[host] for host in brokers]
+    assert private_ips["kafka_controller"] == [host_ips[brokers[0]]]
@@ -0,0 +1,141 @@
+import json
+import shutil
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+from conftest import ANSIBLE_DIR
+
+FINAL_PHASES = ["entry_point/95-reassign.yml", "entry_point/96-benchmark.yml", "entry_point/97-metrics.yml"]
+
+
+def _get_phases(cluster_stack, final_phases):
+    return cluster_stack._add_final_phases(dict(cluster_stack._INSTALL_PHASES), final_phases)
+
+
+@pytest.mark.parametrize("final_phases", [
+    FINAL_PHASES,
+    list(reversed(FINAL_PHASES)),
+    ["entry_point/97-metrics.yml", "entry_point/95-reassign.yml"],
+    ["entry_point/97-metrics.yml", "entry_point/96-benchmark.yml"],
+])
+def test_metrics_runs_after_reassign_and_benchmark(cluster_stack, final_phases):
+    phases = _get_phases(cluster_stack, final_phases)
+
+    for phase in final_phases:
+        if phase != "entry_point/97-metrics.yml":
+            assert phase in phases["entry_point/97-metrics.yml"]
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_final_phases_run_alone_in_order(cluster_stack, parallel):
+    waves = cluster_stack._get_install_waves(_get_phases(cluster_stack, FINAL_PHASES), parallel=parallel)
+
+    assert [wave["phases"] for wave in waves[-3:]] == [[phase] for phase in FINAL_PHASES]
+
+
+def test_parallel_waves(cluster_stack):
+    waves = cluster_stack._get_install_waves(dict(cluster_stack._INSTALL_PHASES))
+
+    assert [wave["phases"] for wave in waves] == [
+        ["entry_point/20-prereq.yml"],
+        ["entry_point/30-zookeeper.yml"],
+        ["entry_point/40-broker.yml"],
+        ["entry_point/50-schema.yml", "entry_point/60-connect.yml",
+         "entry_point/70-ksql.yml", "entry_point/80-rest.yml"],
+        ["entry_point/90-control.yml"]
+    ]
+    assert waves[3]["playbook"] == "entry_point/wave-3.yml"
+
+
+def test_dependency_cycle(cluster_stack):
+    with pytest.raises(Exception, match="dependency cycle"):
+        cluster_stack._get_install_waves({"a.yml": ["b.yml"], "b.yml": ["a.yml"]})
+
+
+KRAFT_PHASES = {
+    "entry_point/20-prereq.yml": [],
+    "entry_point/35-controller.yml": ["entry_point/20-prereq.yml"],
+    "entry_point/40-broker.yml": ["entry_point/35-controller.yml"],
+    "entry_point/45-topics.yml": ["entry_point/40-broker.yml"],
+    "entry_point/50-schema.yml": ["entry_point/40-broker.yml"],
+    "entry_point/60-connect.yml": ["entry_point/40-broker.yml"],
+    "entry_point/70-ksql.yml": ["entry_point/40-broker.yml"],
+    "entry_point/80-rest.yml": ["entry_point/40-broker.yml"]
+}
+
+
+def _write_waves(replica_hosts, cluster_stack, tmp_path, phases):
+    """Generate the wave playbooks for the phases into a copy of the ansible tree."""
+    exec_dir = tmp_path / "ansible"
+    shutil.copytree(ANSIBLE_DIR, exec_dir)
+
+    waves = cluster_stack._get_install_waves(phases)
+
+    helper = replica_hosts.Main.__new__(replica_hosts.Main)
+    helper.exec_dir = str(exec_dir)
+    helper.inputargs = {"kafka_install_waves": json.dumps(waves)}
+    helper.logger = SimpleNamespace(debug=lambda msg: None)
+    helper._write_install_waves()
+
+    return exec_dir, waves
+
+
+def test_pattern_phase_runs_outside_merged_play(replica_hosts, cluster_stack, tmp_path):
+    exec_dir, waves = _write_waves(replica_hosts, cluster_stack, tmp_path, KRAFT_PHASES)
+
+    wave = next(wave for wave in waves if "entry_point/45-topics.yml" in wave["phases"])
+    plays = yaml.safe_load((exec_dir / wave["playbook"]).read_text())
+
+    assert plays[-1] == {"import_playbook": "45-topics.yml"}
+    assert len(plays) == 2
+    assert plays[0]["hosts"] == "schema_registry:kafka_connect:ksql:kafka_rest"
+    assert "Kafka Topic Provisioning" not in plays[0]["name"]
+    assert plays[0]["gather_facts"] is True
+
+
+def test_wave_play_keys(replica_hosts):
+    play = {"name": "p", "hosts": "kafka_broker", "remote_user": "{{ os_user }}", "become": True,
+            "gather_facts": False, "tags": ["kafka_broker"], "tasks": []}
+
+    assert replica_hosts.Main._is_wave_play(play)
+    assert not replica_hosts.Main._is_wave_play(dict(play, hosts="kafka_broker[0]"))
+    assert not replica_hosts.Main._is_wave_play(dict(play, hosts="kafka_controller:!kafka_broker"))
+    assert not replica_hosts.Main._is_wave_play(dict(play, remote_user="root"))
+
+    for key in ("serial", "strategy", "max_fail_percentage"):
+        assert not replica_hosts.Main._is_wave_play(dict(play, **{key: 1}))
+
+        with pytest.raises(ValueError, match=key):
+            replica_hosts.Main._to_wave_tasks(dict(play, **{key: 1}))
+
+
+def test_wave_keeps_play_vars(replica_hosts):
+    play = {"name": "p", "hosts": "ksql", "vars": {"a": 1},
+            "tasks": [{"import_role": {"name": "../roles/confluent.ksql"}}]}
+
+    wave_task = replica_hosts.Main._to_wave_tasks(play)
+
+    assert wave_task["vars"] == {"a": 1}
+    assert wave_task["block"] == [{"include_role": {"name": "../roles/confluent.ksql"}}]
+
+
+@pytest.mark.skipif(not shutil.which("ansible-playbook"), reason="ansible-playbook is not installed")
+def test_wave_runs_every_phase(replica_hosts, cluster_stack, tmp_path):
+    exec_dir, waves = _write_waves(replica_hosts, cluster_stack, tmp_path, KRAFT_PHASES)
+    wave = next(wave for wave in waves if len(wave["phases"]) > 1)
+
+    inventory = {"all": {"children": {group: {"hosts": {f"10.0.{idx}.{_id}": {} for _id in (1, 2)}}
+                                      for idx, group in enumerate(["kafka_broker", "schema_registry", "kafka_connect",
+                                                                   "ksql", "kafka_rest"])}}}
+    (tmp_path / "hosts.yml").write_text(yaml.safe_dump(inventory))
+
+    result = subprocess.run(["ansible-playbook", "-i", str(tmp_path / "hosts.yml"), "--list-hosts", "-e", "os_user=root",
+                             str(exec_dir / wave["playbook"])],
+                            cwd=exec_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+
+    assert result.returncode == 0, result.stdout[-3000:]
+    assert "play #2 (kafka_broker[0]): Kafka Topic Provisioning" in result.stdout
+    assert "10.0.0.1" in result.stdout.split("Kafka Topic Provisioning")[1]
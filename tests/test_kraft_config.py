@@ -0,0 +1,150 @@
+"""
+Render server.properties of brokers and KRaft controllers with the role
+templates and defaults, for an inventory built like
+create_ansible_replica_hosts builds it, and check the quorum layout.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+from conftest import ANSIBLE_DIR
+
+pytestmark = pytest.mark.skipif(not shutil.which("ansible-playbook"), reason="ansible-playbook is not installed")
+
+RENDER_PLAYBOOK = [
+    {"name": "Render Broker Configs",
+     "hosts": "kafka_broker",
+     "gather_facts": False,
+     "tasks": [{"template": {"src": f"{ANSIBLE_DIR}/roles/confluent.kafka_broker/templates/server.properties.j2",
+                             "dest": "{{ render_dir }}/{{ inventory_hostname }}.properties"}}]},
+    {"name": "Render Dedicated Controller Configs",
+     "hosts": "kafka_controller:!kafka_broker",
+     "gather_facts": False,
+     "tasks": [{"template": {"src": f"{ANSIBLE_DIR}/roles/confluent.kafka_controller/templates/server.properties.j2",
+                             "dest": "{{ render_dir }}/{{ inventory_hostname }}.properties"}}]}
+]
+
+
+def _load_defaults(role):
+    with open(os.path.join(ANSIBLE_DIR, "roles", role, "defaults", "main.yml")) as defaults_file:
+        return yaml.safe_load(defaults_file)
+
+
+def _get_inventory(replica_hosts, controllers, brokers, stack_vars=None):
+    """The kraft inventory of create_ansible_replica_hosts, with the role defaults as all vars."""
+    children = {
+        "kafka_controller": {"hosts": {_ip: {"controller_id": _id}
+                                       for _ip, _id in replica_hosts.Main._assign_host_ids(controllers).items()}},
+        "kafka_broker": {"hosts": {_ip: {"broker_id": _id}
+                                   for _ip, _id in replica_hosts.Main._assign_host_ids(brokers).items()}}
+    }
+
+    node_ids = replica_hosts.Main._get_kraft_node_ids(children)
+
+    for _ip, node_id in node_ids.items():
+        children["kafka_controller"]["hosts"][_ip]["kraft_node_id"] = node_id
+
+    all_vars = {}
+
+    for role in ("confluent.variables", "confluent.kafka_broker", "confluent.kafka_controller"):
+        all_vars.update(_load_defaults(role))
+
+    all_vars.update({
+        "metadata_mode": "kraft",
+        "kraft_cluster_id": "MkU3OEVBNTcwNTJENDM2Qk",
+        "kraft_quorum_voters": ",".join(f"{node_id}@{_ip}:{{{{kafka_controller_port}}}}"
+                                        for _ip, node_id in node_ids.items())
+    })
+    all_vars.update(stack_vars or {})
+
+    return {"all": {"vars": all_vars, "children": children}}
+
+
+def _render(replica_hosts, tmp_path, controllers, brokers, stack_vars=None):
+    # the tree's group_vars/all applies on top of the role defaults
+    shutil.copytree(os.path.join(ANSIBLE_DIR, "group_vars"), tmp_path / "group_vars")
+
+    (tmp_path / "hosts.yml").write_text(yaml.safe_dump(_get_inventory(replica_hosts, controllers, brokers, stack_vars)))
+    (tmp_path / "render.yml").write_text(yaml.safe_dump(RENDER_PLAYBOOK))
+    (tmp_path / "ansible.cfg").write_text("[defaults]\n")
+    render_dir = tmp_path / "rendered"
+    render_dir.mkdir()
+
+    result = subprocess.run(["ansible-playbook", "-i", str(tmp_path / "hosts.yml"), str(tmp_path / "render.yml"),
+                             "-e", "ansible_connection=local",
+                             "-e", "ansible_become=false",
+                             "-e", f"ansible_python_interpreter={sys.executable}",
+                             "-e", f"render_dir={render_dir}"],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True,
+                            env=dict(os.environ, ANSIBLE_CONFIG=str(tmp_path / "ansible.cfg"), ANSIBLE_NOCOLOR="1"))
+
+    assert result.returncode == 0, result.stdout[-3000:]
+
+    configs = {}
+
+    for path in render_dir.iterdir():
+        lines = [line for line in path.read_text().splitlines() if line and not line.startswith("#")]
+        configs[path.stem] = dict(line.split("=", 1) for line in lines)
+
+    return configs
+
+
+@pytest.mark.parametrize("layout,controllers,brokers", [
+    ("combined", ["10.0.1.1", "10.0.1.2", "10.0.1.3"], ["10.0.1.1", "10.0.1.2", "10.0.1.3", "10.0.1.4"]),
+    ("dedicated", ["10.0.9.1", "10.0.9.2", "10.0.9.3"], ["10.0.1.1", "10.0.1.2", "10.0.1.3"]),
+    ("mixed", ["10.0.9.1", "10.0.1.2", "10.0.9.3"], ["10.0.1.1", "10.0.1.2", "10.0.1.3"]),
+])
+def test_kraft_server_properties(replica_hosts, tmp_path, layout, controllers, brokers):
+    configs = _render(replica_hosts, tmp_path, controllers, brokers)
+
+    assert set(configs) == set(controllers) | set(brokers)
+
+    voters = {config["controller.quorum.voters"] for config in configs.values()}
+    assert len(voters) == 1
+
+    voter_ids = {voter.split("@")[1].split(":")[0]: voter.split("@")[0] for voter in voters.pop().split(",")}
+    assert list(voter_ids) == controllers
+
+    node_ids = [config["node.id"] for config in configs.values()]
+    assert len(set(node_ids)) == len(node_ids)
+
+    for host, config in configs.items():
+        assert "broker.id" not in config
+        assert not any(key.startswith("zookeeper.") for key in config)
+        assert config["controller.listener.names"] == "CONTROLLER"
+        assert "CONTROLLER:SSL" in config["listener.security.protocol.map"].split(",")
+
+        roles = config["process.roles"].split(",")
+        assert ("broker" in roles) == (host in brokers)
+        assert ("controller" in roles) == (host in controllers)
+        assert ("CONTROLLER://:9093" in config["listeners"].split(",")) == (host in controllers)
+
+        if host in controllers:
+            assert voter_ids[host] == config["node.id"]
+            assert config["controller.quorum.voters"].count(f"@{host}:9093") == 1
+
+        if host in brokers:
+            assert config["advertised.listeners"] == f"SSL://{host}:9092"
+            assert config["node.id"] == str(brokers.index(host) + 1)
+        else:
+            assert int(config["node.id"]) > replica_hosts.KRAFT_CONTROLLER_ID_BASE
+            assert config["log.dirs"] == "/var/lib/controller/data"
+
+
+@pytest.mark.parametrize("stack_vars,protocol", [
+    ({"kafka_ssl_enabled": False, "kafka_ssl_mutual_auth_enabled": False, "sasl_protocol": "none"}, "PLAINTEXT"),
+    ({"kafka_ssl_enabled": False, "kafka_ssl_mutual_auth_enabled": False, "sasl_protocol": "plain"}, "SASL_PLAINTEXT"),
+    ({"kafka_ssl_enabled": True, "kafka_ssl_mutual_auth_enabled": False, "sasl_protocol": "plain"}, "SASL_SSL"),
+])
+def test_listener_security_from_stack_vars(replica_hosts, tmp_path, stack_vars, protocol):
+    configs = _render(replica_hosts, tmp_path, ["10.0.1.1"], ["10.0.1.1", "10.0.1.2"], stack_vars)
+
+    for host, config in configs.items():
+        assert config["advertised.listeners"] == f"{protocol}://{host}:9092"
+        assert "ssl.client.auth" not in config
+        assert ("ssl.truststore.location" in config) == protocol.endswith("SSL")
@@ -0,0 +1,144 @@
+import json
+
+import pytest
+
+from conftest import load_role_file
+
+perf_benchmark = load_role_file("confluent.kafka_benchmark", "perf_benchmark.py")
+
+
+def _get_case(clients, num_records=900000):
+    return {"id": f"rs100-acks1-none-p6-c{clients}", "record_size": 100, "acks": "1",
+            "compression": "none", "partitions": 6, "clients": clients, "num_records": num_records}
+
+
+def _get_arg(command, flag):
+    return command[command.index(flag) + 1]
+
+
+@pytest.mark.parametrize("clients", [1, 3, 4])
+def test_consumers_read_the_whole_topic_in_their_own_group(clients):
+    _, producers, consumers, _ = perf_benchmark.get_case_commands(_get_case(clients), "b1:9092", 3)
+
+    produced = sum(int(_get_arg(producer, "--num-records")) for producer in producers)
+
+    assert len({_get_arg(consumer, "--group") for consumer in consumers}) == clients
+    assert {int(_get_arg(consumer, "--messages")) for consumer in consumers} == {produced}
+
+
+@pytest.mark.parametrize("client_config,flags", [
+    (None, {}),
+    ("/etc/kafka/client.properties", {"create": "--command-config",
+                                      "producer": "--producer.config",
+                                      "consumer": "--consumer.config"}),
+])
+def test_client_config_passed_to_every_tool(client_config, flags):
+    create, producers, consumers, delete = perf_benchmark.get_case_commands(
+        _get_case(2), "b1:9092", 3, client_config=client_config)
+
+    commands = {"create": [create, delete], "producer": producers, "consumer": consumers}
+
+    for kind, kind_commands in commands.items():
+        for command in kind_commands:
+            if flags:
+                assert _get_arg(command, flags[kind]) == client_config
+            else:
+                assert client_config not in command
+
+
+_PRODUCER_OUTPUT = ("1000 records sent, 5000.0 records/sec (4.88 MB/sec), 12.5 ms avg latency, "
+                    "80.0 ms max latency, 10 ms 50th, 30 ms 95th, 60 ms 99th, 75 ms 99.9th\n")
+
+_CONSUMER_OUTPUT = ("start.time, end.time, data.consumed.in.MB, MB.sec, data.consumed.in.nMsg, nMsg.sec\n"
+                    "2025-01-01 00:00:00:000, 2025-01-01 00:00:01:000, 0.95, 9.5, 1000, 10000.0\n")
+
+_MATRIX = {"record_size": [1024], "acks": ["1"], "compression": ["none"],
+           "partitions": [6], "clients": [1], "num_records": 1000}
+
+
+def _write_captured(captured_dir):
+    case_id = perf_benchmark.expand_matrix(_MATRIX)[0]["id"]
+    (captured_dir / f"{case_id}.producer.0.txt").write_text(_PRODUCER_OUTPUT)
+    (captured_dir / f"{case_id}.consumer.0.txt").write_text(_CONSUMER_OUTPUT)
+
+    return case_id
+
+
+def test_baseline_summarizes_throughput_and_latency(tmp_path, capsys):
+    case_id = _write_captured(tmp_path)
+
+    assert perf_benchmark.main(["--captured-dir", str(tmp_path),
+                                "--matrix", json.dumps(_MATRIX),
+                                "--label", "m5.xlarge"]) == 0
+
+    baseline = json.loads(capsys.readouterr().out)
+
+    assert baseline["status"] == "pass"
+    assert baseline["comparison"] is None
+    assert baseline["cases"][0]["producer"]["p99_ms"] == 60.0
+    assert baseline["summary"] == [
+        f"{case_id}: producer 4.88 MB/s 5000.0 records/s p50 10.0 ms p99 60.0 ms max 80.0 ms, "
+        f"consumer 9.5 MB/s 10000.0 records/s"]
+
+
+def _baseline_case(case_id, mb_sec=50.0, p99_ms=100.0, consumer_mb_sec=80.0):
+    return {"id": case_id,
+            "producer": {"mb_sec": mb_sec, "records_sec": 50000.0, "avg_ms": 20.0,
+                         "p50_ms": 10.0, "p95_ms": 60.0, "p99_ms": p99_ms, "max_ms": 400.0},
+            "consumer": {"mb_sec": consumer_mb_sec, "records_sec": 80000.0}}
+
+
+@pytest.mark.parametrize("current,regressions", [
+    # within the tolerance either way
+    (_baseline_case("a", mb_sec=46.0, p99_ms=109.0), []),
+    (_baseline_case("a", mb_sec=70.0, p99_ms=50.0), []),
+    # throughput drops and latency rises
+    (_baseline_case("a", mb_sec=40.0), ["a: producer_mb_sec 40.0 is 20.0% below 50.0"]),
+    (_baseline_case("a", p99_ms=150.0), ["a: producer_p99_ms 150.0 is 50.0% above 100.0"]),
+    (_baseline_case("a", consumer_mb_sec=60.0, p99_ms=120.0),
+     ["a: consumer_mb_sec 60.0 is 25.0% below 80.0", "a: producer_p99_ms 120.0 is 20.0% above 100.0"]),
+    # max latency is too noisy to compare
+    (dict(_baseline_case("a"), producer=dict(_baseline_case("a")["producer"], max_ms=4000.0)), []),
+])
+def test_compare_baselines(current, regressions):
+    previous = {"label": "m5.xlarge", "cases": [_baseline_case("a")]}
+
+    assert perf_benchmark.compare_baselines(previous, [current]) == {
+        "label": "m5.xlarge", "cases": 1, "regressions": regressions}
+
+
+def test_compare_baselines_skips_new_cases():
+    previous = {"label": "", "cases": [_baseline_case("a"), _baseline_case("b")]}
+    comparison = perf_benchmark.compare_baselines(previous, [_baseline_case("b", mb_sec=10.0),
+                                                             _baseline_case("c", mb_sec=1.0)],
+                                                  regression_pct=50)
+
+    assert comparison == {"label": "", "cases": 1, "regressions": ["b: producer_mb_sec 10.0 is 80.0% below 50.0"]}
+
+
+@pytest.mark.parametrize("previous_mb_sec,fail_below,thresholds,status,regressions", [
+    (4.9, False, {}, "pass", 0),
+    (10.0, False, {}, "warn", 1),
+    # regressions alone never fail the run
+    (10.0, True, {}, "warn", 1),
+    (10.0, True, {"min_producer_mb_sec": 5}, "fail", 1),
+])
+def test_baseline_compared_with_previous(tmp_path, capsys, previous_mb_sec, fail_below, thresholds, status,
+                                         regressions):
+    case_id = _write_captured(tmp_path)
+    previous = tmp_path / "previous.json"
+    previous.write_text(json.dumps({"label": "m5.xlarge", "cases": [
+        {"id": case_id,
+         "producer": {"mb_sec": previous_mb_sec, "records_sec": 5000.0, "p99_ms": 60.0},
+         "consumer": {"mb_sec": 9.5, "records_sec": 10000.0}}]}))
+
+    argv = ["--captured-dir", str(tmp_path), "--matrix", json.dumps(_MATRIX), "--previous", str(previous),
+            "--thresholds", json.dumps(thresholds)]
+
+    assert perf_benchmark.main(argv + (["--fail-below"] if fail_below else [])) == (2 if status == "fail" else 0)
+
+    baseline = json.loads(capsys.readouterr().out)
+
+    assert baseline["status"] == status
+    assert baseline["comparison"]["cases"] == 1
+    assert len(baseline["comparison"]["regressions"]) == regressions
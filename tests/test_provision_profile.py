@@ -0,0 +1,119 @@
+import json
+import os
+
+import pytest
+
+from conftest import ANSIBLE_DIR, load_module
+
+pytest.importorskip("ansible")
+
+provision_profiler = load_module("provision_profiler",
+                                 os.path.join(ANSIBLE_DIR, "callback_plugins", "provision_profiler.py"))
+
+
+class _Named:
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_name(self):
+        return self.name
+
+
+class _Task:
+
+    def __init__(self, name, role=None):
+        self._uuid = name
+        self.name = name
+        self.action = "command"
+        self._role = _Named(f"../roles/{role}") if role else None
+
+
+class _Result:
+
+    def __init__(self, host, task):
+        self._host = host
+        self._task = task
+
+
+class _Playbook:
+
+    def __init__(self, path):
+        self._file_name = path
+        self._basedir = os.path.dirname(path)
+
+
+class _Clock:
+
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _run_playbook(clock, output_dir, phase, playbook, tasks):
+    """
+    Feed a playbook run to a fresh callback, as ansible-playbook does - each
+    task is (host, name, role, start, end) in seconds from the start.
+    """
+    callback = provision_profiler.CallbackModule()
+    callback._output_dir = str(output_dir)
+    callback._top = 20
+    callback._phase = phase
+
+    started = clock.now
+    callback.v2_playbook_on_start(_Playbook(os.path.join(str(output_dir), "entry_point", playbook)))
+    callback.v2_playbook_on_play_start(_Named("install"))
+
+    for host, name, role, start, end in tasks:
+        task = _Task(name, role)
+        clock.now = started + start
+        callback.v2_runner_on_start(_Named(host), task)
+        clock.now = started + end
+        callback.v2_runner_on_ok(_Result(_Named(host), task))
+
+    callback.v2_playbook_on_stats(None)
+
+
+def test_phase_totals_across_playbook_runs(tmp_path, monkeypatch, capsys):
+    clock = _Clock()
+    monkeypatch.setattr(provision_profiler.time, "time", clock)
+
+    _run_playbook(clock, tmp_path, "Install Python for Ansible", "10-install-python.yml", [
+        ("k1", "install python", None, 0, 4),
+        ("k2", "install python", None, 0, 5),
+    ])
+    _run_playbook(clock, tmp_path, "Install Kafka", "20-prereq.yml", [
+        ("k1", "tune", "confluent.host_tuning", 0, 10),
+        ("k1", "ids", "confluent.host_ids", 10, 12),
+    ])
+    _run_playbook(clock, tmp_path, "Install Kafka", "wave-2.yml", [
+        ("k1", "install broker", "confluent.kafka_broker", 0, 30),
+        ("k2", "install broker", "confluent.kafka_broker", 5, 40),
+        ("k1", "tune", "confluent.host_tuning", 40, 43),
+    ])
+
+    with open(tmp_path / "phases.json") as phases_file:
+        phases = json.load(phases_file)
+
+    assert phases == {
+        "Install Python for Ansible": {"duration": 5.0, "tasks": 2,
+                                       "playbooks": ["10-install-python.yml"],
+                                       "roles": {"-": 5.0}},
+        "Install Kafka": {"duration": 55.0, "tasks": 5,
+                          "playbooks": ["20-prereq.yml", "wave-2.yml"],
+                          "roles": {"confluent.host_tuning": 13.0,
+                                    "confluent.host_ids": 2.0,
+                                    "confluent.kafka_broker": 40.0}},
+    }
+
+    totals = [line for line in capsys.readouterr().out.splitlines() if line.startswith("PROVISION_PHASES ")]
+
+    assert json.loads(totals[-1].split(" ", 1)[1]) == {"Install Python for Ansible": 5.0, "Install Kafka": 55.0}
+
+
+def test_phase_labels_env(cluster_stack):
+    env_vars = cluster_stack._label_phase({"METHOD": "create"}, "Install Kafka")
+
+    assert env_vars == {"METHOD": "create", "PROVISION_PROFILE_PHASE": "Install Kafka"}
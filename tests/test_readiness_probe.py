@@ -0,0 +1,247 @@
+"""
+readiness_probe.py against local socket stand-ins of the services.
+"""
+
+import asyncio
+import shutil
+import socket
+import ssl
+import struct
+import subprocess
+
+import pytest
+
+from conftest import load_role_file
+
+
+@pytest.fixture(scope="module")
+def readiness_probe():
+    return load_role_file("confluent.readiness", "readiness_probe.py")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _kafka_string(value):
+    if value is None:
+        return struct.pack(">h", -1)
+
+    return struct.pack(">h", len(value)) + value.encode()
+
+
+def _metadata_response(correlation_id, broker_ids, controller_id):
+    payload = struct.pack(">iii", correlation_id, 0, len(broker_ids))
+
+    for broker_id in broker_ids:
+        payload += struct.pack(">i", broker_id) + _kafka_string("10.0.1.1") + struct.pack(">i", 9092)
+        payload += _kafka_string(None)
+
+    payload += _kafka_string("cluster") + struct.pack(">i", controller_id)
+    # no topics
+    payload += struct.pack(">i", 0)
+
+    return payload
+
+
+def _ssh(reader, writer):
+    writer.write(b"SSH-2.0-OpenSSH_9.6\r\n")
+
+
+async def _ruok(reader, writer):
+    word = await reader.readexactly(4)
+    writer.write(b"imok" if word == b"ruok" else b"Zookeeper version: 3.8\nMode: follower\n")
+
+
+def _metadata(broker_ids, controller_id):
+    async def _handler(reader, writer):
+        (size,) = struct.unpack(">i", await reader.readexactly(4))
+        request = await reader.readexactly(size)
+        (correlation_id,) = struct.unpack_from(">i", request, 4)
+        response = _metadata_response(correlation_id, broker_ids, controller_id)
+        writer.write(struct.pack(">i", len(response)) + response)
+
+    return _handler
+
+
+def _http(status_line):
+    async def _handler(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(f"{status_line}\r\nContent-Length: 0\r\n\r\n".encode())
+
+    return _handler
+
+
+async def _silent(reader, writer):
+    await asyncio.sleep(5)
+
+
+def _serve(handler):
+    async def _connection(reader, writer):
+        try:
+            result = handler(reader, writer)
+
+            if asyncio.iscoroutine(result):
+                await result
+
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return _connection
+
+
+def _probe(readiness_probe, target, handler=None, start_after=0, **kwargs):
+    """Probe a stand-in on a free local port, started after start_after seconds."""
+    port = _free_port()
+    target = dict(target, host="127.0.0.1", port=port)
+    kwargs = dict(dict(timeout=5, serve_grace=1, initial_delay=0.05, max_delay=0.2, connect_timeout=0.5), **kwargs)
+
+    async def _run():
+        server = None
+
+        async def _start():
+            nonlocal server
+            await asyncio.sleep(start_after)
+            server = await asyncio.start_server(_serve(handler), "127.0.0.1", port)
+
+        starting = asyncio.ensure_future(_start()) if handler else None
+
+        if starting and not start_after:
+            await starting
+
+        try:
+            return await readiness_probe.probe(target, **kwargs)
+        finally:
+            if starting:
+                await starting
+                server.close()
+                await server.wait_closed()
+
+    return asyncio.run(_run())
+
+
+@pytest.mark.parametrize("check,handler,detail", [
+    ("tcp", _ssh, "accepting connections"),
+    ("ssh", _ssh, "SSH-2.0-OpenSSH_9.6"),
+    ("ruok", _ruok, "imok, Mode: follower"),
+    ("kafka_metadata", _metadata([1, 2, 3], 2), "controller 2, 3 brokers registered"),
+    ("http", _http("HTTP/1.1 200 OK"), "HTTP/1.1 200 OK"),
+])
+def test_checks_pass(readiness_probe, check, handler, detail):
+    result = _probe(readiness_probe, {"check": check, "min_brokers": 3}, handler)
+
+    assert result["ready"]
+    assert result["detail"] == detail
+    assert result["attempts"] == 1
+
+
+@pytest.mark.parametrize("check,handler,detail", [
+    ("kafka_metadata", _metadata([1, 2], 2), "2 of 3 brokers registered"),
+    ("kafka_metadata", _metadata([1, 2, 3], -1), "no active controller"),
+    ("http", _http("HTTP/1.1 503 Service Unavailable"), "answered HTTP/1.1 503"),
+    ("http", _silent, "no HTTP status within"),
+    ("ssh", lambda reader, writer: writer.write(b"HTTP/1.1 400 Bad Request\r\n"), "unexpected ssh banner"),
+])
+def test_up_but_not_serving(readiness_probe, check, handler, detail):
+    result = _probe(readiness_probe, {"check": check, "min_brokers": 3}, handler, serve_grace=0.5)
+
+    assert not result["ready"]
+    assert result["detail"].startswith("up but not serving")
+    assert detail in result["detail"]
+    assert result["elapsed"] < 3
+
+
+def test_late_start(readiness_probe):
+    result = _probe(readiness_probe, {"check": "ssh"}, _ssh, start_after=0.5)
+
+    assert result["ready"]
+    assert result["attempts"] > 1
+
+
+def test_refused_until_timeout(readiness_probe):
+    result = _probe(readiness_probe, {"check": "tcp"}, timeout=0.5)
+
+    assert not result["ready"]
+    assert result["detail"].startswith("not ready after 0.5s: not accepting connections")
+
+
+def test_parse_kafka_metadata(readiness_probe):
+    payload = _metadata_response(7, [1, 2, 3], 3)
+
+    assert readiness_probe.parse_kafka_metadata(payload, 7) == ([1, 2, 3], 3)
+
+    with pytest.raises(readiness_probe.NotServing, match="correlation id 7"):
+        readiness_probe.parse_kafka_metadata(payload, 8)
+
+
+def test_unknown_check(readiness_probe):
+    with pytest.raises(SystemExit):
+        readiness_probe.main(["--targets", '[{"host": "127.0.0.1", "port": 1, "check": "ping"}]'])
+
+
+def _result(service, check, ready, elapsed, host="k1"):
+    return {"host": host, "service": service, "check": check, "ready": ready, "elapsed": elapsed}
+
+
+@pytest.mark.parametrize("results,services", [
+    ([], {}),
+    ([_result("kafka_broker", "kafka_metadata", True, 12.5)],
+     {"kafka_broker": {"k1": {"ready": True, "seconds": 12.5}}}),
+    # every check of a service must pass, and the slowest one times it
+    ([_result("zookeeper", "tcp", True, 2.0), _result("zookeeper", "ruok", False, 180.0)],
+     {"zookeeper": {"k1": {"ready": False, "seconds": 180.0}}}),
+    ([_result("kafka_broker", "kafka_metadata", True, 9.0),
+      _result("kafka_connect", "http", True, 30.0),
+      _result("kafka_broker", "kafka_metadata", False, 600.0, host="k2")],
+     {"kafka_broker": {"k1": {"ready": True, "seconds": 9.0}, "k2": {"ready": False, "seconds": 600.0}},
+      "kafka_connect": {"k1": {"ready": True, "seconds": 30.0}}}),
+])
+def test_service_status(readiness_probe, results, services):
+    assert readiness_probe.get_service_status(results) == services
+
+
+@pytest.fixture
+def tls_files(tmp_path):
+    """A self-signed certificate that is its own CA, for the server and the client."""
+    if not shutil.which("openssl"):
+        pytest.skip("openssl is not installed")
+
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=127.0.0.1", "-keyout", str(key), "-out", str(cert)],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    return str(cert), str(key)
+
+
+@pytest.mark.parametrize("client_cert", [True, False])
+def test_mutual_auth_http(readiness_probe, tls_files, client_cert):
+    cert, key = tls_files
+    port = _free_port()
+
+    server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH, cafile=cert)
+    server_context.load_cert_chain(cert, key)
+    server_context.verify_mode = ssl.CERT_REQUIRED
+
+    client_context = readiness_probe.get_ssl_context(cert, *(tls_files if client_cert else ()))
+
+    async def _run():
+        server = await asyncio.start_server(_serve(_http("HTTP/1.1 200 OK")), "127.0.0.1", port,
+                                            ssl=server_context)
+
+        try:
+            return await readiness_probe.probe({"check": "http", "host": "127.0.0.1", "port": port, "ssl": True},
+                                               timeout=5, serve_grace=0.5, initial_delay=0.05, max_delay=0.2,
+                                               connect_timeout=0.5, ssl_context=client_context)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    result = asyncio.run(_run())
+
+    assert result["ready"] == client_cert
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+
+from conftest import load_role_file
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def planner():
+    return load_role_file("confluent.kafka_reassign", "reassign_planner.py")
+
+
+def _cluster(old_brokers, partitions, replication_factor=3, size=10 * MB):
+    """Round-robin assignment of equally sized partitions over the old brokers."""
+    assignment = {}
+
+    for idx in range(partitions):
+        tp = (f"topic-{idx // 10}", idx % 10)
+        assignment[tp] = [old_brokers[(idx + offset) % len(old_brokers)] for offset in range(replication_factor)]
+
+    return assignment, {tp: size for tp in assignment}
+
+
+def _moves(plan, assignment):
+    return {tp: sorted(set(replicas) - set(assignment[tp])) for tp, replicas in plan.items()}
+
+
+@pytest.mark.parametrize("racks", [
+    # one rack per old and per new broker
+    {1: "a", 2: "b", 3: "c", 4: "a", 5: "b", 6: "c"},
+    # two racks, new brokers all in one rack
+    {1: "a", 2: "b", 3: "a", 4: "b", 5: "b", 6: "b"},
+    # no racks
+    {broker: None for broker in range(1, 7)},
+])
+def test_rack_spread_kept(planner, racks):
+    assignment, sizes = _cluster([1, 2, 3], 60)
+    plan = planner.plan_reassignment(assignment, sizes, racks)
+
+    assert plan
+
+    for tp, replicas in plan.items():
+        assert len(set(replicas)) == len(replicas)
+        assert len({racks[broker] for broker in replicas}) >= len({racks[broker] for broker in assignment[tp]})
+
+
+def test_scale_out_moves_only_to_new_brokers(planner):
+    assignment, sizes = _cluster([1, 2, 3], 60)
+    racks = {broker: None for broker in range(1, 7)}
+
+    plan = planner.plan_reassignment(assignment, sizes, racks)
+    moves = _moves(plan, assignment)
+
+    # 180 replicas over 6 brokers - the new brokers need 30 each
+    assert sum(len(new) for new in moves.values()) <= 90
+    assert all(set(new) <= {4, 5, 6} for new in moves.values())
+
+    new_assignment = {**assignment, **plan}
+    loads = planner.get_broker_loads(new_assignment, sizes, racks)
+    assert max(loads.values()) - min(loads.values()) <= 2 * 10 * MB
+
+
+def test_balanced_cluster_not_moved(planner):
+    assignment, sizes = _cluster([1, 2, 3], 30)
+
+    assert planner.plan_reassignment(assignment, sizes, {1: "a", 2: "b", 3: "c"}) == {}
+
+
+def test_leader_position_kept(planner):
+    assignment, sizes = _cluster([1, 2, 3], 60)
+    plan = planner.plan_reassignment(assignment, sizes, {broker: None for broker in range(1, 7)})
+
+    for tp, replicas in plan.items():
+        for old, new in zip(assignment[tp], replicas):
+            assert new == old or new not in assignment[tp]
+
+
+def test_unknown_broker(planner):
+    with pytest.raises(Exception, match="unknown broker 9"):
+        planner.plan_reassignment({("t", 0): [1, 9]}, {}, {1: None, 2: None})
+
+
+@pytest.mark.parametrize("max_batch_bytes,max_batch_partitions", [
+    (50 * MB, 100),
+    (10 ** 12, 7),
+    (5 * MB, 100),
+])
+def test_batch_limits(planner, max_batch_bytes, max_batch_partitions):
+    assignment, sizes = _cluster([1, 2, 3], 60)
+    plan = planner.plan_reassignment(assignment, sizes, {broker: None for broker in range(1, 7)})
+
+    batches = planner.batch_reassignment(plan, assignment, sizes, max_batch_bytes,
+                                         max_batch_partitions=max_batch_partitions)
+    batched = [(entry["topic"], entry["partition"]) for batch in batches for entry in batch["partitions"]]
+
+    assert sorted(batched) == sorted(plan)
+
+    for batch in batches:
+        copy_bytes = sum(sizes[(entry["topic"], entry["partition"])]
+                         * len(set(entry["replicas"]) - set(assignment[(entry["topic"], entry["partition"])]))
+                         for entry in batch["partitions"])
+
+        assert batch["version"] == 1
+        assert len(batch["partitions"]) <= max_batch_partitions
+        # a partition larger than the limit goes alone
+        assert copy_bytes <= max_batch_bytes or len(batch["partitions"]) == 1
+
+
+def test_plan_output(planner, tmp_path, capsys):
+    """The plan subcommand only writes the batches and rollback - nothing is applied."""
+    describe = "\n".join(f"\tTopic: orders\tPartition: {idx}\tLeader: 1\tReplicas: 1,2\tIsr: 1,2"
+                         for idx in range(4))
+    log_dirs = json.dumps({"version": 1, "brokers": [
+        {"broker": broker, "logDirs": [{"logDir": "/var/lib/kafka/data", "error": None, "partitions": [
+            {"partition": f"orders-{idx}", "size": 100 * MB, "offsetLag": 0, "isFuture": False}
+            for idx in range(4)]}]}
+        for broker in (1, 2)]})
+    (tmp_path / "describe.txt").write_text(describe)
+    (tmp_path / "log_dirs.txt").write_text(f"Querying brokers for log directories information\n{log_dirs}\n")
+
+    assert planner.main(["plan",
+                         "--topics-describe", str(tmp_path / "describe.txt"),
+                         "--log-dirs", str(tmp_path / "log_dirs.txt"),
+                         "--brokers", json.dumps({"1": "a", "2": "b", "3": "a", "4": "b"}),
+                         "--out-dir", str(tmp_path / "plan"),
+                         "--batch-bytes", str(150 * MB)]) == 0
+
+    summary = json.loads(capsys.readouterr().out)
+    rollback = json.loads((tmp_path / "plan" / "rollback.json").read_text())
+    batches = [json.loads((tmp_path / "plan" / batch).read_text()) for batch in sorted(
+        path.name for path in (tmp_path / "plan").glob("batch-*.json"))]
+
+    assert summary["partitions_moved"] == len(rollback["partitions"]) == 2
+    assert summary["bytes_moved"] == 4 * 100 * MB
+    assert summary["broker_bytes_before"] == {"1": 400 * MB, "2": 400 * MB, "3": 0, "4": 0}
+    assert summary["broker_bytes_after"] == {"1": 200 * MB, "2": 200 * MB, "3": 200 * MB, "4": 200 * MB}
+    assert [path.rsplit("/", 1)[1] for path in summary["batches"]] == ["batch-0000.json", "batch-0001.json"]
+    assert all(entry["replicas"] == [1, 2] for entry in rollback["partitions"])
+    assert sorted(entry["replicas"] for batch in batches for entry in batch["partitions"]) == [[3, 4], [3, 4]]
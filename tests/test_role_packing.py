@@ -0,0 +1,48 @@
+import pytest
+
+# a shared host with 4 vCPUs and 8192 MiB usable once the OS reserve is
+# taken off
+_CAPACITY = (4, 8192 + 512)
+
+_BUDGETS = {
+    "control_center": {"cpu": 2, "memory_mb": 4096},
+    "ksql": {"cpu": 2, "memory_mb": 4096},
+    "schema_registry": {"cpu": 0.5, "memory_mb": 1024},
+    "rest": {"cpu": 0.5, "memory_mb": 1024}
+}
+
+
+@pytest.mark.parametrize("counts,hosts", [
+    # exact fit - every vCPU and MiB of the host is budgeted
+    ({"control_center": 1, "ksql": 1}, [["control_center", "ksql"]]),
+    # one more role overflows onto a new host
+    ({"control_center": 1, "ksql": 1, "rest": 1}, [["control_center", "ksql"], ["rest"]]),
+    # the small roles fill the gap left by the larger ones
+    ({"ksql": 1, "schema_registry": 2, "rest": 2},
+     [["ksql", "rest", "schema_registry"], ["rest", "schema_registry"]]),
+    # instances of a role never share a host
+    ({"ksql": 2, "rest": 0}, [["ksql"], ["ksql"]]),
+    ({}, []),
+])
+def test_pack_roles(ec2_stack, counts, hosts):
+    assert ec2_stack._pack_roles(counts, _BUDGETS, _CAPACITY) == hosts
+
+
+def test_pack_roles_stable_order(ec2_stack):
+    counts = {"schema_registry": 2, "rest": 2, "ksql": 2, "control_center": 1}
+    expected = [["control_center", "ksql"],
+                ["ksql", "rest", "schema_registry"],
+                ["rest", "schema_registry"]]
+
+    # roles with the same budget are placed by name, whatever the input order
+    for ordered in (counts, dict(reversed(list(counts.items())))):
+        assert ec2_stack._pack_roles(ordered, _BUDGETS, _CAPACITY) == expected
+
+
+@pytest.mark.parametrize("budget,error", [
+    ({"cpu": 6, "memory_mb": 1024}, "ksql budget of 6 vCPU and 1024 MiB does not fit"),
+    ({"cpu": 2, "memory_mb": 8193}, "ksql budget of 2 vCPU and 8193 MiB does not fit"),
+])
+def test_pack_role_larger_than_a_host(ec2_stack, budget, error):
+    with pytest.raises(Exception, match=error):
+        ec2_stack._pack_roles({"ksql": 1, "rest": 1}, dict(_BUDGETS, ksql=budget), _CAPACITY)
@@ -0,0 +1,48 @@
+"""
+Values each stack keeps its own copy of, because stacks are published on
+their own - the copies must stay the same.
+"""
+
+import os
+
+import pytest
+import yaml
+
+from conftest import ANSIBLE_DIR, load_stack
+
+
+@pytest.fixture(scope="module")
+def bake_stack():
+    return load_stack("kafka_image_bake_on_ubuntu")
+
+
+@pytest.fixture(scope="module")
+def variables():
+    with open(os.path.join(ANSIBLE_DIR, "roles", "confluent.variables", "defaults", "main.yml")) as defaults:
+        return yaml.safe_load(defaults)
+
+
+@pytest.mark.parametrize("version", ["5.3.1", "7.6.1", "7.9.0"])
+def test_bake_confluent_vars_match_the_cluster(cluster_stack, bake_stack, version):
+    assert bake_stack._get_confluent_vars(version) == cluster_stack._get_confluent_vars(version)
+
+
+def test_confluent_versions_match(cluster_stack, ec2_stack, variables):
+    assert ec2_stack._KRAFT_CONFLUENT_VERSION == cluster_stack._KRAFT_CONFLUENT_VERSION
+    assert f"{ec2_stack._DEFAULT_CONFLUENT_VERSION}-1" == variables["confluent"]["package_version"]
+
+
+def test_jmx_exporter_ports_match_the_roles(cluster_stack, variables):
+    role_names = {"broker": "kafka_broker", "controller": "kafka_controller",
+                  "connect": "kafka_connect", "rest": "kafka_rest"}
+
+    assert cluster_stack._JMXEXPORTER_PORTS == {
+        role: variables[f"{role_names.get(role, role)}_jmxexporter_port"]
+        for role in cluster_stack._JMXEXPORTER_PORTS}
+
+
+def test_packing_capacity_copies_the_sizing_table(cluster_stack, ec2_stack):
+    assert ec2_stack._INSTANCE_CAPACITY == {
+        instance_type: cluster_stack._INSTANCE_TYPES[instance_type][:2]
+        for instance_type in ec2_stack._INSTANCE_CAPACITY}
+    assert ec2_stack._OS_RESERVED_MB == cluster_stack._OS_RESERVED_MB
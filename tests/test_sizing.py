@@ -0,0 +1,125 @@
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+
+def _get_stack(instance_type="m5.xlarge", instance_types=None, broker_data_volumes=None,
+               sizing_overrides=None):
+    return SimpleNamespace(instance_type=instance_type,
+                           instance_types=instance_types,
+                           broker_data_volumes=broker_data_volumes,
+                           sizing_overrides=sizing_overrides,
+                           logger=logging.getLogger("test_sizing"))
+
+
+@pytest.mark.parametrize("instance_type,data_dirs,expected", [
+    # smallest type - every value at its floor
+    ("t3.micro", 1, {"kafka_broker_heap_opts": "-Xms256m -Xmx256m",
+                     "kafka_broker_page_cache_mb": 256,
+                     "kafka_broker_num_network_threads": 3,
+                     "kafka_broker_num_io_threads": 8,
+                     "kafka_broker_num_recovery_threads_per_data_dir": 2,
+                     "kafka_broker_num_replica_fetchers": 1,
+                     "kafka_broker_socket_send_buffer_bytes": 1250000,
+                     "kafka_broker_socket_receive_buffer_bytes": 1250000}),
+    ("m5.xlarge", 1, {"kafka_broker_heap_opts": "-Xms3968m -Xmx3968m",
+                      "kafka_broker_page_cache_mb": 11904,
+                      "kafka_broker_num_network_threads": 3,
+                      "kafka_broker_num_io_threads": 8,
+                      "kafka_broker_num_recovery_threads_per_data_dir": 4,
+                      "kafka_broker_num_replica_fetchers": 1,
+                      "kafka_broker_socket_send_buffer_bytes": 2500000,
+                      "kafka_broker_socket_receive_buffer_bytes": 2500000}),
+    # recovery threads are spread over the data dirs
+    ("m5.xlarge", 3, {"kafka_broker_num_recovery_threads_per_data_dir": 1}),
+    ("i3en.6xlarge", 4, {"kafka_broker_heap_opts": "-Xms6144m -Xmx6144m",
+                         "kafka_broker_page_cache_mb": 189952,
+                         "kafka_broker_num_network_threads": 12,
+                         "kafka_broker_num_io_threads": 48,
+                         "kafka_broker_num_recovery_threads_per_data_dir": 6,
+                         "kafka_broker_num_replica_fetchers": 3,
+                         "kafka_broker_socket_send_buffer_bytes": 6250000}),
+    # largest type - heap and thread pools at their ceilings
+    ("m5.16xlarge", 1, {"kafka_broker_heap_opts": "-Xms6144m -Xmx6144m",
+                        "kafka_broker_page_cache_mb": 255488,
+                        "kafka_broker_num_network_threads": 32,
+                        "kafka_broker_num_io_threads": 64,
+                        "kafka_broker_num_recovery_threads_per_data_dir": 16,
+                        "kafka_broker_num_replica_fetchers": 8,
+                        "kafka_broker_socket_send_buffer_bytes": 5000000}),
+])
+def test_broker_sizing(cluster_stack, instance_type, data_dirs, expected):
+    sizing = cluster_stack._get_role_sizing(instance_type, data_dirs=data_dirs)
+
+    assert {key: sizing["kafka_broker"][key] for key in expected} == expected
+
+
+@pytest.mark.parametrize("instance_type,zookeeper_heap,connect_heap", [
+    ("t3.micro", "-Xms256m -Xmx256m", "-Xms256m -Xmx256m"),
+    ("t3.large", "-Xms3840m -Xmx3840m", "-Xms256m -Xmx3840m"),
+    ("m5.xlarge", "-Xms4096m -Xmx4096m", "-Xms256m -Xmx7936m"),
+    ("r5.2xlarge", "-Xms4096m -Xmx4096m", "-Xms256m -Xmx8192m"),
+])
+def test_zookeeper_and_connect_sizing(cluster_stack, instance_type, zookeeper_heap, connect_heap):
+    sizing = cluster_stack._get_role_sizing(instance_type)
+
+    assert sizing["zookeeper"] == {"zookeeper_heap_opts": zookeeper_heap}
+    assert sizing["kafka_connect"] == {"kafka_connect_heap_opts": connect_heap}
+
+
+@pytest.mark.parametrize("instance_type", ["t2.nano", "", "m7g.large"])
+def test_unknown_instance_type(cluster_stack, instance_type):
+    assert cluster_stack._get_role_sizing(instance_type) is None
+
+
+@pytest.mark.parametrize("stack_kwargs,expected", [
+    # one instance type for every server type
+    ({"instance_type": "m5.xlarge"},
+     {"kafka_broker": "-Xms3968m -Xmx3968m",
+      "zookeeper": "-Xms4096m -Xmx4096m",
+      "kafka_connect": "-Xms256m -Xmx7936m"}),
+    # per server type instance types, as a dict or its JSON
+    ({"instance_type": "t3.micro", "instance_types": {"broker": "m5.16xlarge"}},
+     {"kafka_broker": "-Xms6144m -Xmx6144m",
+      "zookeeper": "-Xms256m -Xmx256m",
+      "kafka_connect": "-Xms256m -Xmx256m"}),
+    ({"instance_type": "t3.micro", "instance_types": json.dumps({"zookeeper": "m5.xlarge"})},
+     {"kafka_broker": "-Xms256m -Xmx256m",
+      "zookeeper": "-Xms4096m -Xmx4096m",
+      "kafka_connect": "-Xms256m -Xmx256m"}),
+    # types missing from the table keep the role defaults
+    ({"instance_type": "m7g.large", "instance_types": {"broker": "m5.xlarge"}},
+     {"kafka_broker": "-Xms3968m -Xmx3968m"}),
+    ({"instance_type": None}, {}),
+])
+def test_sizing_by_server_type(cluster_stack, stack_kwargs, expected):
+    sizing = cluster_stack._get_sizing(_get_stack(**stack_kwargs))
+
+    assert {group: next(value for key, value in group_vars.items() if key.endswith("_heap_opts"))
+            for group, group_vars in sizing.items()} == expected
+
+
+@pytest.mark.parametrize("broker_data_volumes,recovery_threads", [(None, 4), (0, 4), (2, 2), ("4", 1)])
+def test_sizing_data_volumes(cluster_stack, broker_data_volumes, recovery_threads):
+    sizing = cluster_stack._get_sizing(_get_stack(broker_data_volumes=broker_data_volumes))
+
+    assert sizing["kafka_broker"]["kafka_broker_num_recovery_threads_per_data_dir"] == recovery_threads
+
+
+@pytest.mark.parametrize("overrides,group,key,value", [
+    ({"kafka_broker_num_io_threads": 32}, "kafka_broker", "kafka_broker_num_io_threads", 32),
+    (json.dumps({"zookeeper_heap_opts": "-Xmx1g"}), "zookeeper", "zookeeper_heap_opts", "-Xmx1g"),
+    # groups without derived sizing take overrides as well
+    ({"ksql_heap_opts": "-Xmx2g"}, "ksql", "ksql_heap_opts", "-Xmx2g"),
+])
+def test_sizing_overrides(cluster_stack, overrides, group, key, value):
+    sizing = cluster_stack._get_sizing(_get_stack(sizing_overrides=overrides))
+
+    assert sizing[group][key] == value
+
+
+def test_sizing_override_without_group_prefix(cluster_stack):
+    with pytest.raises(Exception, match="must be prefixed with one of"):
+        cluster_stack._get_sizing(_get_stack(sizing_overrides={"num_io_threads": 32}))
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from conftest import load_role_file
+
+topic_planner = load_role_file("confluent.kafka_topics", "topic_planner.py")
+
+_DESCRIBE_LINE = "Topic: {}\tTopicId: AbCdEf\tPartitionCount: {}\tReplicationFactor: {}\tConfigs: {}"
+
+
+def _describe(*topics):
+    """kafka-topics --describe output of (topic, partitions, replication factor, configs) tuples."""
+    lines = []
+
+    for topic, partitions, replication_factor, configs in topics:
+        lines.append(_DESCRIBE_LINE.format(topic, partitions, replication_factor, configs))
+        lines.extend(f"\tTopic: {topic}\tPartition: {idx}\tLeader: 1\tReplicas: 1,2,3\tIsr: 1,2,3"
+                     for idx in range(partitions))
+
+    return "\n".join(lines) + "\n"
+
+
+_DEFAULT_CONFIGS = "compression.type=producer,min.insync.replicas=2"
+
+
+@pytest.mark.parametrize("spec,topics,expected", [
+    # missing topics are created
+    ([{"name": "orders", "partitions": 6}], [],
+     {"create": ["orders"], "add_partitions": [], "alter_configs": [], "conflicts": [], "unchanged": 0}),
+    # a topic that matches the spec is skipped
+    ([{"name": "orders", "partitions": 6}], [("orders", 6, 3, _DEFAULT_CONFIGS)],
+     {"create": [], "add_partitions": [], "alter_configs": [], "conflicts": [], "unchanged": 1}),
+    # overrides not in the spec are left alone
+    ([{"name": "orders", "partitions": 6}], [("orders", 6, 3, _DEFAULT_CONFIGS + ",retention.ms=1000")],
+     {"create": [], "add_partitions": [], "alter_configs": [], "conflicts": [], "unchanged": 1}),
+    # partitions are only ever added
+    ([{"name": "orders", "partitions": 12}], [("orders", 6, 3, _DEFAULT_CONFIGS)],
+     {"create": [], "add_partitions": [{"topic": "orders", "partitions": 12, "current": 6}],
+      "alter_configs": [], "conflicts": [], "unchanged": 0}),
+    # only the configs that differ are altered
+    ([{"name": "orders", "partitions": 6, "retention_ms": 86400000, "cleanup_policy": ["compact", "delete"]}],
+     [("orders", 6, 3, _DEFAULT_CONFIGS + ",retention.ms=1000,cleanup.policy=compact,delete")],
+     {"create": [], "add_partitions": [],
+      "alter_configs": [{"topic": "orders", "configs": {"retention.ms": "86400000"}}],
+      "conflicts": [], "unchanged": 0}),
+    # fewer partitions and a new replication factor are conflicts, never applied
+    ([{"name": "orders", "partitions": 3, "replication_factor": 2, "min_insync_replicas": 2}],
+     [("orders", 6, 3, _DEFAULT_CONFIGS)],
+     {"create": [], "add_partitions": [], "alter_configs": [],
+      "conflicts": ["orders: has 6 partitions, spec asks for 3 - partitions are never removed",
+                    "orders: replication factor is 3, spec asks for 2 - needs a reassignment"],
+      "unchanged": 1}),
+    # expanded names are planned one by one
+    ({"defaults": {"partitions": 3}, "topics": [{"name": "events-{0..2}"}]},
+     [("events-1", 3, 3, _DEFAULT_CONFIGS)],
+     {"create": ["events-0", "events-2"], "add_partitions": [], "alter_configs": [], "conflicts": [],
+      "unchanged": 1}),
+])
+def test_dry_run_plan(tmp_path, capsys, spec, topics, expected):
+    describe = tmp_path / "describe.txt"
+    describe.write_text(_describe(*topics))
+
+    assert topic_planner.main(["plan", "--spec", json.dumps(spec), "--describe", str(describe),
+                               "--brokers", "3", "--bootstrap-server", "b1:9092"]) == 0
+
+    summary = json.loads(capsys.readouterr().out)
+    commands = summary.pop("commands")
+
+    assert summary == dict(expected, applied=False,
+                           changes=len(expected["create"]) + len(expected["add_partitions"])
+                           + len(expected["alter_configs"]))
+    assert [command.split()[:3] for command in commands] == (
+        [["kafka-topics", "--bootstrap-server", "b1:9092"]] * (len(expected["create"])
+                                                               + len(expected["add_partitions"]))
+        + [["kafka-configs", "--bootstrap-server", "b1:9092"]] * len(expected["alter_configs"]))
+
+
+@pytest.mark.parametrize("entry,brokers,partitions,replication_factor,min_insync", [
+    # three replicas, or one per broker on smaller clusters
+    ({"name": "t", "partitions": 6}, 1, 6, 1, "1"),
+    ({"name": "t", "partitions": 6}, 2, 6, 2, "1"),
+    ({"name": "t", "partitions": 6}, 5, 6, 3, "2"),
+    ({"name": "t", "partitions": 6, "replication_factor": 5}, 5, 6, 5, "4"),
+    # suggested counts are rounded up to a multiple of the brokers
+    ({"name": "t"}, 3, 3, 3, "2"),
+    ({"name": "t", "throughput_mb_sec": 95}, 3, 12, 3, "2"),
+    ({"name": "t", "consumers": 4}, 6, 6, 3, "2"),
+    ({"name": "t", "throughput_mb_sec": 95, "partition_mb_sec": 50}, 4, 4, 3, "2"),
+])
+def test_partitions_and_replication_factor(entry, brokers, partitions, replication_factor, min_insync):
+    topic = topic_planner.expand_spec([entry], brokers)["t"]
+
+    assert topic["partitions"] == partitions
+    assert topic["replication_factor"] == replication_factor
+    assert topic["configs"]["min.insync.replicas"] == min_insync
+
+
+@pytest.mark.parametrize("entry,brokers,error", [
+    ({"name": "t", "partitions": 6, "replication_factor": 4}, 3,
+     "t: replication_factor 4 must be between 1 and the 3 brokers"),
+    ({"name": "t", "partitions": 6, "replication_factor": -1}, 3,
+     "t: replication_factor -1 must be between 1 and the 3 brokers"),
+    ({"name": "t", "partitions": -6}, 3, "t: partitions must be at least 1, not -6"),
+    ({"name": "t", "partitions": 6}, 0, "brokers must be at least 1, not 0"),
+    ({"partitions": 6}, 3, "topic entry without a name"),
+])
+def test_invalid_spec(entry, brokers, error):
+    with pytest.raises(Exception, match=error):
+        topic_planner.expand_spec([entry], brokers)
+
+
+def test_topic_in_spec_twice():
+    with pytest.raises(Exception, match="topic events-1 is in the spec more than once"):
+        topic_planner.expand_spec([{"name": "events-{0..2}"}, {"name": "events-1"}], 3)